@@ -3,7 +3,14 @@ AI Agent Module
 Handles agent initialization, prompts, and execution logic.
 """
 
-from .agent import SupportAgent
 from .prompts import SYSTEM_PROMPT
 
 __all__ = ["SupportAgent", "SYSTEM_PROMPT"]
+
+
+def __getattr__(name):
+    # SupportAgent pulls in LangChain and the Gemini SDK; import it on first access
+    if name == "SupportAgent":
+        from .agent import SupportAgent
+        return SupportAgent
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -3,18 +3,29 @@ Improved AI Agent for ISP Customer Support
 Production-Optimized, Faster, Cleaner, Safer
 """
 
-from typing import Optional, Dict, Any, List
-from .gemini_adapter import GeminiChatAdapter
+from typing import Optional, Dict, Any, List, AsyncIterator, Awaitable, Tuple, Union
+from .gemini_adapter import FALLBACK_RESPONSES, ResponseShim, StreamInterrupted
 from langchain_core.messages import HumanMessage, AIMessage, SystemMessage, ToolMessage
 from langchain_core.tools import BaseTool
+import asyncio
 import re
 import json
+import threading
+import time
 
+from .context_builder import MESSAGE_OVERHEAD_TOKENS, context_builder, estimate_tokens, observe_prompt, observe_window
 from .prompts import SYSTEM_PROMPT
-from ..tools.user_tools import GetUserAccountTool
-from ..tools.network_tools import ConnectionStatusTool
+from .router import GREETINGS, ModelRouter
+from ..tools.user_tools import GetUserAccountTool, _format_user_account
+from ..tools.network_tools import ConnectionStatusTool, _format_connection_status
 from ..tools.ticket_tools import OpenTicketTool
 from ..core.config import settings
+from ..core.log import get_logger
+from ..core.metrics import STAGE_SECONDS, metrics
+from ..core.request_context import current_request
+
+
+log = get_logger(__name__)
 
 
 # ---------------------------------------------------------
@@ -32,11 +43,26 @@ BENGALI_ISP_PATTERN = re.compile(
 )
 
 
+AGENT_ITERATIONS = metrics.histogram(
+    "agent_iterations", "Model iterations per agent run", (),
+    buckets=(1, 2, 3, 4, 5, 6, 8, 10),
+)
+TOOL_SECONDS = metrics.histogram(
+    "agent_tool_seconds", "Tool execution time in seconds", ("tool",),
+)
+TOOL_CALLS = metrics.counter(
+    "agent_tool_calls_total", "Tool calls by name and outcome (ok/error/timeout/not_found)", ("tool", "outcome"),
+)
+
+# The system prompt is sent with every call; estimated once
+_SYSTEM_PROMPT_TOKENS = estimate_tokens(SYSTEM_PROMPT) + MESSAGE_OVERHEAD_TOKENS
+
+
 def is_isp_related_query(message: str) -> bool:
     text = message.lower()
     
     # Allow greetings
-    if text.strip() in ["hi", "hello", "hey", "salam", "assalamu alaikum", "start"]:
+    if text.strip() in GREETINGS:
         return True
 
     # English detection
@@ -56,6 +82,20 @@ def is_isp_related_query(message: str) -> bool:
     return False
 
 
+# Customer-facing progress messages shown while a tool runs (streaming mode)
+TOOL_PROGRESS_MESSAGES: Dict[str, str] = {
+    "GetUserAccountTool": "Looking up your account…",
+    "ConnectionStatusTool": "Checking your connection…",
+    "OpenTicketTool": "Opening a support ticket…",
+}
+
+# Lookups that can be handed to the model up front instead of via a tool round trip
+LOOKUP_TOOLS = ("GetUserAccountTool", "ConnectionStatusTool")
+
+# Joins text the model wrote alongside a tool call ("Let me check that…") to what follows it
+REPLY_PART_SEPARATOR = "\n\n"
+
+
 # ---------------------------------------------------------
 # 2) Main Support Agent
 # ---------------------------------------------------------
@@ -73,14 +113,10 @@ class SupportAgent:
         self.tools_map: Dict[str, BaseTool] = {tool.name: tool for tool in self.tools}
 
         gemini_key = api_key or settings.GEMINI_API_KEY or None
-        base_model = GeminiChatAdapter(
-            model=settings.MODEL_NAME,
-            temperature=settings.TEMPERATURE,
-            api_key=gemini_key,
-            max_tokens=settings.MAX_TOKENS,
-        )
 
-        self.model = base_model.bind_tools(self.tools)
+        # One tool-bound model per route (light for simple turns, full otherwise)
+        self.router = ModelRouter(self.tools, api_key=gemini_key)
+        self.model = self.router.model("full")
 
         # Clean Off Topic Message
         self.off_topic_response = (
@@ -94,40 +130,250 @@ class SupportAgent:
             "Tell me what's happening, and I'll take care of it! 💪"
         )
 
+        # Model iterations per run, grouped by what was known up front
+        self._run_stats: Dict[str, Dict[str, int]] = {}
+        self._run_stats_lock = threading.Lock()
+
     def _build_messages(
         self,
         history: Optional[List[Dict[str, str]]],
         message: str,
         account_id: Optional[str],
         summary: Optional[str],
+        prefetched: Optional[Dict[str, Any]] = None,
     ) -> List[SystemMessage | HumanMessage | AIMessage | ToolMessage]:
-        """Convert structured history into LangChain messages."""
-        stack: List[Any] = [SystemMessage(content=SYSTEM_PROMPT)]
+        """Convert structured history into LangChain messages within the prompt token budget."""
+        user_message = self._user_message(message, account_id, prefetched)
+        message_tokens = self._message_tokens(user_message)
+        stack, tokens = self._base_messages(history, summary, message_tokens)
+        observe_prompt(_SYSTEM_PROMPT_TOKENS, tokens["summary"], tokens["history"], message_tokens)
+        stack.append(user_message)
+        return stack
 
-        if summary:
-            stack.append(
-                SystemMessage(
-                    content=f"Conversation summary so far:\n{summary}"
-                )
-            )
+    def _base_messages(
+        self,
+        history: Optional[List[Dict[str, str]]],
+        summary: Optional[str],
+        reserved_tokens: int = 0,
+    ) -> Tuple[List[Any], Dict[str, int]]:
+        """
+        System prompt, optional summary and prior turns (everything but the new message).
 
-        for entry in history or []:
-            role = entry.get("role", "").lower()
-            content = entry.get("content", "")
-            
-            if role in ["agent", "assistant", "ai"]:
-                stack.append(AIMessage(content=content))
-            elif role == "user":
-                stack.append(HumanMessage(content=content))
-            else:
-                stack.append(HumanMessage(content=content))
+        Turns are added newest-first until the prompt, with ``reserved_tokens``
+        left for the new message, reaches CONTEXT_TOKEN_BUDGET. Returns the
+        stack and the estimated tokens of its summary and history.
+        """
+        stack: List[Any] = [SystemMessage(content=SYSTEM_PROMPT)]
+        summary_tokens = 0
 
-        user_message = message
+        if summary:
+            summary_messages = self._summary_messages(summary)
+            stack.extend(summary_messages)
+            summary_tokens = sum(self._message_tokens(entry) for entry in summary_messages)
+
+        window = context_builder.fit(history, reserved_tokens=_SYSTEM_PROMPT_TOKENS + summary_tokens + reserved_tokens)
+        observe_window(window)
+        for entry in window.turns:
+            stack.append(self._history_message(entry))
+        return stack, {"summary": summary_tokens, "history": window.tokens}
+
+    @staticmethod
+    def _message_tokens(message: Any) -> int:
+        return estimate_tokens(message.content) + MESSAGE_OVERHEAD_TOKENS
+
+    @staticmethod
+    def _history_message(entry: Dict[str, str]) -> Any:
+        role = entry.get("role", "").lower()
+        content = entry.get("content", "")
+        
+        if role in ["agent", "assistant", "ai"]:
+            return AIMessage(content=content)
+        return HumanMessage(content=content)
+
+    @classmethod
+    def _user_message(
+        cls, message: str, account_id: Optional[str], prefetched: Optional[Dict[str, Any]] = None
+    ) -> HumanMessage:
+        user_message = context_builder.truncate(message)
         if account_id:
             user_message = f"[User Account ID: {account_id}] {user_message}"
-        stack.append(HumanMessage(content=user_message))
+        lookups = cls._prefetched_lookups(prefetched)
+        if lookups:
+            user_message = f"{lookups}\n\n{user_message}"
+        return HumanMessage(content=user_message)
+
+    @staticmethod
+    def _prefetched_lookups(prefetched: Optional[Dict[str, Any]]) -> str:
+        """
+        Render prefetched account/connection data as the lookup tools would.
+
+        It goes into the user turn rather than the system prompt so the cached
+        model (keyed by system instruction) is shared across customers.
+        """
+        account = (prefetched or {}).get("account")
+        if not account:
+            return ""
+        parts = [_format_user_account(account, account.get("phone", "")).strip()]
+        connection = prefetched.get("connection")
+        if connection:
+            parts.append(_format_connection_status(connection, account.get("account_id", "")).strip())
+        return "Customer data already looked up for this message:\n" + "\n\n".join(parts)
+
+    def _session_messages(
+        self,
+        session: Any,
+        message: str,
+        account_id: Optional[str],
+        prefetched: Optional[Dict[str, Any]] = None,
+    ) -> List[Any]:
+        """
+        Build the message list from a ConversationSession.
+
+        The base stack is kept on the session and only rebuilt after its
+        summary changes; each turn copies it and appends the new message.
+        It is fitted to the token budget when built, leaving room for the
+        largest new message CONTEXT_MAX_MESSAGE_TOKENS allows.
+        """
+        if session.messages is None:
+            session.messages, session.context_tokens = self._base_messages(
+                session.turns,
+                session.summary,
+                context_builder.max_message_tokens + MESSAGE_OVERHEAD_TOKENS,
+            )
+        stack = list(session.messages)
+        stack.append(self._user_message(message, account_id, prefetched))
+        message_tokens = self._message_tokens(stack[-1])
+        observe_prompt(
+            _SYSTEM_PROMPT_TOKENS,
+            session.context_tokens.get("summary", 0),
+            session.context_tokens.get("history", 0),
+            message_tokens,
+        )
         return stack
+
+    def record_session_turn(self, session: Any, message: str, reply: str) -> None:
+        """Append a completed exchange (oversized messages cut) to the session and its cached stack."""
+        user_turn = context_builder.truncate_turn({"role": "user", "content": message})
+        agent_turn = context_builder.truncate_turn({"role": "assistant", "content": reply})
+        session.turns.extend([user_turn, agent_turn])
+        if session.messages is not None:
+            appended = [self._history_message(user_turn), self._history_message(agent_turn)]
+            session.messages.extend(appended)
+            session.context_tokens["history"] = session.context_tokens.get("history", 0) + sum(
+                self._message_tokens(entry) for entry in appended
+            )
+
+    def _prepare_messages(
+        self,
+        history: Optional[List[Dict[str, str]]],
+        message: str,
+        account_id: Optional[str],
+        summary: Optional[str],
+        session: Any,
+        prefetched: Optional[Dict[str, Any]] = None,
+    ) -> List[Any]:
+        if session is not None:
+            return self._session_messages(session, message, account_id, prefetched)
+        return self._build_messages(history, message, account_id, summary, prefetched)
     
+    @staticmethod
+    def _summary_messages(summary: str) -> List[Any]:
+        """
+        The conversation summary as a leading context exchange.
+
+        Like prefetched lookups it stays out of the system prompt, so the
+        cached model (keyed by system instruction) is shared across
+        conversations; the acknowledgement keeps user and model turns alternating.
+        """
+        return [
+            HumanMessage(content=f"[Context] Conversation summary so far:\n{summary}"),
+            AIMessage(content="Noted, I'll continue from this summary."),
+        ]
+
+    async def _resolve_summary(
+        self, summary: Optional[Union[str, Awaitable[str]]]
+    ) -> Tuple[Optional[str], Optional[Awaitable[str]]]:
+        """
+        Split a summary argument into (ready summary, pending summary).
+
+        An awaitable summary (e.g. an asyncio.Task running compression and
+        resolving to a string or CompressedContext) is
+        awaited up front unless COMPRESSION_OVERLAP is enabled, in which case
+        the first model call runs without it and the summary is only awaited
+        if the agent needs another iteration.
+        """
+        if summary is None or isinstance(summary, str):
+            return summary, None
+        if settings.COMPRESSION_OVERLAP:
+            return None, summary
+        return self._summary_text(await summary), None
+
+    @staticmethod
+    def _summary_text(result: Any) -> Optional[str]:
+        """Accept either a plain summary string or a CompressedContext result."""
+        return getattr(result, "context", result)
+
+    @classmethod
+    async def _apply_pending_summary(
+        cls, messages: List[Any], pending: Optional[Awaitable[str]]
+    ) -> None:
+        """Insert a pending summary right after the system prompt once it is ready."""
+        if pending is None:
+            return
+        summary = cls._summary_text(await pending)
+        if summary:
+            messages[1:1] = cls._summary_messages(summary)
+
+    def _record_run(
+        self,
+        account_id: Optional[str],
+        prefetched: Optional[Dict[str, Any]],
+        iterations: int,
+        lookup_calls: int,
+    ) -> None:
+        if not iterations:
+            return
+        AGENT_ITERATIONS.observe(iterations)
+        group = "prefetched" if self._prefetched_lookups(prefetched) else ("account" if account_id else "anonymous")
+        with self._run_stats_lock:
+            stats = self._run_stats.setdefault(group, {"runs": 0, "iterations": 0, "lookup_calls": 0})
+            stats["runs"] += 1
+            stats["iterations"] += iterations
+            stats["lookup_calls"] += lookup_calls
+
+    def run_stats(self) -> Dict[str, Any]:
+        """
+        Model iterations per run for prefetched, account-only and anonymous runs.
+
+        ``iterations_saved_per_request`` compares runs that were handed the
+        customer's data up front with runs that only knew the account ID
+        (PREFETCH_ENABLED=false, or a prefetch that failed).
+        """
+        with self._run_stats_lock:
+            groups = {name: dict(stats) for name, stats in self._run_stats.items()}
+        for stats in groups.values():
+            stats["avg_iterations"] = round(stats["iterations"] / stats["runs"], 3)
+        saved = None
+        if "prefetched" in groups and "account" in groups:
+            saved = round(groups["account"]["avg_iterations"] - groups["prefetched"]["avg_iterations"], 3)
+        return {**groups, "iterations_saved_per_request": saved}
+
+    @staticmethod
+    def _count_lookups(tool_calls: List[Dict[str, Any]]) -> int:
+        return sum(1 for call in tool_calls if call.get("name") in LOOKUP_TOOLS)
+
+    def _route_turn(
+        self,
+        message: str,
+        history: Optional[List[Dict[str, str]]],
+        has_summary: bool,
+        session: Any,
+    ) -> str:
+        """Pick the model route from the message, history length and summary."""
+        if session is not None:
+            return self.router.route(message, len(session.turns), bool(session.summary))
+        return self.router.route(message, len(history or []), has_summary)
+
     def _normalize_tool_calls(self, tool_calls: Any) -> List[Dict[str, Any]]:
         """Convert provider-specific tool calls into simple dictionaries."""
         normalized: List[Dict[str, Any]] = []
@@ -165,27 +411,91 @@ class SupportAgent:
 
         return normalized
 
+    def _to_ai_message(self, response: Any) -> AIMessage:
+        """Wrap an adapter response as an AIMessage with structured tool calls."""
+        if isinstance(response, AIMessage):
+            return response
+        calls = self._normalize_tool_calls(getattr(response, "tool_calls", []))
+        return AIMessage(
+            content=getattr(response, "content", "") or "",
+            tool_calls=[
+                {"name": call["name"], "args": call["args"], "id": call["id"]}
+                for call in calls
+            ],
+        )
+
+    @staticmethod
+    def _fallback(reason: str, text: str) -> str:
+        """Count a canned reply sent instead of a model answer."""
+        FALLBACK_RESPONSES.inc(reason=reason)
+        return text
+
+    @staticmethod
+    def _record_tool(tool_name: str, outcome: str, started: float) -> None:
+        elapsed = time.perf_counter() - started
+        TOOL_SECONDS.observe(elapsed, tool=tool_name)
+        STAGE_SECONDS.observe(elapsed, stage="tool")
+        TOOL_CALLS.inc(tool=tool_name, outcome=outcome)
+        context = current_request()
+        if context is not None:
+            context.tool_calls += 1
+
     def _execute_tool(self, tool_name: str, tool_input: Optional[Dict[str, Any]]) -> str:
         """Execute a tool and return its result."""
+        started, outcome = time.perf_counter(), "ok"
         try:
             tool = self.tools_map.get(tool_name)
             if not tool:
+                outcome = "not_found"
                 return f"Tool {tool_name} not found"
             payload: Any = tool_input if tool_input is not None else {}
             return str(tool.invoke(payload))
         except Exception as e:
+            outcome = "error"
             return f"Error executing {tool_name}: {str(e)}"
+        finally:
+            self._record_tool(tool_name, outcome, started)
     
     async def _aexecute_tool(self, tool_name: str, tool_input: Optional[Dict[str, Any]]) -> str:
-        """Execute a tool asynchronously and return its result."""
+        """Execute a tool asynchronously (bounded by TOOL_TIMEOUT_SECONDS) and return its result."""
+        started, outcome = time.perf_counter(), "ok"
         try:
             tool = self.tools_map.get(tool_name)
             if not tool:
+                outcome = "not_found"
                 return f"Tool {tool_name} not found"
             payload: Any = tool_input if tool_input is not None else {}
-            return str(await tool.ainvoke(payload))
+            return str(await asyncio.wait_for(tool.ainvoke(payload), timeout=settings.TOOL_TIMEOUT_SECONDS))
+        except asyncio.TimeoutError:
+            outcome = "timeout"
+            return f"Error executing {tool_name}: timed out after {settings.TOOL_TIMEOUT_SECONDS}s"
         except Exception as e:
+            outcome = "error"
             return f"Error executing {tool_name}: {str(e)}"
+        finally:
+            self._record_tool(tool_name, outcome, started)
+
+    async def _aexecute_tool_calls(self, tool_calls: List[Dict[str, Any]]) -> List[ToolMessage]:
+        """
+        Execute all tool calls of one model turn concurrently.
+
+        Fan-out is bounded by TOOL_MAX_CONCURRENCY; results are returned as
+        ToolMessages in the order the model requested them.
+        """
+        semaphore = asyncio.Semaphore(settings.TOOL_MAX_CONCURRENCY)
+
+        async def run_one(tool_call: Dict[str, Any]) -> str:
+            async with semaphore:
+                return await self._aexecute_tool(tool_call.get("name", ""), tool_call.get("args", {}))
+
+        results = await asyncio.gather(*(run_one(call) for call in tool_calls))
+        return [
+            ToolMessage(
+                content=str(result),
+                tool_call_id=call.get("id") or call.get("name", ""),
+            )
+            for call, result in zip(tool_calls, results)
+        ]
 
     # ---------------------------------------------------------
     # Sync Run
@@ -196,30 +506,32 @@ class SupportAgent:
         history: Optional[List[str]] = None,
         account_id: Optional[str] = None,
         summary: Optional[str] = None,
+        session: Any = None,
+        prefetched: Optional[Dict[str, Any]] = None,
     ) -> str:
+        iterations = lookup_calls = 0
         try:
             # Off-topic check
             if not is_isp_related_query(message):
-                return self.off_topic_response
+                return self._fallback("off_topic", self.off_topic_response)
 
-            messages = self._build_messages(history, message, account_id, summary)
+            messages = self._prepare_messages(history, message, account_id, summary, session, prefetched)
+            route = self._route_turn(message, history, bool(summary), session)
             
+            preamble: List[str] = []
             max_iterations = settings.MAX_ITERATIONS
             for iteration in range(max_iterations):
-                response = self.model.invoke(messages)
+                iterations += 1
+                response = self.router.model(route).invoke(messages)
 
-                if isinstance(response, AIMessage):
-                    ai_response = response
-                else:
-                    ai_response = AIMessage(
-                        content=getattr(response, "content", "") or "",
-                        additional_kwargs={
-                            "tool_calls": getattr(response, "tool_calls", [])
-                        },
-                    )
+                ai_response = self._to_ai_message(response)
 
                 normalized_calls = self._normalize_tool_calls(getattr(ai_response, "tool_calls", []))
                 if normalized_calls:
+                    if ai_response.content:
+                        preamble.append(ai_response.content)
+                    lookup_calls += self._count_lookups(normalized_calls)
+                    route = self.router.escalate(route, normalized_calls)
                     messages.append(ai_response)
                     for tool_call in normalized_calls:
                         tool_name = tool_call.get("name", "")
@@ -234,28 +546,33 @@ class SupportAgent:
                         )
                 else:
                     # No more tools to call, return final response
-                    return ai_response.content if ai_response.content else "I'm here to help! What can I do for you?"
+                    return REPLY_PART_SEPARATOR.join(
+                        preamble + [ai_response.content or self._fallback("empty_reply", "I'm here to help! What can I do for you?")]
+                    )
             
             # Max iterations reached
-            return self.off_topic_response
+            return REPLY_PART_SEPARATOR.join(preamble + [self._fallback("iteration_limit", self.off_topic_response)])
 
         except Exception as e:
             err = str(e).lower()
-            print(f"[AGENT ERROR] {type(e).__name__}: {e}")
+            log.error("agent_error", mode="sync", error_type=type(e).__name__, error=str(e))
 
             # Iteration limit → treat as off-topic
             if "iteration" in err or "limit" in err:
-                return self.off_topic_response
+                return self._fallback("iteration_limit", self.off_topic_response)
 
             # Other errors
-            return (
+            return self._fallback(
+                "agent_error",
                 "Oops! Something went wrong. 😅\n\n"
                 "Can you tell me what issue you are facing with your internet?\n"
                 "• Slow/No connection?\n"
                 "• Billing or account issues?\n"
                 "• Router or WiFi problem?\n\n"
-                "I'll fix it for you! 💡"
+                "I'll fix it for you! 💡",
             )
+        finally:
+            self._record_run(account_id, prefetched, iterations, lookup_calls)
 
     # ---------------------------------------------------------
     # Async Run
@@ -265,57 +582,158 @@ class SupportAgent:
         message: str,
         history: Optional[List[str]] = None,
         account_id: Optional[str] = None,
-        summary: Optional[str] = None,
+        summary: Optional[Union[str, Awaitable[str]]] = None,
+        session: Any = None,
+        prefetched: Optional[Dict[str, Any]] = None,
     ) -> str:
+        iterations = lookup_calls = 0
         try:
             if not is_isp_related_query(message):
-                return self.off_topic_response
+                return self._fallback("off_topic", self.off_topic_response)
 
-            messages = self._build_messages(history, message, account_id, summary)
+            summary, pending_summary = await self._resolve_summary(summary)
+            messages = self._prepare_messages(history, message, account_id, summary, session, prefetched)
+            route = self._route_turn(message, history, bool(summary or pending_summary), session)
             
+            preamble: List[str] = []
             max_iterations = settings.MAX_ITERATIONS
             for iteration in range(max_iterations):
-                response = await self.model.ainvoke(messages)
+                iterations += 1
+                response = await self.router.model(route).ainvoke(messages)
 
-                if isinstance(response, AIMessage):
-                    ai_response = response
-                else:
-                    ai_response = AIMessage(
-                        content=getattr(response, "content", "") or "",
-                        additional_kwargs={
-                            "tool_calls": getattr(response, "tool_calls", [])
-                        },
-                    )
+                ai_response = self._to_ai_message(response)
 
                 normalized_calls = self._normalize_tool_calls(getattr(ai_response, "tool_calls", []))
                 if normalized_calls:
+                    if ai_response.content:
+                        preamble.append(ai_response.content)
+                    lookup_calls += self._count_lookups(normalized_calls)
+                    route = self.router.escalate(route, normalized_calls)
+                    await self._apply_pending_summary(messages, pending_summary)
+                    pending_summary = None
                     messages.append(ai_response)
-                    for tool_call in normalized_calls:
-                        tool_name = tool_call.get("name", "")
-                        tool_input = tool_call.get("args", {})
-                        tool_result = await self._aexecute_tool(tool_name, tool_input)
-                        tool_call_id = tool_call.get("id") or tool_name
-                        messages.append(
-                            ToolMessage(
-                                content=str(tool_result),
-                                tool_call_id=tool_call_id,
-                            )
-                        )
+                    messages.extend(await self._aexecute_tool_calls(normalized_calls))
                 else:
                     # No more tools to call, return final response
-                    return ai_response.content if ai_response.content else "I'm here to help! What can I do for you?"
+                    return REPLY_PART_SEPARATOR.join(
+                        preamble + [ai_response.content or self._fallback("empty_reply", "I'm here to help! What can I do for you?")]
+                    )
             
             # Max iterations reached
-            return self.off_topic_response
+            return REPLY_PART_SEPARATOR.join(preamble + [self._fallback("iteration_limit", self.off_topic_response)])
 
         except Exception as e:
             err = str(e).lower()
-            print(f"[AGENT ERROR ASYNC] {type(e).__name__}: {e}")
+            log.error("agent_error", mode="async", error_type=type(e).__name__, error=str(e))
 
             if "iteration" in err or "limit" in err:
-                return self.off_topic_response
+                return self._fallback("iteration_limit", self.off_topic_response)
 
-            return (
+            return self._fallback(
+                "agent_error",
                 "Hmm, I didn't catch that. 🤔\n"
-                "Tell me what's happening with your internet and I'll help you!"
+                "Tell me what's happening with your internet and I'll help you!",
             )
+        finally:
+            self._record_run(account_id, prefetched, iterations, lookup_calls)
+
+    # ---------------------------------------------------------
+    # Streaming Run
+    # ---------------------------------------------------------
+    async def astream(
+        self,
+        message: str,
+        history: Optional[List[str]] = None,
+        account_id: Optional[str] = None,
+        summary: Optional[Union[str, Awaitable[str]]] = None,
+        session: Any = None,
+        prefetched: Optional[Dict[str, Any]] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Run the agent loop and yield events as they happen.
+
+        Yields dictionaries of the form:
+        - {"event": "status", "data": {"tool": name, "message": text}} while tools run
+        - {"event": "token", "data": {"text": delta}} for answer text; text the
+          model writes alongside a tool call is kept and set off from what follows
+        - {"event": "error", "data": {"detail": text}} if the model fails after
+          part of the answer was streamed; the stream ends there
+        """
+        iterations = lookup_calls = 0
+        streamed = False
+        separator = ""
+        try:
+            if not is_isp_related_query(message):
+                yield {"event": "token", "data": {"text": self._fallback("off_topic", self.off_topic_response)}}
+                return
+
+            summary, pending_summary = await self._resolve_summary(summary)
+            messages = self._prepare_messages(history, message, account_id, summary, session, prefetched)
+            route = self._route_turn(message, history, bool(summary or pending_summary), session)
+
+            max_iterations = settings.MAX_ITERATIONS
+            for iteration in range(max_iterations):
+                iterations += 1
+                content = ""
+                tool_calls: List[Dict[str, Any]] = []
+
+                async for chunk in self.router.model(route).astream(messages):
+                    if chunk.tool_calls:
+                        tool_calls.extend(chunk.tool_calls)
+                    if chunk.content:
+                        content += chunk.content
+                        streamed = True
+                        yield {"event": "token", "data": {"text": separator + chunk.content}}
+                        separator = ""
+
+                ai_response = self._to_ai_message(ResponseShim(content=content, tool_calls=tool_calls))
+                normalized_calls = self._normalize_tool_calls(ai_response.tool_calls)
+                if not normalized_calls:
+                    if not content:
+                        yield {"event": "token", "data": {"text": separator + self._fallback("empty_reply", "I'm here to help! What can I do for you?")}}
+                    return
+
+                if content:
+                    # Text sent before the tool ran stays part of the reply, as in run()/arun()
+                    separator = REPLY_PART_SEPARATOR
+
+                lookup_calls += self._count_lookups(normalized_calls)
+                route = self.router.escalate(route, normalized_calls)
+                await self._apply_pending_summary(messages, pending_summary)
+                pending_summary = None
+                messages.append(ai_response)
+                for tool_call in normalized_calls:
+                    tool_name = tool_call.get("name", "")
+                    yield {
+                        "event": "status",
+                        "data": {
+                            "tool": tool_name,
+                            "message": TOOL_PROGRESS_MESSAGES.get(tool_name, "Working on it…"),
+                        },
+                    }
+                messages.extend(await self._aexecute_tool_calls(normalized_calls))
+
+            # Max iterations reached
+            yield {"event": "token", "data": {"text": separator + self._fallback("iteration_limit", self.off_topic_response)}}
+
+        except Exception as e:
+            log.error("agent_error", mode="stream", error_type=type(e).__name__, error=str(e))
+            if streamed and isinstance(e, StreamInterrupted):
+                # The client already has part of the answer; a fallback appended to it would read as one garbled reply
+                yield {
+                    "event": "error",
+                    "data": {"detail": "Sorry, my answer was cut off. Please try again."},
+                }
+                return
+            yield {
+                "event": "token",
+                "data": {
+                    "text": self._fallback(
+                        "agent_error",
+                        "Hmm, I didn't catch that. 🤔\n"
+                        "Tell me what's happening with your internet and I'll help you!",
+                    )
+                },
+            }
+        finally:
+            self._record_run(account_id, prefetched, iterations, lookup_calls)
@@ -0,0 +1,331 @@
+"""
+Model Cassettes
+Record model exchanges to disk and replay them without the upstream
+(LLM_CASSETTE_MODE=record / replay).
+
+The cassette sits at the SDK boundary: the adapter still converts messages,
+applies deadlines, hedging, the circuit breaker and metrics, and the agent
+still runs its tools, so a replay exercises the same code as live traffic.
+
+Features:
+- Compact JSON lines (gzip-compressed when the path ends in ``.gz``), one
+  exchange per line: fingerprint, reply text, function calls, usage, latency
+- Requests are matched by a fingerprint of model, system instruction, tool
+  set, generation config and conversation; volatile values (ticket IDs,
+  timestamps) are masked so replayed tool output still matches
+- Identical requests replay their recordings in order, cycling when exhausted
+- Optional recorded latency (LLM_CASSETTE_LATENCY_SCALE)
+- Misses are counted and logged and surface as an upstream error
+"""
+
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+import asyncio
+import atexit
+import gzip
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+
+from .fake_adapter import FakeReply, _Response, _Stream, _Usage, _parts
+from .gemini_adapter import _get_executor, _usage_of
+from ..core.config import settings
+from ..core.log import get_logger
+from ..core.metrics import metrics
+
+log = get_logger(__name__)
+
+
+LLM_CASSETTE = metrics.counter(
+    "llm_cassette_total", "Cassette lookups and recordings by outcome (hit/miss/recorded)", ("outcome",),
+)
+
+# Values that differ between a recording and its replay (ticket IDs, timestamps)
+_VOLATILE = (
+    (re.compile(r"\bTKT\d+\b"), "TKT#"),
+    (re.compile(r"\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}(?:\.\d+)?"), "<time>"),
+)
+
+
+class CassetteMiss(LookupError):
+    """A replayed request that was never recorded."""
+
+
+def fingerprint(
+    model: str,
+    system_instruction: str,
+    tools: Tuple[Tuple[str, str], ...],
+    history: List[dict],
+    message: Any,
+    generation_config: Optional[Dict[str, Any]],
+) -> str:
+    """Stable identifier of one model request."""
+    payload = json.dumps(
+        {
+            "model": model,
+            "system": system_instruction,
+            "tools": [list(tool) for tool in tools],
+            "config": generation_config or {},
+            "history": [[entry.get("role"), [str(part) for part in entry.get("parts", [])]] for entry in history],
+            "message": str(message),
+        },
+        sort_keys=True,
+        ensure_ascii=False,
+        default=str,
+    )
+    for pattern, replacement in _VOLATILE:
+        payload = pattern.sub(replacement, payload)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:20]
+
+
+# ==================== CASSETTE ====================
+
+class Cassette:
+    """
+    One cassette file in record or replay mode.
+
+    Recording appends to the file (so several sessions accumulate); replay
+    loads the whole file once. Thread-safe.
+    """
+
+    def __init__(self, path: str, mode: str, latency_scale: float = 0.0):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"unknown cassette mode {mode!r}")
+        self.path = path
+        self.mode = mode
+        self.latency_scale = max(0.0, latency_scale)
+        self._lock = threading.Lock()
+        self._entries: Dict[str, List[Dict[str, Any]]] = {}
+        self._cursors: Dict[str, int] = {}
+        self._file = None
+        self.hits = self.misses = self.recorded = 0
+        if self.replaying:
+            self._load()
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == "replay"
+
+    def _open(self, mode: str):
+        if self.path.endswith(".gz"):
+            return gzip.open(self.path, mode + "t", encoding="utf-8")
+        return open(self.path, mode, encoding="utf-8")
+
+    def _load(self) -> None:
+        if not os.path.exists(self.path):
+            log.warning("cassette_missing", path=self.path)
+            return
+        count = 0
+        try:
+            with self._open("r") as handle:
+                for line in handle:
+                    line = line.strip()
+                    if line:
+                        entry = json.loads(line)
+                        self._entries.setdefault(entry["fp"], []).append(entry)
+                        count += 1
+        except EOFError:
+            # A recording that was not closed cleanly; keep what was flushed
+            log.warning("cassette_truncated", path=self.path, exchanges=count)
+        log.info("cassette_loaded", path=self.path, exchanges=count, requests=len(self._entries))
+
+    def wrap(self, adapter: Any, system_instruction: str) -> "_CassetteModel":
+        """Model object for ``adapter``: the recording wraps the real model, a replay needs none."""
+        model = None if self.replaying else adapter._get_model(system_instruction)
+        return _CassetteModel(self, adapter, system_instruction, model)
+
+    def lookup(self, fp: str) -> Optional[Dict[str, Any]]:
+        """Next recording for a fingerprint, or None on a miss."""
+        with self._lock:
+            entries = self._entries.get(fp)
+            if entries:
+                index = self._cursors.get(fp, 0)
+                self._cursors[fp] = index + 1
+                self.hits += 1
+            else:
+                self.misses += 1
+        LLM_CASSETTE.inc(outcome="hit" if entries else "miss")
+        return entries[index % len(entries)] if entries else None
+
+    def delay(self, entry: Dict[str, Any]) -> float:
+        """Seconds to wait before replaying ``entry``."""
+        return entry.get("ms", 0) / 1000 * self.latency_scale
+
+    def record(self, entry: Dict[str, Any]) -> None:
+        line = json.dumps(entry, ensure_ascii=False, separators=(",", ":"), default=str)
+        with self._lock:
+            if self._file is None:
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                self._file = self._open("a")
+            self._file.write(line + "\n")
+            # Flushed per exchange so an interrupted recording stays usable
+            self._file.flush()
+            self.recorded += 1
+        LLM_CASSETTE.inc(outcome="recorded")
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "path": self.path,
+            "requests": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "recorded": self.recorded,
+        }
+
+
+_cassette: Optional[Cassette] = None
+_cassette_lock = threading.Lock()
+
+
+def get_cassette() -> Optional[Cassette]:
+    """The process-wide cassette for LLM_CASSETTE_MODE, or None when it is off."""
+    global _cassette
+    if settings.LLM_CASSETTE_MODE == "off":
+        return None
+    if _cassette is None:
+        with _cassette_lock:
+            if _cassette is None:
+                _cassette = Cassette(
+                    settings.LLM_CASSETTE_PATH,
+                    settings.LLM_CASSETTE_MODE,
+                    settings.LLM_CASSETTE_LATENCY_SCALE,
+                )
+                atexit.register(_cassette.close)
+    return _cassette
+
+
+# ==================== SDK WRAPPERS ====================
+
+class _CassetteModel:
+    """Stands in for a GenerativeModel: replays, or records around the real one."""
+
+    def __init__(self, cassette: Cassette, adapter: Any, system_instruction: str, model: Any = None):
+        self.cassette = cassette
+        self.adapter = adapter
+        self.system_instruction = system_instruction
+        self._model = model
+
+    def start_chat(self, history: Optional[List[dict]] = None) -> "_CassetteChat":
+        chat = self._model.start_chat(history=history) if self._model is not None else None
+        return _CassetteChat(self, history or [], chat)
+
+
+class _CassetteChat:
+    def __init__(self, owner: _CassetteModel, history: List[dict], chat: Any = None):
+        self._owner = owner
+        self._history = history
+        self._chat = chat
+
+    def _fingerprint(self, message: Any, generation_config: Optional[Dict[str, Any]]) -> str:
+        adapter = self._owner.adapter
+        return fingerprint(
+            adapter.model, self._owner.system_instruction, adapter._tool_key,
+            self._history, message, generation_config,
+        )
+
+    def _replay(self, fp: str, message: Any) -> Tuple[Dict[str, Any], FakeReply, _Usage]:
+        entry = self._owner.cassette.lookup(fp)
+        if entry is None:
+            log.warning("cassette_miss", fingerprint=fp, model=self._owner.adapter.model, message=str(message)[:80])
+            raise CassetteMiss(f"no recorded exchange for request {fp}")
+        reply = FakeReply(entry.get("text", ""), tuple((name, args) for name, args in entry.get("calls", [])))
+        usage = _Usage(*(entry.get("usage") or (0, 0)))
+        return entry, reply, usage
+
+    def _record(self, fp: str, message: Any, seconds: float, text: str, calls: List[dict], usage: Optional[Dict[str, int]]) -> None:
+        self._owner.cassette.record({
+            "fp": fp,
+            "model": self._owner.adapter.model,
+            "msg": str(message)[:80],
+            "text": text,
+            "calls": [[call["name"], call["args"]] for call in calls],
+            "usage": [usage["input_tokens"], usage["output_tokens"]] if usage else None,
+            "ms": round(seconds * 1000),
+        })
+
+    def _record_response(self, fp: str, message: Any, started: float, response: Any) -> None:
+        text, calls = self._owner.adapter._extract_parts(response)
+        if not text and not calls:
+            try:
+                text = response.text or ""
+            except Exception:
+                text = ""
+        self._record(fp, message, time.perf_counter() - started, text, calls, _usage_of(response))
+
+    def send_message(self, message: Any, generation_config: Any = None) -> Any:
+        fp = self._fingerprint(message, generation_config)
+        if self._chat is None:
+            entry, reply, usage = self._replay(fp, message)
+            delay = self._owner.cassette.delay(entry)
+            if delay:
+                time.sleep(delay)
+            return _Response(_parts(reply), usage)
+
+        started = time.perf_counter()
+        response = self._chat.send_message(message, generation_config=generation_config)
+        self._record_response(fp, message, started, response)
+        return response
+
+    async def send_message_async(self, message: Any, generation_config: Any = None, stream: bool = False) -> Any:
+        fp = self._fingerprint(message, generation_config)
+        if self._chat is None:
+            entry, reply, usage = self._replay(fp, message)
+            delay = self._owner.cassette.delay(entry)
+            if delay:
+                await asyncio.sleep(delay)
+            return _Stream(reply, usage) if stream else _Response(_parts(reply), usage)
+
+        started = time.perf_counter()
+        send_async = getattr(self._chat, "send_message_async", None)
+        if stream:
+            response = await send_async(message, generation_config=generation_config, stream=True)
+            # Latency is recorded up to the stream's start; replay streams the rest word by word
+            seconds = time.perf_counter() - started
+            return _RecordingStream(
+                response,
+                self._owner.adapter,
+                lambda text, calls, usage: self._record(fp, message, seconds, text, calls, usage),
+            )
+        if send_async is not None:
+            response = await send_async(message, generation_config=generation_config)
+        else:
+            loop = asyncio.get_running_loop()
+            response = await loop.run_in_executor(
+                _get_executor(),
+                lambda: self._chat.send_message(message, generation_config=generation_config),
+            )
+        self._record_response(fp, message, started, response)
+        return response
+
+
+class _RecordingStream:
+    """Passes a response stream through and records the whole reply once it ends."""
+
+    def __init__(self, stream: Any, adapter: Any, on_complete: Callable[[str, List[dict], Optional[Dict[str, int]]], None]):
+        self._stream = stream
+        self._adapter = adapter
+        self._on_complete = on_complete
+
+    def __aiter__(self) -> AsyncIterator[Any]:
+        return self._chunks()
+
+    async def _chunks(self) -> AsyncIterator[Any]:
+        text, calls, usage = "", [], None
+        async for chunk in self._stream:
+            chunk_text, chunk_calls = self._adapter._extract_parts(chunk)
+            text += chunk_text
+            calls.extend(chunk_calls)
+            usage = _usage_of(chunk) or usage
+            yield chunk
+        self._on_complete(text, calls, usage)
@@ -0,0 +1,177 @@
+"""
+Context Builder
+Token-budgeted prompt history for the agent.
+
+Instead of a fixed number of recent turns, history is added newest-first
+until the estimated prompt (system prompt, summary, turns and the new
+message) reaches CONTEXT_TOKEN_BUDGET, so a pasted router log does not blow
+up the prompt and short chit-chat keeps more of the conversation.
+
+Features:
+- estimate_tokens(): fast tokenizer-free estimate (words, punctuation,
+  non-Latin script), also used for usage when the SDK reports none
+- Oversized messages are cut to their beginning and end
+  (CONTEXT_MAX_MESSAGE_TOKENS); the newest CONTEXT_MIN_TURNS turns are
+  always kept
+- Per-request prompt token metrics by part, plus dropped and truncated turns
+"""
+
+from typing import Dict, List, NamedTuple, Optional
+import re
+
+from ..core.config import settings
+from ..core.metrics import metrics
+
+
+# Word pieces and single punctuation marks
+_PIECE_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+# Role and framing tokens the API adds around every message
+MESSAGE_OVERHEAD_TOKENS = 4
+
+_TOKEN_BUCKETS = (50, 100, 250, 500, 1000, 2000, 4000, 8000, 16000, 32000)
+
+CONTEXT_TOKENS = metrics.histogram(
+    "context_prompt_tokens",
+    "Estimated prompt tokens per agent request by part (system, summary, history, message, total)",
+    ("part",),
+    buckets=_TOKEN_BUCKETS,
+)
+CONTEXT_TURNS = metrics.counter(
+    "context_turns_total", "History turns offered to the context builder by outcome (kept/dropped/truncated)", ("outcome",),
+)
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the model tokens of ``text`` without a tokenizer.
+
+    Short words are one token and longer ones about one per 4 characters;
+    punctuation is a token of its own (logs and JSON are dense in it) and
+    non-Latin words (e.g. Bangla) cost about one token per 2 characters.
+    """
+    if not text:
+        return 0
+    tokens = 0
+    for match in _PIECE_PATTERN.finditer(text):
+        piece = match.group()
+        size = len(piece)
+        if size <= 4:
+            tokens += 1
+        elif piece.isascii():
+            tokens += (size + 3) // 4
+        else:
+            tokens += (size + 1) // 2
+    return tokens
+
+
+def truncate_text(text: str, max_tokens: int) -> str:
+    """
+    Cut ``text`` to about ``max_tokens``, keeping its beginning and end.
+
+    The end is kept as well because pasted logs and long messages usually
+    finish with the error or the actual question.
+    """
+    # Every token covers at least one character
+    if max_tokens <= 0 or len(text) <= max_tokens:
+        return text
+    tokens = estimate_tokens(text)
+    if tokens <= max_tokens:
+        return text
+    keep_chars = len(text)
+    # Token density varies along the text; shrink until the cut version fits
+    while True:
+        keep_chars = max(1, int(keep_chars * max_tokens / tokens))
+        head = keep_chars * 2 // 3
+        tail = keep_chars - head
+        omitted = len(text) - head - tail
+        cut = f"{text[:head].rstrip()}\n[… {omitted} characters omitted …]\n{text[len(text) - tail:].lstrip()}"
+        tokens = estimate_tokens(cut)
+        if tokens <= max_tokens or keep_chars == 1:
+            return cut
+
+
+class ContextWindow(NamedTuple):
+    """History turns chosen for one prompt."""
+    turns: List[Dict[str, str]]   # Kept turns, oldest first (oversized ones truncated)
+    tokens: int                   # Estimated tokens of the kept turns
+    dropped: int                  # Older turns left out
+    truncated: int                # Kept turns that were cut
+
+
+class ContextBuilder:
+    """
+    Fit conversation history into a token budget, newest turn first.
+
+    Turns are kept contiguously: the first turn that does not fit ends the
+    window, so the model never sees a conversation with a gap in it.
+    """
+
+    def __init__(
+        self,
+        budget: Optional[int] = None,
+        max_message_tokens: Optional[int] = None,
+        min_turns: Optional[int] = None,
+    ):
+        self.budget = settings.CONTEXT_TOKEN_BUDGET if budget is None else budget
+        self.max_message_tokens = settings.CONTEXT_MAX_MESSAGE_TOKENS if max_message_tokens is None else max_message_tokens
+        self.min_turns = settings.CONTEXT_MIN_TURNS if min_turns is None else min_turns
+
+    def truncate(self, text: str) -> str:
+        """Cut one message to CONTEXT_MAX_MESSAGE_TOKENS."""
+        return truncate_text(text or "", self.max_message_tokens)
+
+    def truncate_turn(self, turn: Dict[str, str]) -> Dict[str, str]:
+        content = turn.get("content", "") or ""
+        cut = self.truncate(content)
+        return turn if cut is content else {**turn, "content": cut}
+
+    def fit(self, history: Optional[List[Dict[str, str]]], reserved_tokens: int = 0, budget: Optional[int] = None) -> ContextWindow:
+        """
+        Pick the newest turns that fit in ``budget`` minus ``reserved_tokens``
+        (the system prompt, summary and new message).
+        """
+        history = history or []
+        available = (self.budget if budget is None else budget) - reserved_tokens
+        kept: List[Dict[str, str]] = []
+        used = truncated = 0
+        for turn in reversed(history):
+            fitted = self.truncate_turn(turn)
+            cost = estimate_tokens(fitted.get("content", "")) + MESSAGE_OVERHEAD_TOKENS
+            if len(kept) >= self.min_turns and used + cost > available:
+                break
+            kept.append(fitted)
+            used += cost
+            truncated += fitted is not turn
+        kept.reverse()
+        return ContextWindow(kept, used, len(history) - len(kept), truncated)
+
+    def recent(self, history: Optional[List[Dict[str, str]]]) -> List[Dict[str, str]]:
+        """
+        Turns to send verbatim next to a compression summary (CONTEXT_RECENT_TOKENS).
+
+        Returned as they are; the agent truncates them when it builds the prompt.
+        """
+        history = history or []
+        kept = len(self.fit(history, budget=settings.CONTEXT_RECENT_TOKENS).turns)
+        return history[len(history) - kept:] if kept else []
+
+
+def observe_window(window: ContextWindow) -> None:
+    """Count the turns a history window kept, dropped and truncated."""
+    for outcome, count in (("kept", len(window.turns)), ("dropped", window.dropped), ("truncated", window.truncated)):
+        if count:
+            CONTEXT_TURNS.inc(count, outcome=outcome)
+
+
+def observe_prompt(system: int, summary: int, history: int, message: int) -> None:
+    """Record the estimated token make-up of one agent prompt."""
+    CONTEXT_TOKENS.observe(system, part="system")
+    CONTEXT_TOKENS.observe(summary, part="summary")
+    CONTEXT_TOKENS.observe(history, part="history")
+    CONTEXT_TOKENS.observe(message, part="message")
+    CONTEXT_TOKENS.observe(system + summary + history + message, part="total")
+
+
+# Shared builder configured from settings
+context_builder = ContextBuilder()
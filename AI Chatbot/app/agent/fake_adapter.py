@@ -0,0 +1,289 @@
+"""
+Fake Chat Adapter
+Scripted, offline stand-in for GeminiChatAdapter (LLM_BACKEND=fake).
+
+Only the network is faked: calls still go through the real adapter's
+message conversion, deadline, hedging, circuit breaker, concurrency limit,
+streaming and metrics, so load tests exercise the same code paths as
+production.
+
+Features:
+- Scripted replies: tool calls for diagnosis/ticket requests, a final answer
+  once tool results (or prefetched customer data) are in the prompt
+- Latency drawn from a configurable distribution per route
+  (LLM_FAKE_LATENCY, LLM_FAKE_LIGHT_LATENCY)
+- Injected upstream errors (LLM_FAKE_ERROR_RATE) and a seedable RNG
+  (LLM_FAKE_SEED) for reproducible runs
+- SDK-shaped responses with usage metadata, streamed word by word
+"""
+
+from typing import Any, AsyncIterator, Callable, Dict, List, NamedTuple, Optional, Tuple
+import asyncio
+import random
+import re
+import threading
+import time
+
+from .context_builder import estimate_tokens
+from .gemini_adapter import GeminiChatAdapter
+from .router import DIAGNOSIS_PATTERN
+from ..core.config import settings
+
+
+# Delay between streamed chunks after the first one
+_STREAM_CHUNK_SECONDS = 0.01
+
+_PHONE_PATTERN = re.compile(r"(\+?880\d{10}|\b01\d{9}\b)")
+_ACCOUNT_PATTERN = re.compile(r"\[User Account ID: (\w+)\]")
+_TICKET_PATTERN = re.compile(r"\b(ticket|complain|complaint|technician)\b", re.IGNORECASE)
+
+
+# ==================== LATENCY ====================
+
+class LatencyModel:
+    """
+    Per-call latency distribution, parsed from a spec string (milliseconds):
+
+    - ``fixed:MS``
+    - ``uniform:LOW:HIGH``
+    - ``normal:MEAN:STDDEV`` (clipped at 0)
+    - ``lognormal:MEDIAN:SIGMA`` (long right tail, like real model latency)
+    """
+
+    KINDS = ("fixed", "uniform", "normal", "lognormal")
+
+    def __init__(self, spec: str, rng: random.Random, lock: threading.Lock):
+        kind, _, params = spec.strip().partition(":")
+        self.kind = kind.lower()
+        if self.kind not in self.KINDS:
+            raise ValueError(f"unknown latency distribution {kind!r} (expected one of {', '.join(self.KINDS)})")
+        try:
+            self.params = [float(value) for value in params.split(":")] if params else []
+        except ValueError:
+            raise ValueError(f"invalid latency spec {spec!r}") from None
+        expected = 1 if self.kind == "fixed" else 2
+        if len(self.params) != expected:
+            raise ValueError(f"latency spec {spec!r} needs {expected} value(s)")
+        self.spec = spec
+        self._rng = rng
+        self._lock = lock
+
+    def sample(self) -> float:
+        """Draw one latency in seconds."""
+        with self._lock:
+            if self.kind == "fixed":
+                ms = self.params[0]
+            elif self.kind == "uniform":
+                ms = self._rng.uniform(*self.params)
+            elif self.kind == "normal":
+                ms = self._rng.gauss(*self.params)
+            else:
+                median, sigma = self.params
+                ms = self._rng.lognormvariate(0.0, sigma) * median
+        return max(0.0, ms) / 1000
+
+
+# ==================== SCRIPT ====================
+
+class FakeReply(NamedTuple):
+    """What the fake model answers: text and/or tool calls as (name, args)."""
+    text: str = ""
+    tool_calls: Tuple[Tuple[str, Dict[str, Any]], ...] = ()
+
+
+FakeScript = Callable[[str, str], FakeReply]
+
+
+def default_script(message: str, route: str) -> FakeReply:
+    """
+    ISP support conversation: look up the account and connection for problem
+    reports, open a ticket when asked, then answer from the tool results.
+
+    Args:
+        message: The last message of the conversation (user text or tool result)
+        route: Adapter route (light / full / summary)
+    """
+    if route == "summary":
+        return FakeReply("Customer reported a connectivity problem; account and connection were checked.")
+    if message.startswith("Tool result"):
+        if "Ticket" in message or "ticket" in message:
+            return FakeReply("I've opened a support ticket for you. Our team will contact you soon.")
+        return FakeReply(
+            "I checked your account and connection. Your router is reachable; "
+            "please restart it once and let me know if the problem continues."
+        )
+
+    # Prefetched customer data comes before the user's own text
+    prefetched = "already looked up" in message
+    user_text = message.rsplit("\n\n", 1)[-1] if prefetched else message
+    phone = _PHONE_PATTERN.search(message)
+    account = _ACCOUNT_PATTERN.search(message)
+    identifier = phone.group(1) if phone else (account.group(1) if account else None)
+    if _TICKET_PATTERN.search(user_text):
+        return FakeReply(tool_calls=(("OpenTicketTool", {"issue_description": user_text[-200:]}),))
+    if DIAGNOSIS_PATTERN.search(user_text) and prefetched:
+        return FakeReply(
+            "Thanks! I can see your account and connection details. Your router is reachable; "
+            "please restart it once and let me know if the problem continues."
+        )
+    if DIAGNOSIS_PATTERN.search(user_text) and identifier:
+        calls: List[Tuple[str, Dict[str, Any]]] = []
+        if phone:
+            calls.append(("GetUserAccountTool", {"phone": identifier}))
+        calls.append(("ConnectionStatusTool", {"phone_or_account_id": identifier}))
+        return FakeReply(tool_calls=tuple(calls))
+    if DIAGNOSIS_PATTERN.search(user_text):
+        return FakeReply("Sorry to hear that! Could you share the phone number on your account so I can check?")
+    return FakeReply("Hello! I'm your ISP support assistant. How can I help with your internet today?")
+
+
+# ==================== SDK-SHAPED RESPONSES ====================
+
+class _TextPart:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class _FunctionCall:
+    def __init__(self, name: str, args: Dict[str, Any]):
+        self.name = name
+        self.args = args
+
+
+class _CallPart:
+    def __init__(self, name: str, args: Dict[str, Any]):
+        self.function_call = _FunctionCall(name, args)
+
+
+class _Usage:
+    def __init__(self, prompt_tokens: int, output_tokens: int):
+        self.prompt_token_count = prompt_tokens
+        self.candidates_token_count = output_tokens
+
+
+class _Content:
+    def __init__(self, parts: List[Any]):
+        self.parts = parts
+
+
+class _Candidate:
+    def __init__(self, parts: List[Any]):
+        self.content = _Content(parts)
+
+
+class _Response:
+    def __init__(self, parts: List[Any], usage: Optional[_Usage] = None):
+        self.candidates = [_Candidate(parts)]
+        self.usage_metadata = usage
+
+
+class _Stream:
+    """Async iterator of response chunks: tool calls first, then the text word by word."""
+
+    def __init__(self, reply: FakeReply, usage: _Usage):
+        self._reply = reply
+        self._usage = usage
+
+    def __aiter__(self) -> AsyncIterator[_Response]:
+        return self._chunks()
+
+    async def _chunks(self) -> AsyncIterator[_Response]:
+        chunks: List[List[Any]] = [[_CallPart(name, dict(args))] for name, args in self._reply.tool_calls]
+        words = self._reply.text.split(" ") if self._reply.text else []
+        chunks += [[_TextPart(word + (" " if i < len(words) - 1 else ""))] for i, word in enumerate(words)]
+        for index, parts in enumerate(chunks):
+            if index:
+                await asyncio.sleep(_STREAM_CHUNK_SECONDS)
+            # Usage metadata is cumulative; the last chunk carries the totals
+            yield _Response(parts, self._usage if index == len(chunks) - 1 else None)
+
+
+class _FakeChat:
+    def __init__(self, adapter: "FakeChatAdapter", history: List[dict]):
+        self._adapter = adapter
+        self._history = history
+
+    def send_message(self, message: str, generation_config: Any = None) -> _Response:
+        reply, usage, delay = self._adapter._plan_reply(self._history, message)
+        time.sleep(delay)
+        self._adapter._maybe_fail()
+        return _Response(_parts(reply), usage)
+
+    async def send_message_async(self, message: str, generation_config: Any = None, stream: bool = False) -> Any:
+        reply, usage, delay = self._adapter._plan_reply(self._history, message)
+        await asyncio.sleep(delay)
+        self._adapter._maybe_fail()
+        if stream:
+            return _Stream(reply, usage)
+        return _Response(_parts(reply), usage)
+
+
+class _FakeModel:
+    def __init__(self, adapter: "FakeChatAdapter"):
+        self._adapter = adapter
+
+    def start_chat(self, history: Optional[List[dict]] = None) -> _FakeChat:
+        return _FakeChat(self._adapter, history or [])
+
+
+def _parts(reply: FakeReply) -> List[Any]:
+    parts: List[Any] = [_CallPart(name, dict(args)) for name, args in reply.tool_calls]
+    if reply.text:
+        parts.append(_TextPart(reply.text))
+    return parts
+
+
+# ==================== ADAPTER ====================
+
+# One RNG for every fake adapter so LLM_FAKE_SEED makes a whole run reproducible
+_rng = random.Random(settings.LLM_FAKE_SEED)
+_rng_lock = threading.Lock()
+
+
+class FakeChatAdapter(GeminiChatAdapter):
+    """
+    GeminiChatAdapter whose model is a local script with simulated latency.
+
+    ``script`` maps (last message, route) to a FakeReply (default_script if
+    omitted); ``latency`` is a LatencyModel spec overriding the settings.
+    """
+
+    def __init__(
+        self,
+        model: str = "fake",
+        temperature: float = 0.0,
+        api_key: Optional[str] = None,
+        max_tokens: int = 1000,
+        route: str = "full",
+        script: Optional[FakeScript] = None,
+        latency: Optional[str] = None,
+        error_rate: Optional[float] = None,
+    ):
+        super().__init__(model=model, temperature=temperature, api_key=api_key, max_tokens=max_tokens, route=route)
+        self.script = script or default_script
+        spec = latency or (settings.LLM_FAKE_LIGHT_LATENCY if route == "light" else settings.LLM_FAKE_LATENCY)
+        self.latency = LatencyModel(spec, _rng, _rng_lock)
+        self.error_rate = settings.LLM_FAKE_ERROR_RATE if error_rate is None else error_rate
+
+    def _configure_sdk(self) -> None:
+        pass
+
+    def _backend_available(self) -> bool:
+        return True
+
+    def _get_model(self, system_instruction: str) -> Any:
+        return _FakeModel(self)
+
+    def _plan_reply(self, history: List[dict], message: str) -> Tuple[FakeReply, _Usage, float]:
+        reply = self.script(str(message), self.route)
+        prompt = "".join(str(part) for entry in history for part in entry.get("parts", [])) + str(message)
+        output = reply.text + "".join(f"{name}{args}" for name, args in reply.tool_calls)
+        return reply, _Usage(estimate_tokens(prompt), estimate_tokens(output)), self.latency.sample()
+
+    def _maybe_fail(self) -> None:
+        if self.error_rate <= 0:
+            return
+        with _rng_lock:
+            failed = _rng.random() < self.error_rate
+        if failed:
+            raise RuntimeError("fake upstream error")
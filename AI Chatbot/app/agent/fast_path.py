@@ -0,0 +1,246 @@
+"""
+Intent Fast Path
+Answers simple account/billing/connection lookups without calling the LLM.
+
+A message is answered here only when:
+- the caller's phone number resolves to an account, and
+- exactly one lookup intent matches with high confidence (short message,
+  no problem report, request for action or question about "why").
+
+Everything else falls through to the agent. Replies are templated in
+English and Bengali (chosen by the script of the message).
+"""
+
+from typing import Callable, Dict, List, Optional, Pattern, Tuple
+import re
+import threading
+
+from ..core.config import settings
+from ..core.metrics import stage
+from ..database import (
+    acheck_connection_status,
+    aget_user_account,
+    check_connection_status,
+    get_user_account,
+    normalize_phone,
+)
+
+
+# ==================== INTENTS ====================
+
+_INTENT_PATTERNS: Dict[str, List[Pattern]] = {
+    "balance": [
+        re.compile(r"\b(bill|balance|dues?|outstanding)\b|\bhow much (do )?i owe\b", re.I),
+        re.compile(r"বিল|ব্যালেন্স|বকেয়া|বাকি টাকা"),
+    ],
+    "account_status": [
+        re.compile(r"\baccount\b.{0,20}\b(status|active|activated|suspended)\b", re.I),
+        re.compile(r"\bis my account\b", re.I),
+        re.compile(r"(অ্যাকাউন্ট|একাউন্ট).{0,20}(সক্রিয়|চালু|স্ট্যাটাস|অবস্থা)"),
+    ],
+    "plan": [
+        re.compile(r"\b(my|current|which|what) (internet )?(plan|package)\b", re.I),
+        re.compile(r"প্যাকেজ|প্ল্যান"),
+    ],
+    "connection": [
+        re.compile(r"\b(check|show)\b.{0,20}\b(connection|internet|router)\b", re.I),
+        re.compile(r"\b(connection|internet|router) status\b", re.I),
+        re.compile(r"\bis my (internet|connection|router) (online|up)\b", re.I),
+        re.compile(r"(সংযোগ|কানেকশন|ইন্টারনেট|রাউটার).{0,20}(চেক|স্ট্যাটাস|অবস্থা)"),
+    ],
+}
+
+# Problem reports, requests for action, "why" and multi-part questions need the agent
+_AGENT_ONLY = [
+    re.compile(
+        r"\b(and|also|why|not|no|never|slow|down|broken|problem|issue|error|fix|ticket|complain"
+        r"|cannot|can'?t|won'?t|doesn'?t|isn'?t|disconnect\w*|change|upgrade|downgrade"
+        r"|cancel|refund|recharge|technician|how (do|can|to))\b",
+        re.I,
+    ),
+    re.compile(r"এবং|কেন|সমস্যা|না চল|কাজ করছে না|করছে না|স্লো|ধীর|টিকেট|টিকিট|পরিবর্তন|বাতিল|কিভাবে|কীভাবে"),
+]
+
+_MAX_WORDS = 12
+_BENGALI = re.compile(r"[ঀ-৿]")
+
+
+def detect_intent(message: str) -> Optional[str]:
+    """Return the single high-confidence lookup intent of ``message``, or None."""
+    text = message.strip()
+    if not text or len(text.split()) > _MAX_WORDS:
+        return None
+    if any(pattern.search(text) for pattern in _AGENT_ONLY):
+        return None
+    intents = [
+        intent for intent, patterns in _INTENT_PATTERNS.items()
+        if any(pattern.search(text) for pattern in patterns)
+    ]
+    return intents[0] if len(intents) == 1 else None
+
+
+def detect_language(message: str) -> str:
+    return "bn" if _BENGALI.search(message) else "en"
+
+
+# ==================== TEMPLATES ====================
+
+def _money(amount: float) -> str:
+    """Amount due, always shown as a positive figure."""
+    return f"{abs(amount):,.2f}"
+
+
+def _balance_reply(account: Dict, lang: str) -> str:
+    balance = float(account.get("balance") or 0)
+    if lang == "bn":
+        reply = f"হ্যালো {account['name']}! আপনার বর্তমান ব্যালেন্স {balance:,.2f} টাকা।"
+        if balance < 0:
+            return reply + f" আপনার {_money(balance)} টাকা বকেয়া আছে। সেবা সচল রাখতে অনুগ্রহ করে পরিশোধ করুন।"
+        return reply + " আপনার কোনো বকেয়া নেই।"
+    reply = f"Hi {account['name']}! Your current balance is {balance:,.2f} BDT."
+    if balance < 0:
+        return reply + f" You have an outstanding due of {_money(balance)} BDT. Please pay it to keep your service active."
+    return reply + " You have no outstanding dues."
+
+
+def _account_status_reply(account: Dict, lang: str) -> str:
+    status = account.get("status") or "Unknown"
+    suspended = status.lower() == "suspended"
+    balance = float(account.get("balance") or 0)
+    if lang == "bn":
+        state = "স্থগিত" if suspended else ("সক্রিয়" if status.lower() == "active" else status)
+        reply = f"হ্যালো {account['name']}! আপনার অ্যাকাউন্ট ({account['account_id']}) বর্তমানে {state}। প্যাকেজ: {account['plan']}।"
+        if suspended and balance < 0:
+            reply += f" {_money(balance)} টাকা বকেয়া পরিশোধ করলে অ্যাকাউন্টটি আবার চালু হবে।"
+        return reply
+    reply = f"Hi {account['name']}! Your account ({account['account_id']}) is {status} on the {account['plan']} plan."
+    if suspended and balance < 0:
+        reply += f" Paying the outstanding {_money(balance)} BDT will reactivate it."
+    return reply
+
+
+def _plan_reply(account: Dict, lang: str) -> str:
+    if lang == "bn":
+        return f"হ্যালো {account['name']}! আপনার বর্তমান প্যাকেজ হলো {account['plan']}।"
+    return f"Hi {account['name']}! You're on the {account['plan']} plan."
+
+
+def _connection_reply(account: Dict, connection: Optional[Dict], lang: str) -> Optional[str]:
+    if not connection:
+        return None
+    issues = connection.get("issues") or []
+    if lang == "bn":
+        if connection.get("is_online"):
+            reply = (f"আপনার সংযোগ অনলাইনে আছে ✓ রাউটার: {connection.get('router_status')}, "
+                     f"সিগন্যাল: {connection.get('signal_strength')}, "
+                     f"স্পিড: {connection.get('download_speed')}/{connection.get('upload_speed')} Mbps।")
+        else:
+            reply = (f"আপনার সংযোগ এখন অফলাইনে আছে। রাউটার: {connection.get('router_status')}, "
+                     f"সর্বশেষ অনলাইন: {connection.get('last_online')}।")
+        if issues:
+            reply += " শনাক্ত সমস্যা: " + ", ".join(issues) + "।"
+        if not connection.get("is_online"):
+            reply += " চাইলে আমি আপনার জন্য একটি সাপোর্ট টিকেট খুলে দিতে পারি।"
+        return reply
+
+    if connection.get("is_online"):
+        reply = (f"Your connection is online ✓ Router: {connection.get('router_status')}, "
+                 f"signal: {connection.get('signal_strength')}, "
+                 f"speed: {connection.get('download_speed')}/{connection.get('upload_speed')} Mbps.")
+    else:
+        reply = (f"Your connection is currently offline. Router: {connection.get('router_status')}, "
+                 f"last online: {connection.get('last_online')}.")
+    if issues:
+        reply += " Detected issues: " + ", ".join(issues) + "."
+    if not connection.get("is_online"):
+        reply += " If you'd like, I can open a support ticket for you."
+    return reply
+
+
+_ACCOUNT_TEMPLATES: Dict[str, Callable[[Dict, str], str]] = {
+    "balance": _balance_reply,
+    "account_status": _account_status_reply,
+    "plan": _plan_reply,
+}
+
+
+# ==================== FAST PATH ====================
+
+class FastPath:
+    """
+    Deterministic answers for lookup intents, with hit-rate counters.
+
+    ``requests`` counts messages offered to the fast path, ``hits`` the ones
+    it answered; everything else is a miss handled by the agent.
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.requests = 0
+        self.hits = 0
+        self.by_intent: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def answer(self, message: str, phone_number: Optional[str]) -> Optional[str]:
+        """Return a templated reply, or None to fall back to the agent."""
+        intent, phone = self._plan(message, phone_number)
+        reply = None
+        if intent is not None:
+            with stage("fast_path"):
+                account = get_user_account(phone)
+                connection = None
+                if account is not None and intent == "connection":
+                    connection = check_connection_status(account["account_id"])
+                reply = self._render(intent, message, account, connection)
+        return self._record(intent, reply)
+
+    async def aanswer(self, message: str, phone_number: Optional[str]) -> Optional[str]:
+        """Async version of answer()."""
+        intent, phone = self._plan(message, phone_number)
+        reply = None
+        if intent is not None:
+            with stage("fast_path"):
+                account = await aget_user_account(phone)
+                connection = None
+                if account is not None and intent == "connection":
+                    connection = await acheck_connection_status(account["account_id"])
+                reply = self._render(intent, message, account, connection)
+        return self._record(intent, reply)
+
+    def stats(self) -> Dict:
+        return {
+            "requests": self.requests,
+            "hits": self.hits,
+            "misses": self.requests - self.hits,
+            "hit_rate": round(self.hits / self.requests, 4) if self.requests else 0.0,
+            "by_intent": dict(self.by_intent),
+        }
+
+    # ---------------------------------------------------------
+    # Internals
+    # ---------------------------------------------------------
+    def _plan(self, message: str, phone_number: Optional[str]) -> Tuple[Optional[str], Optional[str]]:
+        if not self.enabled or not phone_number:
+            return None, None
+        with self._lock:
+            self.requests += 1
+        return detect_intent(message), normalize_phone(phone_number)
+
+    def _render(self, intent: str, message: str, account: Optional[Dict], connection: Optional[Dict]) -> Optional[str]:
+        if account is None:
+            return None
+        lang = detect_language(message)
+        if intent == "connection":
+            return _connection_reply(account, connection, lang)
+        return _ACCOUNT_TEMPLATES[intent](account, lang)
+
+    def _record(self, intent: Optional[str], reply: Optional[str]) -> Optional[str]:
+        if reply is not None:
+            with self._lock:
+                self.hits += 1
+                self.by_intent[intent] = self.by_intent.get(intent, 0) + 1
+        return reply
+
+
+# Global fast path
+fast_path = FastPath(enabled=settings.FAST_PATH_ENABLED)
@@ -5,50 +5,354 @@ Provides a minimal compatible surface used by the agent:
 - constructor(model, temperature, api_key, max_tokens)
 - bind_tools(tools_list) -> self
 - invoke(messages) -> ResponseShim (with .content and .tool_calls)
-- ainvoke(messages) -> async wrapper around invoke
+- ainvoke(messages) -> native async call (SDK async path), bounded by a semaphore
+  shared by every adapter in the process (see upstream_concurrency())
+- astream(messages) -> async iterator of ResponseShim chunks (streaming API)
+
+Every call records its latency and token usage under the adapter's ``route``
+label (see app.agent.router). Calls have a deadline (LLM_TIMEOUT_SECONDS), are
+hedged after the observed p95 latency, and go through a per-model circuit
+breaker that answers with a deterministic fallback while the upstream is down.
 
 This adapter uses `google.generativeai` (google-generativeai) when available
 and falls back to a simple local echo if the package is not installed during development.
+The SDK is imported on first use, not when this module is imported.
+
+create_chat_adapter() builds the adapter for the configured LLM_BACKEND
+("gemini", or "fake" for offline benchmarks; see app.agent.fake_adapter).
+With LLM_CASSETTE_MODE set, model exchanges are recorded to or replayed from a
+cassette file (see app.agent.cassette).
 """
 
-from typing import List, Any, Optional, Dict
+from typing import List, Any, Optional, Dict, Tuple, AsyncIterator
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
 import asyncio
 import os
+import threading
+import time
+import weakref
+
+from .context_builder import estimate_tokens
+from ..core.cache import TTLCache
+from ..core.config import settings
+from ..core.log import get_logger
+from ..core.metrics import STAGE_SECONDS, metrics
+from ..core.request_context import current_request
+from ..core.resilience import CircuitBreaker, acall_hedged, call_hedged, hedge_delay
+
+log = get_logger(__name__)
+
+# google.generativeai is the slowest import of the app; it is loaded by
+# _load_genai() when the first adapter is built (during API startup).
+genai = None
+_HAS_GENAI: Optional[bool] = None
+_GENAI_LOCK = threading.Lock()
+
+
+def _load_genai() -> bool:
+    """Import google.generativeai once; returns whether it is available."""
+    global genai, _HAS_GENAI
+    if _HAS_GENAI is None:
+        with _GENAI_LOCK:
+            if _HAS_GENAI is None:
+                try:
+                    import google.generativeai as sdk  # type: ignore
+                    genai = sdk
+                    _HAS_GENAI = True
+                except Exception:
+                    _HAS_GENAI = False
+    return _HAS_GENAI
+
+
+# Compiled tool declarations keyed by tool set, and GenerativeModel objects keyed
+# by (model name, system instruction, tool set). Both are shared by every adapter
+# instance so the agent and the compressor reuse the same compiled objects.
+_TOOL_DECLARATION_CACHE = TTLCache(maxsize=settings.MODEL_CACHE_SIZE)
+_MODEL_CACHE = TTLCache(maxsize=settings.MODEL_CACHE_SIZE)
+
+
+# Per-route call metrics (route = light / full / summary)
+LLM_REQUEST_SECONDS = metrics.histogram(
+    "llm_request_seconds", "Model call latency in seconds", ("route", "model"),
+)
+LLM_REQUESTS = metrics.counter(
+    "llm_requests_total", "Model calls by outcome", ("route", "model", "outcome"),
+)
+LLM_TOKENS = metrics.counter(
+    "llm_tokens_total", "Model tokens by direction (input/output)", ("route", "model", "direction"),
+)
+# Latency of single attempts (primary or hedge); drives the hedge delay
+LLM_ATTEMPT_SECONDS = metrics.histogram(
+    "llm_attempt_seconds", "Latency of individual model attempts in seconds", ("route", "model"),
+)
+LLM_HEDGES = metrics.counter(
+    "llm_hedges_total", "Extra attempts (hedges and retries) launched, and how many won", ("route", "model", "outcome"),
+)
+# Canned replies sent instead of a model answer (also counted by the agent)
+FALLBACK_RESPONSES = metrics.counter(
+    "fallback_responses_total", "Canned replies sent instead of a model answer", ("reason",),
+)
+
+
+# One circuit breaker per upstream model, shared by every adapter using it
+_BREAKERS: Dict[str, CircuitBreaker] = {}
+_BREAKERS_LOCK = threading.Lock()
+
+
+def _breaker_for(model: str) -> CircuitBreaker:
+    breaker = _BREAKERS.get(model)
+    if breaker is None:
+        with _BREAKERS_LOCK:
+            breaker = _BREAKERS.get(model)
+            if breaker is None:
+                breaker = _BREAKERS[model] = CircuitBreaker(
+                    name=model,
+                    failure_threshold=settings.LLM_BREAKER_FAILURES,
+                    reset_timeout=settings.LLM_BREAKER_RESET_SECONDS,
+                )
+    return breaker
+
+
+def breaker_stats() -> Dict[str, Dict[str, Any]]:
+    """State of every model's circuit breaker."""
+    return {name: breaker.stats() for name, breaker in list(_BREAKERS.items())}
+
+
+def _active_cassette() -> Any:
+    """The record/replay cassette when LLM_CASSETTE_MODE is set, else None."""
+    if settings.LLM_CASSETTE_MODE == "off":
+        return None
+    from .cassette import get_cassette
+    return get_cassette()
+
+
+def _counts_toward_breaker(error: BaseException) -> bool:
+    """Whether ``error`` says something about the upstream's health."""
+    if settings.LLM_CASSETTE_MODE != "replay":
+        return True
+    # A request missing from a replayed cassette never reached the upstream
+    from .cassette import CassetteMiss
+    return not isinstance(error, CassetteMiss)
+
+
+_EXECUTOR: Optional[ThreadPoolExecutor] = None
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    """Dedicated pool for blocking SDK calls, kept off the loop's default executor."""
+    global _EXECUTOR
+    if _EXECUTOR is None:
+        _EXECUTOR = ThreadPoolExecutor(
+            max_workers=settings.LLM_EXECUTOR_WORKERS,
+            thread_name_prefix="gemini",
+        )
+    return _EXECUTOR
+
+
+# One LLM_MAX_CONCURRENCY gate per event loop, shared by all routes (light/full/summary)
+_SEMAPHORES: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+_CONCURRENCY = {"in_flight": 0, "queued": 0}
+
+
+def _get_semaphore() -> asyncio.Semaphore:
+    """Concurrency gate for upstream calls on the running loop, created on first use."""
+    loop = asyncio.get_running_loop()
+    semaphore = _SEMAPHORES.get(loop)
+    if semaphore is None:
+        semaphore = _SEMAPHORES[loop] = asyncio.Semaphore(settings.LLM_MAX_CONCURRENCY)
+    return semaphore
+
+
+@asynccontextmanager
+async def _upstream_slot() -> AsyncIterator[None]:
+    """Hold one of the LLM_MAX_CONCURRENCY upstream slots for the duration of a call."""
+    semaphore = _get_semaphore()
+    _CONCURRENCY["queued"] += 1
+    try:
+        await semaphore.acquire()
+    finally:
+        _CONCURRENCY["queued"] -= 1
+
+    _CONCURRENCY["in_flight"] += 1
+    try:
+        yield
+    finally:
+        _CONCURRENCY["in_flight"] -= 1
+        semaphore.release()
 
-try:
-    import google.generativeai as genai  # type: ignore
-    _HAS_GENAI = True
-except Exception:
-    genai = None
-    _HAS_GENAI = False
+
+def upstream_concurrency() -> Dict[str, int]:
+    """Report in-flight upstream calls and queue depth (calls waiting for a slot) across all adapters."""
+    return {"limit": settings.LLM_MAX_CONCURRENCY, **_CONCURRENCY}
+
+
+def _tool_set_key(tools: List[Any]) -> Tuple[Tuple[str, str], ...]:
+    """Build a hashable key identifying a list of bound tools."""
+    return tuple(
+        (
+            tool.name if hasattr(tool, "name") else tool.__class__.__name__,
+            tool.description if hasattr(tool, "description") else "",
+        )
+        for tool in tools
+    )
+
+
+def _compile_tool_declarations(tools: List[Any]) -> Optional[List[Any]]:
+    """Convert LangChain tools into a Gemini ``glm.Tool`` list."""
+    if not tools or not _load_genai():
+        return None
+
+    from google.ai import generativelanguage as glm
+
+    tool_declarations = []
+    for tool in tools:
+        # The tool is already an instance (StructuredTool from @tool decorator)
+        tool_name = tool.name if hasattr(tool, 'name') else tool.__class__.__name__
+        tool_description = tool.description if hasattr(tool, 'description') else "Tool function"
+
+        # Extract parameters from the tool's args_schema
+        parameters = {}
+        required_params = []
+
+        if hasattr(tool, 'args_schema') and tool.args_schema:
+            try:
+                schema_provider = getattr(tool.args_schema, "model_json_schema", None)
+                schema_dict = schema_provider() if schema_provider else tool.args_schema.schema()
+                props = schema_dict.get('properties', {})
+                required_params = schema_dict.get('required', [])
+
+                # Convert each property to Gemini format
+                for prop_name, prop_schema in props.items():
+                    prop_type = prop_schema.get('type', 'string')
+                    prop_desc = prop_schema.get('description', '')
+
+                    # Map JSON schema types to Gemini types
+                    if prop_type == 'string':
+                        type_val = glm.Type.STRING
+                    elif prop_type == 'integer':
+                        type_val = glm.Type.INTEGER
+                    elif prop_type == 'number':
+                        type_val = glm.Type.NUMBER
+                    elif prop_type == 'boolean':
+                        type_val = glm.Type.BOOLEAN
+                    else:
+                        type_val = glm.Type.STRING
+
+                    parameters[prop_name] = glm.Schema(
+                        type=type_val,
+                        description=prop_desc
+                    )
+            except Exception as e:
+                log.warning("tool_schema_error", tool=tool_name, error=str(e))
+
+        tool_declarations.append(
+            glm.FunctionDeclaration(
+                name=tool_name,
+                description=tool_description,
+                parameters=glm.Schema(
+                    type=glm.Type.OBJECT,
+                    properties=parameters,
+                    required=required_params
+                )
+            )
+        )
+
+    log.debug("tools_compiled", tools=[decl.name for decl in tool_declarations])
+    return [glm.Tool(function_declarations=tool_declarations)]
+
+
+class StreamInterrupted(RuntimeError):
+    """A streamed reply failed after part of it was already yielded."""
 
 
 class ResponseShim:
-    def __init__(self, content: str, tool_calls: Optional[List[dict]] = None):
+    def __init__(
+        self,
+        content: str,
+        tool_calls: Optional[List[dict]] = None,
+        usage: Optional[Dict[str, int]] = None,
+        fallback: Optional[str] = None,
+    ):
         self.content = content
         self.tool_calls = tool_calls or []
+        # {"input_tokens": n, "output_tokens": n} when the SDK reports usage
+        self.usage = usage
+        # Reason when this is a canned reply instead of model output (llm_error, llm_unavailable, ...)
+        self.fallback = fallback
+
+
+def _usage_of(response: Any) -> Optional[Dict[str, int]]:
+    """Token usage reported by the SDK (usage_metadata), if any."""
+    meta = getattr(response, "usage_metadata", None)
+    if meta is None:
+        return None
+    prompt = getattr(meta, "prompt_token_count", None)
+    output = getattr(meta, "candidates_token_count", None)
+    if prompt is None and output is None:
+        return None
+    return {"input_tokens": int(prompt or 0), "output_tokens": int(output or 0)}
 
 
 class GeminiChatAdapter:
-    def __init__(self, model: str = "gemini-2.5-flash", temperature: float = 0.0, api_key: Optional[str] = None, max_tokens: int = 1000):
+    def __init__(
+        self,
+        model: str = "gemini-2.5-flash",
+        temperature: float = 0.0,
+        api_key: Optional[str] = None,
+        max_tokens: int = 1000,
+        route: str = "full",
+    ):
         self.model = model
         self.temperature = temperature
         self.api_key = api_key or os.getenv("GEMINI_API_KEY")
         self.max_tokens = max_tokens
+        self.route = route
+        self._breaker = _breaker_for(model)
         self._tools = []
+        self._tool_key: Tuple[Tuple[str, str], ...] = ()
+        self._compiled_tools: Optional[List[Any]] = None
+        self._configure_sdk()
 
-        if _HAS_GENAI and self.api_key:
+    def _configure_sdk(self) -> None:
+        if self.api_key and _load_genai():
             try:
                 genai.configure(api_key=self.api_key)
             except Exception:
                 # If ADC (service account) is used, genai will pick up credentials from env
                 pass
 
+    def _backend_available(self) -> bool:
+        """Whether calls can reach a model (False = answer with the offline fallback)."""
+        return settings.LLM_CASSETTE_MODE == "replay" or _load_genai()
+
     def bind_tools(self, tools_list: List[Any]):
         # Keep the API compatible with ChatOpenAI.bind_tools
         self._tools = list(tools_list)
+        self._tool_key = _tool_set_key(self._tools)
+
+        # Compile the function declarations once per tool set, not per call
+        compiled = _TOOL_DECLARATION_CACHE.get(self._tool_key)
+        if compiled is None:
+            compiled = _compile_tool_declarations(self._tools)
+            if compiled is not None:
+                _TOOL_DECLARATION_CACHE.set(self._tool_key, compiled)
+        self._compiled_tools = compiled
         return self
 
+    def _get_model(self, system_instruction: str) -> Any:
+        """Return a cached GenerativeModel for this model, instruction and tool set."""
+        key = (self.model, system_instruction, self._tool_key)
+        model = _MODEL_CACHE.get(key)
+        if model is None:
+            model = genai.GenerativeModel(
+                self.model,
+                system_instruction=system_instruction if system_instruction else None,
+                tools=self._compiled_tools
+            )
+            _MODEL_CACHE.set(key, model)
+        return model
+
     def _convert_messages(self, messages: List[Any]) -> List[dict]:
         converted: List[Dict[str, Any]] = []
         for m in messages:
@@ -78,199 +382,404 @@ class GeminiChatAdapter:
             else:
                 safe_role = "user"
 
-            converted.append({"role": safe_role, "content": content})
+            converted.append({
+                "role": safe_role,
+                "content": content,
+                "tool_calls": getattr(m, "tool_calls", None) or [],
+            })
         return converted
 
-    def invoke(self, messages: List[Any]) -> ResponseShim:
-        """Invoke Gemini model with proper Google Generative AI SDK and tool calling support."""
-        try:
-            print(f"[DEBUG] invoke() called with {len(messages)} messages, {len(self._tools)} tools")
-            converted = self._convert_messages(messages)
-            
-            if not _HAS_GENAI:
-                return ResponseShim(
-                    content="I'm your ISP support assistant! How can I help with your internet today?",
-                    tool_calls=[]
-                )
-            
-            # Separate system and chat messages
-            system_instruction_parts: List[str] = []
-            chat_history = []
-            
-            for msg in converted:
-                role = msg.get("role", "user")
-                content = (msg.get("content", "") or "").strip()
-                
-                if role == "system":
-                    if content:
-                        system_instruction_parts.append(content)
-                elif role == "user":
-                    chat_history.append({"role": "user", "parts": [content]})
-                elif role == "assistant":
-                    chat_history.append({"role": "model", "parts": [content]})
-                elif role == "tool":
-                    tool_text = content or "(empty tool output)"
-                    chat_history.append({"role": "user", "parts": [f"Tool result:\n{tool_text}"]})
-
-            system_instruction = "\n\n".join(system_instruction_parts)
-            
-            # Convert tools to Gemini function declarations using genai.protos types
-            from google.ai import generativelanguage as glm
+    def _prepare_request(self, messages: List[Any]) -> Tuple[Any, List[dict], str, Dict[str, Any]]:
+        """Split messages into (model, chat history, last message, generation config)."""
+        converted = self._convert_messages(messages)
+
+        # Separate system and chat messages
+        system_instruction_parts: List[str] = []
+        chat_history = []
+        
+        for msg in converted:
+            role = msg.get("role", "user")
+            content = (msg.get("content", "") or "").strip()
             
-            tool_declarations = []
-            if self._tools:
-                for tool in self._tools:
-                    # The tool is already an instance (StructuredTool from @tool decorator)
-                    tool_name = tool.name if hasattr(tool, 'name') else tool.__class__.__name__
-                    tool_description = tool.description if hasattr(tool, 'description') else "Tool function"
-                    
-                    print(f"[DEBUG] Processing tool: {tool_name}")
-                    
-                    # Extract parameters from the tool's args_schema
-                    parameters = {}
-                    required_params = []
-                    
-                    if hasattr(tool, 'args_schema') and tool.args_schema:
-                        try:
-                            schema_provider = getattr(tool.args_schema, "model_json_schema", None)
-                            schema_dict = schema_provider() if schema_provider else tool.args_schema.schema()
-                            props = schema_dict.get('properties', {})
-                            required_params = schema_dict.get('required', [])
-                            
-                            print(f"[DEBUG] Tool {tool_name} properties: {props.keys()}")
-                            
-                            # Convert each property to Gemini format
-                            for prop_name, prop_schema in props.items():
-                                prop_type = prop_schema.get('type', 'string')
-                                prop_desc = prop_schema.get('description', '')
-                                
-                                # Map JSON schema types to Gemini types
-                                if prop_type == 'string':
-                                    type_val = glm.Type.STRING
-                                elif prop_type == 'integer':
-                                    type_val = glm.Type.INTEGER
-                                elif prop_type == 'number':
-                                    type_val = glm.Type.NUMBER
-                                elif prop_type == 'boolean':
-                                    type_val = glm.Type.BOOLEAN
-                                else:
-                                    type_val = glm.Type.STRING
-                                
-                                parameters[prop_name] = glm.Schema(
-                                    type=type_val,
-                                    description=prop_desc
-                                )
-                        except Exception as e:
-                            print(f"Error extracting schema for {tool_name}: {e}")
-                    
-                    # Create FunctionDeclaration
-                    func_decl = glm.FunctionDeclaration(
-                        name=tool_name,
-                        description=tool_description,
-                        parameters=glm.Schema(
-                            type=glm.Type.OBJECT,
-                            properties=parameters,
-                            required=required_params
-                        )
+            if role == "system":
+                if content:
+                    system_instruction_parts.append(content)
+            elif role == "user":
+                chat_history.append({"role": "user", "parts": [content]})
+            elif role == "assistant":
+                if not content and msg.get("tool_calls"):
+                    # Gemini rejects empty parts; describe the requested tool calls instead
+                    content = "\n".join(
+                        f"(calling {call.get('name')} with {call.get('args', {})})"
+                        for call in msg["tool_calls"]
                     )
-                    tool_declarations.append(func_decl)
+                chat_history.append({"role": "model", "parts": [content or "(no content)"]})
+            elif role == "tool":
+                tool_text = content or "(empty tool output)"
+                chat_history.append({"role": "user", "parts": [f"Tool result:\n{tool_text}"]})
 
-            tools_list = [glm.Tool(function_declarations=tool_declarations)] if tool_declarations else None
-            if tools_list:
-                decl_names = [decl.name for decl in tool_declarations]
-                print(f"[DEBUG] Tools list: {decl_names}")
-            else:
-                print("[DEBUG] Tools list: None")
-            
-            # Create model with system instruction and tools
-            model = genai.GenerativeModel(
-                self.model,
-                system_instruction=system_instruction if system_instruction else None,
-                tools=tools_list
+        system_instruction = "\n\n".join(system_instruction_parts)
+        
+        cassette = _active_cassette()
+        if cassette is None:
+            # Reuse the cached model for this (model, system instruction, tool set)
+            model = self._get_model(system_instruction)
+        else:
+            model = cassette.wrap(self, system_instruction)
+        
+        generation_config = {
+            "temperature": self.temperature,
+            "max_output_tokens": self.max_tokens,
+        }
+
+        history = chat_history[:-1] if len(chat_history) > 1 else []
+        last_message = chat_history[-1]["parts"][0] if chat_history else "Hello"
+        return model, history, last_message, generation_config
+
+    def _extract_parts(self, response: Any) -> Tuple[str, List[dict]]:
+        """Extract text and tool calls from a Gemini response (or stream chunk)."""
+        text = ""
+        tool_calls = []
+        
+        if hasattr(response, 'candidates') and response.candidates:
+            candidate = response.candidates[0]
+            if hasattr(candidate, 'content') and hasattr(candidate.content, 'parts'):
+                for part in candidate.content.parts:
+                    # Check for function calls
+                    if hasattr(part, 'function_call'):
+                        fc = part.function_call
+                        if not getattr(fc, 'name', None):
+                            log.debug("function_call_without_name", function_call=str(fc))
+                        raw_args: Dict[str, Any] = {}
+                        if hasattr(fc, 'args') and fc.args:
+                            try:
+                                raw_args = dict(fc.args)
+                            except Exception:
+                                raw_args = {}
+
+                        parsed_args: Dict[str, Any] = {}
+                        for key, value in raw_args.items():
+                            if hasattr(value, 'string_value'):
+                                parsed_args[key] = value.string_value
+                            elif hasattr(value, 'number_value'):
+                                parsed_args[key] = value.number_value
+                            elif hasattr(value, 'bool_value'):
+                                parsed_args[key] = value.bool_value
+                            elif isinstance(value, (str, int, float, bool)):
+                                parsed_args[key] = value
+                            else:
+                                parsed_args[key] = str(value)
+
+                        tool_calls.append({
+                            "name": fc.name,
+                            "args": parsed_args
+                        })
+                        log.debug("tool_call", tool=fc.name, args=parsed_args)
+                    # Check for text
+                    elif hasattr(part, 'text'):
+                        text += part.text
+        return text, tool_calls
+
+    def _parse_response(self, response: Any) -> ResponseShim:
+        """Extract text and tool calls from a Gemini response."""
+        text, tool_calls = self._extract_parts(response)
+        
+        # Fallback to response.text if available
+        if not text and not tool_calls:
+            if hasattr(response, 'text'):
+                text = response.text
+        
+        if not text and not tool_calls:
+            FALLBACK_RESPONSES.inc(reason="empty_response")
+            return ResponseShim(
+                content="I'm having trouble generating a response. Please try again.",
+                usage=_usage_of(response),
+                fallback="empty_response",
             )
-            
-            generation_config = {
-                "temperature": self.temperature,
-                "max_output_tokens": self.max_tokens,
+        
+        log.debug("model_response", text=text[:100], tool_calls=len(tool_calls))
+        return ResponseShim(content=text.strip(), tool_calls=tool_calls, usage=_usage_of(response))
+
+    def _record_call(
+        self,
+        started: float,
+        messages: List[Any],
+        response: Optional[ResponseShim],
+        outcome: str,
+    ) -> None:
+        """Record latency, outcome and token usage of one model call."""
+        labels = {"route": self.route, "model": self.model}
+        if outcome != "rejected":
+            # Fail-fast rejections would drag the latency percentiles down
+            elapsed = time.perf_counter() - started
+            LLM_REQUEST_SECONDS.observe(elapsed, **labels)
+            STAGE_SECONDS.observe(elapsed, stage="model_call")
+            context = current_request()
+            if context is not None:
+                context.model_calls += 1
+        LLM_REQUESTS.inc(outcome=outcome, **labels)
+        if outcome != "ok" or response is None:
+            return
+        usage = response.usage
+        if usage is None:
+            # Estimated only when the SDK reports no usage
+            prompt = "".join(str(getattr(m, "content", "") or "") for m in messages)
+            usage = {
+                "input_tokens": estimate_tokens(prompt),
+                "output_tokens": estimate_tokens(response.content or ""),
             }
-            
-            # Start chat with history
-            chat = model.start_chat(history=chat_history[:-1] if len(chat_history) > 1 else [])
-            
-            # Send last user message
-            last_message = chat_history[-1]["parts"][0] if chat_history else "Hello"
-            print(f"[DEBUG] Sending message: {last_message[:100]}...")
+        LLM_TOKENS.inc(usage["input_tokens"], direction="input", **labels)
+        LLM_TOKENS.inc(usage["output_tokens"], direction="output", **labels)
+        context = current_request()
+        if context is not None:
+            context.input_tokens += usage["input_tokens"]
+            context.output_tokens += usage["output_tokens"]
+
+    def _error_response(self, error: Exception) -> ResponseShim:
+        """Map an upstream error onto a user-facing fallback response."""
+        error_msg = str(error)
+        log.error("llm_error", route=self.route, model=self.model, error=error_msg)
+        FALLBACK_RESPONSES.inc(reason="llm_error")
+        
+        if "API key" in error_msg or "authentication" in error_msg.lower():
+            return ResponseShim(
+                content="There's an authentication issue. Please check the API key configuration.",
+                tool_calls=[],
+                fallback="llm_error",
+            )
+        else:
+            return ResponseShim(
+                content="I'm your ISP support assistant! Having a small hiccup, but I'm here to help. What's going on with your internet?",
+                tool_calls=[],
+                fallback="llm_error",
+            )
+
+    def _offline_response(self) -> ResponseShim:
+        FALLBACK_RESPONSES.inc(reason="llm_offline")
+        return ResponseShim(
+            content="I'm your ISP support assistant! How can I help with your internet today?",
+            tool_calls=[],
+            fallback="llm_offline",
+        )
+
+    def _unavailable_response(self) -> ResponseShim:
+        """Deterministic fallback while the upstream times out or the breaker is open."""
+        FALLBACK_RESPONSES.inc(reason="llm_unavailable")
+        return ResponseShim(
+            content=(
+                "Sorry, I can't reach our support assistant right now. 🙏 "
+                "Please try again in a minute. If your internet is down, you can also call our support hotline."
+            ),
+            tool_calls=[],
+            fallback="llm_unavailable",
+        )
+
+    # ---------------------------------------------------------
+    # Deadlines, hedging and the circuit breaker
+    # ---------------------------------------------------------
+    def _hedge_after(self) -> Optional[float]:
+        """Seconds to wait before hedging (observed attempt p95), or None to never hedge."""
+        if not settings.LLM_HEDGE_ENABLED:
+            return None
+        return hedge_delay(
+            LLM_ATTEMPT_SECONDS,
+            settings.LLM_HEDGE_QUANTILE,
+            settings.LLM_HEDGE_MIN_SAMPLES,
+            settings.LLM_HEDGE_DELAY_MS / 1000,
+            route=self.route,
+            model=self.model,
+        )
+
+    def _observe_attempt(self, started: float) -> None:
+        LLM_ATTEMPT_SECONDS.observe(time.perf_counter() - started, route=self.route, model=self.model)
+
+    def _record_hedges(self, attempts: int, winner: int) -> None:
+        if attempts > 1:
+            LLM_HEDGES.inc(attempts - 1, route=self.route, model=self.model, outcome="launched")
+        if winner > 1:
+            LLM_HEDGES.inc(route=self.route, model=self.model, outcome="won")
+
+    def _rejected(self, messages: List[Any]) -> Optional[ResponseShim]:
+        """Fail fast with the fallback if the circuit breaker is open."""
+        if self._breaker.allow():
+            return None
+        self._record_call(time.perf_counter(), messages, None, "rejected")
+        return self._unavailable_response()
+
+    def _finish(self, started: float, messages: List[Any], result: Optional[ResponseShim], error: Optional[BaseException]) -> ResponseShim:
+        """Record the outcome of a call (metrics + breaker) and map errors to a fallback."""
+        if error is None:
+            self._breaker.record_success()
+            self._record_call(started, messages, result, "ok")
+            return result
+        if _counts_toward_breaker(error):
+            self._breaker.record_failure()
+        if isinstance(error, TimeoutError):
+            log.warning("llm_timeout", route=self.route, model=self.model, error=str(error))
+            self._record_call(started, messages, None, "timeout")
+            return self._unavailable_response()
+        self._record_call(started, messages, None, "error")
+        return self._error_response(error)
+
+    def invoke(self, messages: List[Any]) -> ResponseShim:
+        """Invoke Gemini model with proper Google Generative AI SDK and tool calling support."""
+        started = time.perf_counter()
+        log.debug("llm_invoke", route=self.route, messages=len(messages), tools=len(self._tools))
+        if not self._backend_available():
+            return self._offline_response()
+        rejected = self._rejected(messages)
+        if rejected is not None:
+            return rejected
+
+        attempts = winner = 0
+
+        def attempt() -> Any:
+            nonlocal attempts
+            attempts += 1
+            attempt_started = time.perf_counter()
+            # Start chat with history and send the last user message
+            chat = model.start_chat(history=history)
             response = chat.send_message(last_message, generation_config=generation_config)
-            
-            # Extract text and tool calls
-            text = ""
-            tool_calls = []
-            
-            if hasattr(response, 'candidates') and response.candidates:
-                candidate = response.candidates[0]
-                if hasattr(candidate, 'content') and hasattr(candidate.content, 'parts'):
-                    for part in candidate.content.parts:
-                        # Check for function calls
-                        if hasattr(part, 'function_call'):
-                            fc = part.function_call
-                            if not getattr(fc, 'name', None):
-                                print(f"[DEBUG] Function call without name: {fc}")
-                            raw_args: Dict[str, Any] = {}
-                            if hasattr(fc, 'args') and fc.args:
-                                try:
-                                    raw_args = dict(fc.args)
-                                except Exception:
-                                    raw_args = {}
-
-                            parsed_args: Dict[str, Any] = {}
-                            for key, value in raw_args.items():
-                                if hasattr(value, 'string_value'):
-                                    parsed_args[key] = value.string_value
-                                elif hasattr(value, 'number_value'):
-                                    parsed_args[key] = value.number_value
-                                elif hasattr(value, 'bool_value'):
-                                    parsed_args[key] = value.bool_value
-                                elif isinstance(value, (str, int, float, bool)):
-                                    parsed_args[key] = value
-                                else:
-                                    parsed_args[key] = str(value)
-
-                            tool_calls.append({
-                                "name": fc.name,
-                                "args": parsed_args
-                            })
-                            print(f"[DEBUG] Tool call: {fc.name} with args {parsed_args}")
-                        # Check for text
-                        elif hasattr(part, 'text'):
-                            text += part.text
-            
-            # Fallback to response.text if available
-            if not text and not tool_calls:
-                if hasattr(response, 'text'):
-                    text = response.text
-            
-            if not text and not tool_calls:
-                text = "I'm having trouble generating a response. Please try again."
-            
-            print(f"[DEBUG] Response text: {text[:100] if text else 'None'}..., tool_calls: {len(tool_calls)}")
-            return ResponseShim(content=text.strip(), tool_calls=tool_calls)
-            
+            self._observe_attempt(attempt_started)
+            return response
+
+        try:
+            model, history, last_message, generation_config = self._prepare_request(messages)
+            log.debug("llm_send", route=self.route, message=str(last_message)[:100])
+            response, winner = call_hedged(
+                attempt,
+                _get_executor(),
+                timeout=settings.LLM_TIMEOUT_SECONDS or None,
+                hedge_after=self._hedge_after(),
+                max_attempts=settings.LLM_MAX_ATTEMPTS,
+            )
+            return self._finish(started, messages, self._parse_response(response), None)
         except Exception as e:
-            error_msg = str(e)
-            print(f"Gemini adapter error: {error_msg}")
-            
-            if "API key" in error_msg or "authentication" in error_msg.lower():
-                return ResponseShim(
-                    content="There's an authentication issue. Please check the API key configuration.",
-                    tool_calls=[]
-                )
+            return self._finish(started, messages, None, e)
+        finally:
+            self._record_hedges(attempts, winner)
+
+    # ---------------------------------------------------------
+    # Async invocation
+    # ---------------------------------------------------------
+    async def ainvoke(self, messages: List[Any]) -> ResponseShim:
+        """Invoke Gemini without blocking the event loop or pinning a thread per call."""
+        # An open breaker answers immediately instead of queueing for a slot
+        if self._backend_available():
+            rejected = self._rejected(messages)
+            if rejected is not None:
+                return rejected
+
+        async with _upstream_slot():
+            return await self._ainvoke(messages)
+
+    async def _ainvoke(self, messages: List[Any]) -> ResponseShim:
+        started = time.perf_counter()
+        log.debug("llm_ainvoke", route=self.route, messages=len(messages), tools=len(self._tools))
+        if not self._backend_available():
+            return self._offline_response()
+
+        attempts = winner = 0
+
+        async def attempt() -> Any:
+            nonlocal attempts
+            attempts += 1
+            attempt_started = time.perf_counter()
+            chat = model.start_chat(history=history)
+            send_async = getattr(chat, "send_message_async", None)
+            if send_async is not None:
+                response = await send_async(last_message, generation_config=generation_config)
             else:
-                return ResponseShim(
-                    content="I'm your ISP support assistant! Having a small hiccup, but I'm here to help. What's going on with your internet?",
-                    tool_calls=[]
+                # Older SDKs have no async path: use the adapter's own sized pool
+                loop = asyncio.get_running_loop()
+                response = await loop.run_in_executor(
+                    _get_executor(),
+                    lambda: chat.send_message(last_message, generation_config=generation_config),
                 )
+            self._observe_attempt(attempt_started)
+            return response
 
-    async def ainvoke(self, messages: List[Any]) -> ResponseShim:
-        # Run sync invocation in thread pool to avoid blocking
-        loop = asyncio.get_running_loop()
-        return await loop.run_in_executor(None, self.invoke, messages)
+        try:
+            model, history, last_message, generation_config = self._prepare_request(messages)
+            response, winner = await acall_hedged(
+                attempt,
+                timeout=settings.LLM_TIMEOUT_SECONDS or None,
+                hedge_after=self._hedge_after(),
+                max_attempts=settings.LLM_MAX_ATTEMPTS,
+            )
+            return self._finish(started, messages, self._parse_response(response), None)
+        except Exception as e:
+            return self._finish(started, messages, None, e)
+        finally:
+            self._record_hedges(attempts, winner)
+
+    async def astream(self, messages: List[Any]) -> AsyncIterator[ResponseShim]:
+        """
+        Stream a Gemini response as ResponseShim chunks.
+
+        Each chunk carries a text delta in ``content`` and any function calls
+        completed in that chunk in ``tool_calls``. Streams are not hedged;
+        LLM_TIMEOUT_SECONDS bounds the wait for the first and every next chunk.
+        A failure before the first chunk yields the fallback reply; after it,
+        StreamInterrupted is raised.
+        """
+        if self._backend_available():
+            rejected = self._rejected(messages)
+            if rejected is not None:
+                yield rejected
+                return
+
+        async with _upstream_slot():
+            if not self._backend_available():
+                yield self._offline_response()
+                return
+
+            started = time.perf_counter()
+            timeout = settings.LLM_TIMEOUT_SECONDS or None
+            content, usage, emitted = "", None, False
+            try:
+                model, history, last_message, generation_config = self._prepare_request(messages)
+                chat = model.start_chat(history=history)
+                response = await asyncio.wait_for(
+                    chat.send_message_async(last_message, generation_config=generation_config, stream=True),
+                    timeout,
+                )
+                chunks = response.__aiter__()
+                while True:
+                    try:
+                        chunk = await asyncio.wait_for(chunks.__anext__(), timeout)
+                    except StopAsyncIteration:
+                        break
+                    # Usage metadata is cumulative; the last chunk carries the totals
+                    usage = _usage_of(chunk) or usage
+                    text, tool_calls = self._extract_parts(chunk)
+                    content += text
+                    if text or tool_calls:
+                        emitted = True
+                        yield ResponseShim(content=text, tool_calls=tool_calls)
+            except Exception as e:
+                if not emitted:
+                    yield self._finish(started, messages, None, e)
+                    return
+                # Part of the reply is already out; a fallback appended to it would garble it
+                if _counts_toward_breaker(e):
+                    self._breaker.record_failure()
+                self._record_call(started, messages, None, "timeout" if isinstance(e, TimeoutError) else "error")
+                log.error("llm_stream_interrupted", route=self.route, model=self.model, error=str(e))
+                raise StreamInterrupted(str(e)) from e
+            else:
+                self._finish(started, messages, ResponseShim(content=content, usage=usage), None)
+
+
+def create_chat_adapter(
+    model: str,
+    temperature: float = 0.0,
+    api_key: Optional[str] = None,
+    max_tokens: int = 1000,
+    route: str = "full",
+) -> GeminiChatAdapter:
+    """Build a chat adapter for the configured LLM_BACKEND."""
+    if settings.LLM_BACKEND == "fake":
+        from .fake_adapter import FakeChatAdapter
+        return FakeChatAdapter(model=model, temperature=temperature, api_key=api_key, max_tokens=max_tokens, route=route)
+    return GeminiChatAdapter(model=model, temperature=temperature, api_key=api_key, max_tokens=max_tokens, route=route)
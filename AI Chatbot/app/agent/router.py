@@ -0,0 +1,154 @@
+"""
+Model Router
+Picks the model tier for each agent turn and reports per-route metrics.
+
+Routes:
+- light:   greetings and short follow-ups (LIGHT_MODEL_NAME)
+- full:    problem reports, multi-tool diagnosis and long conversations (MODEL_NAME)
+- summary: context compression (COMPRESSION_MODEL, used by ContextCompressor)
+
+A light turn that asks for several tools at once is escalated to the full
+model for the rest of the turn.
+"""
+
+from typing import Any, Dict, List, Optional
+import re
+
+from .gemini_adapter import LLM_REQUEST_SECONDS, LLM_REQUESTS, LLM_TOKENS, GeminiChatAdapter, create_chat_adapter
+from ..core.config import settings
+from ..core.metrics import metrics
+
+
+ROUTES = ("light", "full", "summary")
+
+# Greetings are always on-topic (see is_isp_related_query) and never need tools
+GREETINGS = frozenset({"hi", "hello", "hey", "salam", "assalamu alaikum", "start"})
+
+# Problem reports that usually take account + connection lookups (and maybe a ticket)
+DIAGNOSIS_PATTERN = re.compile(
+    r"(slow|down|outage|not working|disconnect|offline|drop|losing|lag|buffer|"
+    r"latency|ping|router|modem|wifi|wi-fi|signal|restart|no internet|"
+    r"kaj kore na|chole na|bondho|"
+    r"কাজ করছে না|চলছে না|স্লো|ধীর|বন্ধ|সংযোগ নেই|রাউটার)",
+    re.IGNORECASE,
+)
+
+ROUTE_DECISIONS = metrics.counter(
+    "agent_route_decisions_total", "Agent turns started on each route", ("route",),
+)
+ROUTE_ESCALATIONS = metrics.counter(
+    "agent_route_escalations_total", "Light turns moved to the full model mid-turn", (),
+)
+
+
+def choose_route(message: str, history_turns: int = 0, has_summary: bool = False) -> str:
+    """
+    Classify a turn as "light" or "full".
+
+    Args:
+        message: The user's message
+        history_turns: Prior turns sent along with the message
+        has_summary: Whether older turns were folded into a summary
+    """
+    text = message.lower().strip()
+    if text in GREETINGS:
+        return "light"
+    if DIAGNOSIS_PATTERN.search(text):
+        return "full"
+    if has_summary or history_turns >= settings.ROUTER_FULL_HISTORY_TURNS:
+        return "full"
+    if len(text.split()) <= settings.ROUTER_LIGHT_MAX_WORDS:
+        return "light"
+    return "full"
+
+
+class ModelRouter:
+    """
+    Holds one tool-bound adapter per agent route.
+
+    With ROUTER_ENABLED=false every turn uses the full model.
+    """
+
+    def __init__(self, tools: List[Any], api_key: Optional[str] = None):
+        self.models: Dict[str, GeminiChatAdapter] = {
+            "full": self._build("full", settings.MODEL_NAME, settings.MAX_TOKENS, tools, api_key),
+        }
+        if settings.ROUTER_ENABLED:
+            self.models["light"] = self._build(
+                "light", settings.LIGHT_MODEL_NAME or settings.MODEL_NAME,
+                settings.LIGHT_MAX_TOKENS, tools, api_key,
+            )
+
+    @staticmethod
+    def _build(route: str, model: str, max_tokens: int, tools: List[Any], api_key: Optional[str]) -> GeminiChatAdapter:
+        adapter = create_chat_adapter(
+            model=model,
+            temperature=settings.TEMPERATURE,
+            api_key=api_key,
+            max_tokens=max_tokens,
+            route=route,
+        )
+        return adapter.bind_tools(tools)
+
+    def route(self, message: str, history_turns: int = 0, has_summary: bool = False) -> str:
+        """Pick the route for a new turn and count the decision."""
+        route = "full"
+        if "light" in self.models:
+            route = choose_route(message, history_turns, has_summary)
+        ROUTE_DECISIONS.inc(route=route)
+        return route
+
+    def escalate(self, route: str, tool_calls: List[Dict[str, Any]]) -> str:
+        """Move a light turn to the full model once it turns into a multi-tool diagnosis."""
+        if route == "light" and len(tool_calls) >= 2:
+            ROUTE_ESCALATIONS.inc()
+            return "full"
+        return route
+
+    def model(self, route: str) -> GeminiChatAdapter:
+        return self.models.get(route, self.models["full"])
+
+
+def route_stats() -> Dict[str, Any]:
+    """Per-route call counts, latency percentiles and token usage (for tuning the split)."""
+    calls: Dict[str, Dict[str, float]] = {}
+    for key, value in LLM_REQUESTS.samples().items():
+        labels = LLM_REQUESTS.labels_of(key)
+        route = calls.setdefault(labels["route"], {})
+        route[labels["outcome"]] = route.get(labels["outcome"], 0) + value
+
+    tokens: Dict[str, Dict[str, float]] = {}
+    for key, value in LLM_TOKENS.samples().items():
+        labels = LLM_TOKENS.labels_of(key)
+        route = tokens.setdefault(labels["route"], {})
+        route[labels["direction"]] = route.get(labels["direction"], 0) + value
+
+    latency: Dict[str, Dict[str, Any]] = {}
+    for key, series in LLM_REQUEST_SECONDS.series().items():
+        labels = LLM_REQUEST_SECONDS.labels_of(key)
+        latency[labels["route"]] = {
+            "model": labels["model"],
+            **{name: series[name] for name in ("count", "avg", "p50", "p95", "p99")},
+        }
+
+    stats: Dict[str, Any] = {}
+    for route in ROUTES:
+        if route not in calls and route not in latency:
+            continue
+        ok = calls.get(route, {}).get("ok", 0)
+        route_tokens = tokens.get(route, {})
+        stats[route] = {
+            "decisions": int(ROUTE_DECISIONS.value(route=route)),
+            "calls": int(ok),
+            "errors": int(calls.get(route, {}).get("error", 0)),
+            "timeouts": int(calls.get(route, {}).get("timeout", 0)),
+            "rejected": int(calls.get(route, {}).get("rejected", 0)),
+            "latency_seconds": latency.get(route),
+            "input_tokens": int(route_tokens.get("input", 0)),
+            "output_tokens": int(route_tokens.get("output", 0)),
+            "avg_tokens_per_call": round(
+                (route_tokens.get("input", 0) + route_tokens.get("output", 0)) / ok, 1
+            ) if ok else None,
+        }
+    stats["escalations"] = int(ROUTE_ESCALATIONS.value())
+    return stats
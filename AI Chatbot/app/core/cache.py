@@ -0,0 +1,105 @@
+"""
+Cache Utilities
+Small thread-safe LRU cache with optional per-entry TTL.
+"""
+
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+import threading
+import time
+
+
+_MISSING = object()
+
+
+class TTLCache:
+    """
+    Size-bounded LRU cache with optional time-to-live.
+
+    Features:
+    - Least-recently-used eviction once ``maxsize`` is reached
+    - Optional default TTL, overridable per entry
+    - Thread-safe (sync tools run on executor threads)
+    - Hit/miss/eviction counters
+    """
+
+    def __init__(self, maxsize: int = 128, ttl: Optional[float] = None):
+        """
+        Args:
+            maxsize: Maximum number of entries kept before evicting
+            ttl: Default lifetime of an entry in seconds (None = never expires)
+        """
+        self.maxsize = max(1, int(maxsize))
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Any = None, count: bool = True) -> Any:
+        """
+        Return the cached value for ``key`` or ``default`` if missing/expired.
+
+        Pass ``count=False`` for speculative probes that should not affect
+        the hit/miss counters.
+        """
+        with self._lock:
+            item = self._data.get(key, _MISSING)
+            if item is _MISSING:
+                self.misses += count
+                return default
+
+            value, expires_at = item
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                self.misses += count
+                return default
+
+            self._data.move_to_end(key)
+            self.hits += count
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """Store ``value`` under ``key``, evicting the oldest entries if full."""
+        lifetime = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + lifetime if lifetime is not None else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """Remove ``key`` and return its value (expired entries count as missing)."""
+        with self._lock:
+            item = self._data.pop(key, _MISSING)
+        if item is _MISSING:
+            return default
+        value, expires_at = item
+        if expires_at is not None and expires_at <= time.monotonic():
+            return default
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return size and hit/miss counters for reporting."""
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
@@ -3,11 +3,25 @@ Context Compression Module
 Efficiently compresses conversation history to reduce token usage.
 """
 
-from typing import List
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple, Union
 from langchain_core.messages import HumanMessage, SystemMessage
+import hashlib
 
+from .cache import TTLCache
 from .config import settings
-from ..agent.gemini_adapter import GeminiChatAdapter
+from .log import get_logger
+from .metrics import stage
+from ..agent.gemini_adapter import create_chat_adapter
+
+
+log = get_logger(__name__)
+
+
+class CompressedContext(NamedTuple):
+    """Result of compressing a conversation for one request."""
+    context: str              # Context string handed to the agent
+    summary: Optional[str]    # Rolling summary of the folded turns, if any
+    covered: int              # Leading history turns the summary includes
 
 
 class ContextCompressor:
@@ -16,6 +30,7 @@ class ContextCompressor:
     
     Features:
     - Intelligent summarization
+    - Incremental rolling summaries (only newly aged-out turns are folded in)
     - Preserves key information
     - Reduces token usage
     - Fast processing
@@ -26,14 +41,98 @@ class ContextCompressor:
         Initialize the context compressor.
         
         Args:
-            model_name: LLM model to use for compression (default: from settings)
+            model_name: LLM model to use for compression (default: COMPRESSION_MODEL)
         """
-        self.model = GeminiChatAdapter(
-            model=model_name or settings.MODEL_NAME,
+        self.model = create_chat_adapter(
+            model=model_name or settings.COMPRESSION_MODEL,
             temperature=0,
-            max_tokens=200  # Keep compression output short
+            max_tokens=200,  # Keep compression output short
+            route="summary",
         )
 
+        # Rolling summaries keyed by a digest of the history prefix they cover
+        self._summary_cache = TTLCache(
+            maxsize=settings.SUMMARY_CACHE_SIZE,
+            ttl=settings.SUMMARY_CACHE_TTL,
+        )
+
+    def _build_prompt(self, text: str) -> str:
+        return f"""Compress the following conversation into 2-3 concise sentences. Focus ONLY on:
+- The user's main problem or request
+- Key account details (phone, status, etc.)
+- Current state (resolved, pending, etc.)
+
+Keep it factual and brief. No greetings or filler.
+
+Context:
+{text}
+
+Compressed Summary:"""
+
+    def _build_fold_prompt(self, previous_summary: str, new_text: str) -> str:
+        return f"""Update the running summary of a support conversation with the new messages below.
+Keep it to 2-3 concise sentences. Focus ONLY on:
+- The user's main problem or request
+- Key account details (phone, status, etc.)
+- Current state (resolved, pending, etc.)
+
+Keep it factual and brief. No greetings or filler.
+
+Current Summary:
+{previous_summary}
+
+New Messages:
+{new_text}
+
+Updated Summary:"""
+
+    def _summarize(self, prompt: str) -> Optional[str]:
+        """Run a summarization prompt; returns None on failure."""
+        try:
+            response = self.model.invoke([HumanMessage(content=prompt)])
+        except Exception as e:
+            log.error("compression_error", error=str(e))
+            return None
+        return self._summary_of(response)
+
+    async def _asummarize(self, prompt: str) -> Optional[str]:
+        """Async version of _summarize()."""
+        try:
+            response = await self.model.ainvoke([HumanMessage(content=prompt)])
+        except Exception as e:
+            log.error("compression_error", error=str(e))
+            return None
+        return self._summary_of(response)
+
+    def _summary_of(self, response: Any) -> Optional[str]:
+        """Summary text of a model response, or None for the adapter's canned fallback replies."""
+        # The adapter answers errors, timeouts and an open breaker with a
+        # user-facing reply rather than raising; that must never become a summary
+        reason = getattr(response, "fallback", None)
+        if reason:
+            log.warning("compression_failed", reason=reason)
+            return None
+        return self._clean_summary(response.content) or None
+
+    @staticmethod
+    def _clean_summary(compressed: str) -> str:
+        # Remove any greeting or unnecessary phrases
+        compressed = compressed.strip()
+        compressed = compressed.replace('The user', 'User')
+        compressed = compressed.replace('The customer', 'User')
+        return compressed
+
+    @staticmethod
+    def _format_history(history: List[Union[str, Dict[str, str]]]) -> str:
+        """Render history entries (plain strings or role/content dicts) as text."""
+        lines = []
+        for entry in history:
+            if isinstance(entry, dict):
+                lines.append(f"{entry.get('role', 'user')}: {entry.get('content', '')}")
+            else:
+                lines.append(str(entry))
+        return "\n".join(lines)
+
     def compress(self, text: str) -> str:
         """
         Compress a single text block into a summary.
@@ -47,30 +146,23 @@ class ContextCompressor:
         if not text or len(text) < 100:
             return text  # No need to compress short text
         
-        prompt = f"""Compress the following conversation into 2-3 concise sentences. Focus ONLY on:
-- The user's main problem or request
-- Key account details (phone, status, etc.)
-- Current state (resolved, pending, etc.)
+        # Fallback to original if compression fails
+        return self._summarize(self._build_prompt(text)) or text
 
-Keep it factual and brief. No greetings or filler.
-
-Context:
-{text}
-
-Compressed Summary:"""
+    async def acompress(self, text: str) -> str:
+        """
+        Async version of compress(); never blocks the event loop.
         
-        try:
-            response = self.model.invoke([HumanMessage(content=prompt)])
-            compressed = response.content.strip()
-            
-            # Remove any greeting or unnecessary phrases
-            compressed = compressed.replace('The user', 'User')
-            compressed = compressed.replace('The customer', 'User')
+        Args:
+            text: Text to compress
             
-            return compressed
-        except Exception as e:
-            print(f"Compression error: {e}")
-            return text  # Fallback to original if compression fails
+        Returns:
+            Compressed summary (2-3 lines)
+        """
+        if not text or len(text) < 100:
+            return text
+        
+        return await self._asummarize(self._build_prompt(text)) or text
 
     def compress_history(self, history: List[str]) -> str:
         """
@@ -87,49 +179,215 @@ Compressed Summary:"""
         
         # If history is short, just join it
         if len(history) < settings.COMPRESSION_THRESHOLD:
-            return "\n".join(history)
-        
-        # Combine all messages
-        combined = "\n".join(history)
+            return self._format_history(history)
         
         # Compress the combined text
-        return self.compress(combined)
+        return self.compress(self._format_history(history))
 
-    def smart_compress(self, history: List[str], current_message: str) -> str:
+    @staticmethod
+    def _prefix_digests(
+        history: List[Union[str, Dict[str, str]]], seed: Optional[str] = None
+    ) -> List[str]:
         """
-        Intelligently compress history and combine with current message.
+        Digest of every history prefix: digests[k - 1] identifies history[:k].
+
+        ``seed`` (a previous summary the history continues from) is mixed in
+        so identical suffixes of different conversations never collide.
+        """
+        digests = []
+        rolling = hashlib.sha256()
+        if seed:
+            rolling.update(f"{seed}\x1d".encode("utf-8"))
+        for entry in history:
+            if isinstance(entry, dict):
+                rolling.update(f"{entry.get('role', '')}\x1f{entry.get('content', '')}\x1e".encode("utf-8"))
+            else:
+                rolling.update(f"{entry}\x1e".encode("utf-8"))
+            digests.append(rolling.hexdigest())
+        return digests
+
+    def _plan_rolling_summary(
+        self,
+        older: List[Union[str, Dict[str, str]]],
+        previous_summary: Optional[str] = None,
+    ) -> Tuple[List[str], Optional[str], int, Optional[str]]:
+        """
+        Work out how to summarize ``older`` from the summary cache.
+
+        Returns (digests, summary, covered, prompt):
+        - summary/covered: the best cached summary and how many turns it covers
+        - prompt: the LLM prompt to run, or None when no call is needed
+
+        Only the turns that aged out since the cached summary are folded in,
+        and only once at least COMPRESSION_FOLD_MIN_TURNS of them accumulate;
+        until then they stay verbatim in the recent context. A
+        ``previous_summary`` (e.g. from a context token) covers zero turns of
+        ``older`` and is the starting point when nothing better is cached.
+        """
+        digests = self._prefix_digests(older, seed=previous_summary)
+        summary, covered = previous_summary, 0
+        for k in range(len(older), 0, -1):
+            cached = self._summary_cache.get(digests[k - 1], count=False)
+            if cached is not None:
+                summary, covered = cached, k
+                break
+
+        # Count a hit whenever a cached summary saves the model call
+        pending = len(older) - covered
+        if summary is not None and pending < settings.COMPRESSION_FOLD_MIN_TURNS:
+            self._summary_cache.hits += 1
+            return digests, summary, covered, None
+
+        self._summary_cache.misses += 1
+        new_text = self._format_history(older[covered:])
+        if summary is None:
+            if len(new_text) < 100:
+                # Too short to be worth a model call; keep it as-is
+                self._summary_cache.set(digests[-1], new_text)
+                return digests, new_text, len(older), None
+            return digests, summary, covered, self._build_prompt(new_text)
+        return digests, summary, covered, self._build_fold_prompt(summary, new_text)
+
+    def _finish_rolling_summary(
+        self,
+        older: List[Union[str, Dict[str, str]]],
+        digests: List[str],
+        summary: Optional[str],
+        covered: int,
+        folded: Optional[str],
+    ) -> Tuple[Optional[str], int]:
+        """
+        Store a freshly folded summary; returns (summary, turns covered).
+
+        When the fold fails nothing is cached and the best earlier summary is
+        kept as it was: (None, 0) if there is none, so every turn of ``older``
+        stays verbatim.
+        """
+        if folded:
+            self._summary_cache.set(digests[-1], folded)
+            return folded, len(older)
+        return summary, covered
+
+    def rolling_summary(
+        self,
+        older: List[Union[str, Dict[str, str]]],
+        previous_summary: Optional[str] = None,
+    ) -> Tuple[Optional[str], int]:
+        """
+        Summarize ``older`` incrementally.
         
         Args:
-            history: Previous conversation messages
-            current_message: Current user message
+            older: Conversation turns that have aged out of the recent window
+            previous_summary: Summary of the turns before ``older``, if any
             
         Returns:
-            Optimized context string for agent input
+            (summary, covered) where ``covered`` is how many leading turns of
+            ``older`` the summary includes; the rest must be kept verbatim.
+            summary is None when there is no summary yet and summarization failed
         """
-        if not history:
-            return current_message
-        
-        # Always keep the last 2 messages uncompressed for context
-        if len(history) <= 2:
-            context = "\n".join(history)
-            return f"{context}\n\nCurrent Message: {current_message}"
-        
-        # Compress older messages, keep recent ones
-        older_messages = history[:-2]
-        recent_messages = history[-2:]
-        
-        compressed_older = self.compress("\n".join(older_messages))
-        recent_context = "\n".join(recent_messages)
-        
-        final_context = f"""Previous Context (Summary): {compressed_older}
+        digests, summary, covered, prompt = self._plan_rolling_summary(older, previous_summary)
+        folded = self._summarize(prompt) if prompt else None
+        return self._finish_rolling_summary(older, digests, summary, covered, folded)
+
+    async def arolling_summary(
+        self,
+        older: List[Union[str, Dict[str, str]]],
+        previous_summary: Optional[str] = None,
+    ) -> Tuple[Optional[str], int]:
+        """Async version of rolling_summary()."""
+        digests, summary, covered, prompt = self._plan_rolling_summary(older, previous_summary)
+        folded = await self._asummarize(prompt) if prompt else None
+        return self._finish_rolling_summary(older, digests, summary, covered, folded)
+
+    @staticmethod
+    def _final_context(compressed_older: str, recent_context: str, current_message: str) -> str:
+        return f"""Previous Context (Summary): {compressed_older}
 
 Recent Conversation:
 {recent_context}
 
 Current Message: {current_message}"""
+
+    def _build_context(
+        self,
+        history: List[Union[str, Dict[str, str]]],
+        current_message: str,
+        summary: Optional[str],
+        covered: int,
+    ) -> CompressedContext:
+        """Assemble the agent context from a summary and the turns it does not cover."""
+        if summary is None:
+            context = self._format_history(history)
+            return CompressedContext(f"{context}\n\nCurrent Message: {current_message}", None, 0)
+        recent_context = self._format_history(history[covered:])
+        return CompressedContext(self._final_context(summary, recent_context, current_message), summary, covered)
+
+    def compress_context(
+        self,
+        history: List[Union[str, Dict[str, str]]],
+        current_message: str,
+        previous_summary: Optional[str] = None,
+    ) -> CompressedContext:
+        """
+        Compress history into a context string plus the rolling summary behind it.
         
-        return final_context
+        Args:
+            history: Conversation turns (since ``previous_summary``, if given)
+            current_message: Current user message
+            previous_summary: Summary carried over from an earlier request
+            
+        Returns:
+            CompressedContext(context, summary, covered)
+        """
+        # Always keep the last 2 messages uncompressed for context
+        if len(history) <= 2:
+            return self._build_context(history, current_message, previous_summary, 0)
 
+        # Fold aged-out messages into the rolling summary, keep recent ones
+        with stage("compression"):
+            summary, covered = self.rolling_summary(history[:-2], previous_summary)
+        return self._build_context(history, current_message, summary, covered)
 
-# Global compressor instance
-compressor = ContextCompressor()
+    async def acompress_context(
+        self,
+        history: List[Union[str, Dict[str, str]]],
+        current_message: str,
+        previous_summary: Optional[str] = None,
+    ) -> CompressedContext:
+        """Async version of compress_context()."""
+        if len(history) <= 2:
+            return self._build_context(history, current_message, previous_summary, 0)
+
+        with stage("compression"):
+            summary, covered = await self.arolling_summary(history[:-2], previous_summary)
+        return self._build_context(history, current_message, summary, covered)
+
+    def smart_compress(self, history: List[Union[str, Dict[str, str]]], current_message: str) -> str:
+        """
+        Intelligently compress history and combine with current message.
+        
+        Args:
+            history: Previous conversation messages
+            current_message: Current user message
+            
+        Returns:
+            Optimized context string for agent input
+        """
+        if not history:
+            return current_message
+        return self.compress_context(history, current_message).context
+
+    async def asmart_compress(self, history: List[Union[str, Dict[str, str]]], current_message: str) -> str:
+        """
+        Async version of smart_compress() for use from async endpoints.
+        
+        Args:
+            history: Previous conversation messages
+            current_message: Current user message
+            
+        Returns:
+            Optimized context string for agent input
+        """
+        if not history:
+            return current_message
+        return (await self.acompress_context(history, current_message)).context
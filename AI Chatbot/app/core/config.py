@@ -15,34 +15,134 @@ load_dotenv()
 class Settings(BaseSettings):
     """Central configuration with environment variable support."""
 
+    # Model backend: "gemini", or "fake" (scripted, offline) for load tests and benchmarks
+    LLM_BACKEND: str = os.getenv("LLM_BACKEND", "gemini").lower()
+    # Fake backend: latency per call ("fixed:MS", "uniform:LOW_MS:HIGH_MS",
+    # "normal:MEAN_MS:STDDEV_MS" or "lognormal:MEDIAN_MS:SIGMA"), error rate and seed
+    LLM_FAKE_LATENCY: str = os.getenv("LLM_FAKE_LATENCY", "lognormal:600:0.5")
+    LLM_FAKE_LIGHT_LATENCY: str = os.getenv("LLM_FAKE_LIGHT_LATENCY", "lognormal:250:0.4")
+    LLM_FAKE_ERROR_RATE: float = float(os.getenv("LLM_FAKE_ERROR_RATE", "0"))
+    LLM_FAKE_SEED: Optional[int] = int(os.getenv("LLM_FAKE_SEED")) if os.getenv("LLM_FAKE_SEED") else None
+    # Cassettes: "record" appends every model exchange to LLM_CASSETTE_PATH, "replay"
+    # answers from it without calling the upstream ("off" = neither)
+    LLM_CASSETTE_MODE: str = os.getenv("LLM_CASSETTE_MODE", "off").lower()
+    LLM_CASSETTE_PATH: str = os.getenv("LLM_CASSETTE_PATH", "cassettes/llm.jsonl.gz")
+    # Replay delay as a multiple of the recorded latency (0 = answer immediately)
+    LLM_CASSETTE_LATENCY_SCALE: float = float(os.getenv("LLM_CASSETTE_LATENCY_SCALE", "0"))
+
     # Gemini / Google Generative AI credentials
-    GEMINI_API_KEY: str = os.getenv("GEMINI_API_KEY")
+    GEMINI_API_KEY: Optional[str] = os.getenv("GEMINI_API_KEY")
     GOOGLE_APPLICATION_CREDENTIALS: str = os.getenv("GOOGLE_APPLICATION_CREDENTIALS", "")
     
     # Model Configuration
     MODEL_NAME: str = os.getenv("MODEL_NAME", "gemini-2.5-flash")
     TEMPERATURE: float = float(os.getenv("TEMPERATURE", "0.0"))
     MAX_TOKENS: int = int(os.getenv("MAX_TOKENS", "1000"))
+    # Model routing: a lighter model for greetings and short follow-ups
+    ROUTER_ENABLED: bool = os.getenv("ROUTER_ENABLED", "true").lower() == "true"
+    LIGHT_MODEL_NAME: str = os.getenv("LIGHT_MODEL_NAME", "gemini-2.5-flash-lite")
+    LIGHT_MAX_TOKENS: int = int(os.getenv("LIGHT_MAX_TOKENS", "400"))
+    ROUTER_LIGHT_MAX_WORDS: int = int(os.getenv("ROUTER_LIGHT_MAX_WORDS", "8"))
+    ROUTER_FULL_HISTORY_TURNS: int = int(os.getenv("ROUTER_FULL_HISTORY_TURNS", "6"))
     
     # Agent Configuration
     MAX_ITERATIONS: int = int(os.getenv("MAX_ITERATIONS", "5"))
     VERBOSE_MODE: bool = os.getenv("VERBOSE_MODE", "false").lower() == "true"
+    TOOL_MAX_CONCURRENCY: int = int(os.getenv("TOOL_MAX_CONCURRENCY", "4"))
+    TOOL_TIMEOUT_SECONDS: float = float(os.getenv("TOOL_TIMEOUT_SECONDS", "10"))
+    # Answer simple balance/plan/status/connection lookups without the LLM
+    FAST_PATH_ENABLED: bool = os.getenv("FAST_PATH_ENABLED", "true").lower() == "true"
+    # Look up the caller's account and connection up front and hand them to the first model call
+    PREFETCH_ENABLED: bool = os.getenv("PREFETCH_ENABLED", "true").lower() == "true"
     
     # Context Compression
     COMPRESSION_THRESHOLD: int = int(os.getenv("COMPRESSION_THRESHOLD", "5"))
-    COMPRESSION_MODEL: str = os.getenv("COMPRESSION_MODEL", "gemini-2.5-flash")
+    COMPRESSION_MODEL: str = os.getenv("COMPRESSION_MODEL", "gemini-2.5-flash-lite")
+    # Start the first model call while the summary is still being generated
+    COMPRESSION_OVERLAP: bool = os.getenv("COMPRESSION_OVERLAP", "false").lower() == "true"
+    # Rolling summaries: fold aged-out turns once this many accumulate
+    COMPRESSION_FOLD_MIN_TURNS: int = int(os.getenv("COMPRESSION_FOLD_MIN_TURNS", "4"))
+    SUMMARY_CACHE_SIZE: int = int(os.getenv("SUMMARY_CACHE_SIZE", "1024"))
+    SUMMARY_CACHE_TTL: int = int(os.getenv("SUMMARY_CACHE_TTL", "3600"))
+    # Signing key and lifetime of the summary tokens returned to clients
+    CONTEXT_TOKEN_SECRET: str = os.getenv("CONTEXT_TOKEN_SECRET", "")
+    CONTEXT_TOKEN_TTL: int = int(os.getenv("CONTEXT_TOKEN_TTL", "86400"))
+    
+    # Prompt token budget: history is added newest-first until system prompt,
+    # summary, turns and the new message reach it
+    CONTEXT_TOKEN_BUDGET: int = int(os.getenv("CONTEXT_TOKEN_BUDGET", "4000"))
+    # Longer messages (pasted logs) are cut to their beginning and end
+    CONTEXT_MAX_MESSAGE_TOKENS: int = int(os.getenv("CONTEXT_MAX_MESSAGE_TOKENS", "800"))
+    # Newest turns always kept, even over budget
+    CONTEXT_MIN_TURNS: int = int(os.getenv("CONTEXT_MIN_TURNS", "2"))
+    # Verbatim turns sent next to a compression summary
+    CONTEXT_RECENT_TOKENS: int = int(os.getenv("CONTEXT_RECENT_TOKENS", "600"))
+    
+    # Gemini Adapter
+    MODEL_CACHE_SIZE: int = int(os.getenv("MODEL_CACHE_SIZE", "32"))
+    # Upstream calls in flight per worker, shared by all routes (light/full/summary)
+    LLM_MAX_CONCURRENCY: int = int(os.getenv("LLM_MAX_CONCURRENCY", "256"))
+    LLM_EXECUTOR_WORKERS: int = int(os.getenv("LLM_EXECUTOR_WORKERS", "16"))
+    # Per-call deadline (0 = none) and attempts per call (primary + hedge/retry)
+    LLM_TIMEOUT_SECONDS: float = float(os.getenv("LLM_TIMEOUT_SECONDS", "20"))
+    LLM_MAX_ATTEMPTS: int = int(os.getenv("LLM_MAX_ATTEMPTS", "2"))
+    # Hedge a slow call after the observed latency quantile (LLM_HEDGE_DELAY_MS until enough samples)
+    LLM_HEDGE_ENABLED: bool = os.getenv("LLM_HEDGE_ENABLED", "true").lower() == "true"
+    LLM_HEDGE_DELAY_MS: int = int(os.getenv("LLM_HEDGE_DELAY_MS", "2000"))
+    LLM_HEDGE_QUANTILE: float = float(os.getenv("LLM_HEDGE_QUANTILE", "0.95"))
+    LLM_HEDGE_MIN_SAMPLES: int = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "50"))
+    # Circuit breaker: consecutive failures before failing fast, and the cool-down
+    LLM_BREAKER_FAILURES: int = int(os.getenv("LLM_BREAKER_FAILURES", "5"))
+    LLM_BREAKER_RESET_SECONDS: float = float(os.getenv("LLM_BREAKER_RESET_SECONDS", "30"))
+    
+    # Server-side conversation sessions (session_id mode)
+    SESSION_MAX_SESSIONS: int = int(os.getenv("SESSION_MAX_SESSIONS", "10000"))
+    SESSION_MAX_MEMORY_MB: int = int(os.getenv("SESSION_MAX_MEMORY_MB", "256"))
+    SESSION_TTL: int = int(os.getenv("SESSION_TTL", "1800"))
+    SESSION_SQLITE_PATH: str = os.getenv("SESSION_SQLITE_PATH", "")
     
     # API Configuration
     API_TITLE: str = "AI Support Agent API"
     API_VERSION: str = "1.0.0"
     API_DESCRIPTION: str = "Production-grade AI Agent for ISP Customer Support Automation"
     
-    # Database Configuration (for future use)
+    # Database Configuration (defaults to the local SQLite file)
     DATABASE_URL: Optional[str] = os.getenv("DATABASE_URL", None)
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "10"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+    DB_POOL_TIMEOUT: int = int(os.getenv("DB_POOL_TIMEOUT", "10"))
+    SQLITE_SYNCHRONOUS: str = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+    SQLITE_BUSY_TIMEOUT_MS: int = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+    DB_CACHE_SIZE: int = int(os.getenv("DB_CACHE_SIZE", "10000"))
+    DB_CACHE_TTL: int = int(os.getenv("DB_CACHE_TTL", "60"))
+    DB_NEGATIVE_CACHE_TTL: int = int(os.getenv("DB_NEGATIVE_CACHE_TTL", "15"))
+    # Write-behind ticket queue (group commit on a background thread)
+    TICKET_WRITE_BEHIND: bool = os.getenv("TICKET_WRITE_BEHIND", "true").lower() == "true"
+    TICKET_BATCH_SIZE: int = int(os.getenv("TICKET_BATCH_SIZE", "100"))
+    TICKET_FLUSH_INTERVAL_MS: int = int(os.getenv("TICKET_FLUSH_INTERVAL_MS", "20"))
+    # Tickets are acknowledged before the insert; the journal keeps them across a crash ("" = off)
+    TICKET_JOURNAL_PATH: str = os.getenv("TICKET_JOURNAL_PATH", "./tickets.journal")
+    # Retries of a failing ticket batch; rows that still fail go to the dead-letter file
+    TICKET_WRITE_RETRIES: int = int(os.getenv("TICKET_WRITE_RETRIES", "5"))
+    TICKET_DEAD_LETTER_PATH: str = os.getenv("TICKET_DEAD_LETTER_PATH", "./tickets.deadletter.jsonl")
+    TICKET_ID_BLOCK_SIZE: int = int(os.getenv("TICKET_ID_BLOCK_SIZE", "100"))
+    # Repeat reports of an open ticket within this window return that ticket (0 = off)
+    TICKET_DEDUP_WINDOW: int = int(os.getenv("TICKET_DEDUP_WINDOW", "21600"))
+    TICKET_DEDUP_CACHE_SIZE: int = int(os.getenv("TICKET_DEDUP_CACHE_SIZE", "10000"))
     
     # Server Configuration
     HOST: str = os.getenv("HOST", "0.0.0.0")
     PORT: int = int(os.getenv("PORT", "8000"))
+    # Build the agent and compressor during startup instead of on the first request
+    STARTUP_WARMUP: bool = os.getenv("STARTUP_WARMUP", "true").lower() == "true"
+    
+    # Logging (JSON lines written from a background thread)
+    LOG_LEVEL: str = os.getenv("LOG_LEVEL", "DEBUG" if VERBOSE_MODE else "INFO").upper()
+    LOG_FORMAT: str = os.getenv("LOG_FORMAT", "json").lower()
+    # Fraction of debug events kept when LOG_LEVEL=DEBUG
+    LOG_DEBUG_SAMPLE_RATE: float = float(os.getenv("LOG_DEBUG_SAMPLE_RATE", "0.1"))
+    # Records waiting for the writer thread; beyond this they are dropped, never blocking a request
+    LOG_QUEUE_SIZE: int = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
     
     # CORS Configuration
     CORS_ORIGINS: list = [
@@ -75,8 +175,15 @@ def validate_settings() -> bool:
     Returns:
         True if settings are valid, raises ValueError otherwise
     """
-    # Require Gemini API key or Google ADC credentials
-    if not (settings.GEMINI_API_KEY or settings.GOOGLE_APPLICATION_CREDENTIALS):
+    if settings.LLM_BACKEND not in ("gemini", "fake"):
+        raise ValueError('LLM_BACKEND must be "gemini" or "fake"')
+
+    if settings.LLM_CASSETTE_MODE not in ("off", "record", "replay"):
+        raise ValueError('LLM_CASSETTE_MODE must be "off", "record" or "replay"')
+
+    # Require Gemini API key or Google ADC credentials (not needed by the fake backend or a replay)
+    needs_credentials = settings.LLM_BACKEND == "gemini" and settings.LLM_CASSETTE_MODE != "replay"
+    if needs_credentials and not (settings.GEMINI_API_KEY or settings.GOOGLE_APPLICATION_CREDENTIALS):
         raise ValueError(
             "No model API credentials configured. Set GEMINI_API_KEY or configure GOOGLE_APPLICATION_CREDENTIALS."
         )
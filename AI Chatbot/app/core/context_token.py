@@ -0,0 +1,82 @@
+"""
+Context Token Module
+Signed, opaque tokens that carry a conversation's rolling summary between requests.
+
+Clients echo the token back with only the turns since the summary instead of
+resending the full history.
+"""
+
+from typing import Optional
+import base64
+import hashlib
+import hmac
+import json
+import secrets
+import time
+
+from .config import settings
+
+
+# Without a configured secret tokens are only valid for this process
+_SECRET = (settings.CONTEXT_TOKEN_SECRET or secrets.token_hex(32)).encode("utf-8")
+_VERSION = 1
+
+
+def _b64encode(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def _sign(payload: str) -> str:
+    return _b64encode(hmac.new(_SECRET, payload.encode("utf-8"), hashlib.sha256).digest())
+
+
+def issue_context_token(summary: str) -> str:
+    """
+    Create a signed token carrying a rolling summary.
+
+    Args:
+        summary: Summary of the conversation turns the client may now drop
+
+    Returns:
+        Opaque token string
+    """
+    body = json.dumps(
+        {"v": _VERSION, "s": summary, "iat": int(time.time())},
+        ensure_ascii=False,
+        separators=(",", ":"),
+    )
+    payload = _b64encode(body.encode("utf-8"))
+    return f"{payload}.{_sign(payload)}"
+
+
+def read_context_token(token: Optional[str]) -> Optional[str]:
+    """
+    Verify a context token and return the summary it carries.
+
+    Args:
+        token: Token from a previous ChatResponse
+
+    Returns:
+        The summary, or None if the token is missing, forged, malformed or expired
+    """
+    if not token or "." not in token:
+        return None
+
+    payload, signature = token.rsplit(".", 1)
+    if not hmac.compare_digest(signature, _sign(payload)):
+        return None
+
+    try:
+        data = json.loads(_b64decode(payload))
+    except Exception:
+        return None
+
+    if data.get("v") != _VERSION:
+        return None
+    if time.time() - data.get("iat", 0) > settings.CONTEXT_TOKEN_TTL:
+        return None
+    return data.get("s") or None
@@ -0,0 +1,177 @@
+"""
+Structured Logging
+Leveled JSON-lines logging that keeps stdout I/O off the request path.
+
+Features:
+- Events are a name plus fields: ``log.info("chat_reply", account_id=...)``
+- QueueHandler on the calling thread; formatting and writing happen on a
+  background QueueListener thread
+- Bounded queue: when the writer falls behind, records are dropped (and
+  counted) instead of blocking a request
+- Debug events cost one level check when disabled and are sampled
+  (LOG_DEBUG_SAMPLE_RATE) when enabled
+- LOG_FORMAT=text for human-readable local output
+"""
+
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, Optional
+import atexit
+import json
+import logging
+import queue
+import random
+import sys
+import threading
+
+from .config import settings
+
+
+_ROOT_LOGGER = "app"
+
+
+# ==================== FORMATTERS ====================
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, event and the event's fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "event": record.getMessage(),
+        }
+        for key, value in (getattr(record, "fields", None) or {}).items():
+            entry.setdefault(key, value)
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """``[ts] LEVEL logger: event key=value ...`` for reading in a terminal."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        ts = datetime.fromtimestamp(record.created).strftime("%Y-%m-%d %H:%M:%S")
+        line = f"[{ts}] {record.levelname:<7} {record.name}: {record.getMessage()}"
+        fields = getattr(record, "fields", None)
+        if fields:
+            line += " " + " ".join(f"{key}={value!r}" for key, value in fields.items())
+        if record.exc_info:
+            line += "\n" + self.formatException(record.exc_info)
+        return line
+
+
+# ==================== QUEUE PIPELINE ====================
+
+class _DroppingQueueHandler(QueueHandler):
+    """QueueHandler that never blocks and leaves formatting to the listener thread."""
+
+    def __init__(self, log_queue: "queue.Queue[logging.LogRecord]"):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # The default prepare() formats the message on the calling thread
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+_handler: Optional[_DroppingQueueHandler] = None
+_listener: Optional[QueueListener] = None
+_lock = threading.Lock()
+
+
+def configure_logging() -> None:
+    """Attach the queue handler to the ``app`` logger and start the writer thread (idempotent)."""
+    global _handler, _listener
+    if _listener is not None:
+        return
+    with _lock:
+        if _listener is not None:
+            return
+        stream = logging.StreamHandler(sys.stdout)
+        stream.setFormatter(TextFormatter() if settings.LOG_FORMAT == "text" else JsonFormatter())
+        handler = _DroppingQueueHandler(queue.Queue(maxsize=max(1, settings.LOG_QUEUE_SIZE)))
+
+        root = logging.getLogger(_ROOT_LOGGER)
+        root.setLevel(settings.LOG_LEVEL)
+        root.addHandler(handler)
+        root.propagate = False
+
+        listener = QueueListener(handler.queue, stream)
+        listener.start()
+        _handler, _listener = handler, listener
+        atexit.register(shutdown_logging)
+
+
+def shutdown_logging() -> None:
+    """Write out queued records and stop the writer thread."""
+    global _handler, _listener
+    with _lock:
+        if _listener is None:
+            return
+        _listener.stop()
+        logging.getLogger(_ROOT_LOGGER).removeHandler(_handler)
+        _handler, _listener = None, None
+
+
+def logging_stats() -> Dict[str, int]:
+    handler = _handler
+    if handler is None:
+        return {"queued": 0, "dropped": 0}
+    return {"queued": handler.queue.qsize(), "dropped": handler.dropped}
+
+
+# ==================== LOGGER ====================
+
+class StructuredLogger:
+    """
+    Event logger on top of a stdlib logger.
+
+    Fields are passed as keyword arguments and rendered by the formatter on
+    the writer thread. Guard expensive field values with ``debug_enabled``.
+    """
+
+    __slots__ = ("_logger",)
+
+    def __init__(self, logger: logging.Logger):
+        self._logger = logger
+
+    @property
+    def debug_enabled(self) -> bool:
+        return self._logger.isEnabledFor(logging.DEBUG)
+
+    def debug(self, event: str, **fields: Any) -> None:
+        if not self._logger.isEnabledFor(logging.DEBUG):
+            return
+        rate = settings.LOG_DEBUG_SAMPLE_RATE
+        if rate < 1.0 and random.random() >= rate:
+            return
+        self._logger.debug(event, extra={"fields": fields})
+
+    def info(self, event: str, **fields: Any) -> None:
+        if self._logger.isEnabledFor(logging.INFO):
+            self._logger.info(event, extra={"fields": fields})
+
+    def warning(self, event: str, **fields: Any) -> None:
+        if self._logger.isEnabledFor(logging.WARNING):
+            self._logger.warning(event, extra={"fields": fields})
+
+    def error(self, event: str, exc_info: bool = False, **fields: Any) -> None:
+        if self._logger.isEnabledFor(logging.ERROR):
+            self._logger.error(event, exc_info=exc_info, extra={"fields": fields})
+
+
+def get_logger(name: str) -> StructuredLogger:
+    """Return the event logger for a module (``get_logger(__name__)``)."""
+    configure_logging()
+    if name != _ROOT_LOGGER and not name.startswith(_ROOT_LOGGER + "."):
+        name = f"{_ROOT_LOGGER}.{name}"
+    return StructuredLogger(logging.getLogger(name))
@@ -0,0 +1,364 @@
+"""
+Metrics Registry
+Small in-process counters and histograms with labels.
+
+Features:
+- Counter: monotonically increasing totals (calls, tokens, errors)
+- Gauge: current values that go up and down (circuit breaker state)
+- Histogram: bucketed observations (latencies) with estimated p50/p95/p99
+- One process-wide registry so modules can declare metrics at import time
+- Collectors: callbacks that report existing stats only when scraped
+- Prometheus text exposition (render_prometheus) and timing spans (stage)
+- Thread-safe (sync endpoints and tools run on executor threads)
+"""
+
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+import math
+import threading
+import time
+
+from .log import get_logger
+
+
+log = get_logger(__name__)
+
+
+LabelValues = Tuple[str, ...]
+
+# Latency buckets in seconds (upper bounds; +Inf is implicit)
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0,
+)
+
+
+class Sample(NamedTuple):
+    """One value reported by a collector at scrape time."""
+    name: str
+    kind: str                 # "counter" or "gauge"
+    description: str
+    labels: Dict[str, str]
+    value: float
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, description: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.description = description
+        self.labelnames: Tuple[str, ...] = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        unknown = set(labels) - set(self.labelnames)
+        if unknown:
+            raise ValueError(f"{self.name}: unknown label(s) {sorted(unknown)}")
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def labels_of(self, key: LabelValues) -> Dict[str, str]:
+        return dict(zip(self.labelnames, key))
+
+
+class Counter(_Metric):
+    """A total that only goes up, one value per label set."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, description: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, description, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> Dict[LabelValues, float]:
+        with self._lock:
+            return dict(self._values)
+
+
+class Gauge(_Metric):
+    """A current value, one per label set."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, description: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, description, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def set(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+    def value(self, **labels: str) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> Dict[LabelValues, float]:
+        with self._lock:
+            return dict(self._values)
+
+
+class _HistogramSeries:
+    __slots__ = ("counts", "count", "sum", "min", "max")
+
+    def __init__(self, buckets: int):
+        self.counts = [0] * (buckets + 1)  # Last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+
+class Histogram(_Metric):
+    """
+    Bucketed observations, one series per label set.
+
+    Quantiles are estimated by linear interpolation inside the bucket that
+    contains them, so their precision is bounded by the bucket layout.
+    """
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        labelnames: Sequence[str] = (),
+        buckets: Iterable[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, description, labelnames)
+        self.buckets: Tuple[float, ...] = tuple(sorted(buckets))
+        self._series: Dict[LabelValues, _HistogramSeries] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = _HistogramSeries(len(self.buckets))
+            series.counts[bisect_left(self.buckets, value)] += 1
+            series.count += 1
+            series.sum += value
+            series.min = value if series.min is None else min(series.min, value)
+            series.max = value if series.max is None else max(series.max, value)
+
+    def count(self, **labels: str) -> int:
+        with self._lock:
+            series = self._series.get(self._key(labels))
+            return series.count if series else 0
+
+    def quantile(self, q: float, **labels: str) -> Optional[float]:
+        with self._lock:
+            series = self._series.get(self._key(labels))
+            return self._quantile(series, q) if series else None
+
+    def snapshot(self, **labels: str) -> Dict[str, Optional[float]]:
+        """count, sum, avg, min, max and p50/p95/p99 of one label set."""
+        with self._lock:
+            return self._snapshot(self._series.get(self._key(labels)))
+
+    def series(self) -> Dict[LabelValues, Dict[str, object]]:
+        """Every label set with its cumulative bucket counts and summary."""
+        with self._lock:
+            result = {}
+            for key, series in self._series.items():
+                cumulative, running = [], 0
+                for count in series.counts:
+                    running += count
+                    cumulative.append(running)
+                result[key] = {"buckets": cumulative, **self._snapshot(series)}
+            return result
+
+    def _snapshot(self, series: Optional[_HistogramSeries]) -> Dict[str, Optional[float]]:
+        if series is None or not series.count:
+            return {"count": 0, "sum": 0.0, "avg": None, "min": None, "max": None,
+                    "p50": None, "p95": None, "p99": None}
+        return {
+            "count": series.count,
+            "sum": round(series.sum, 6),
+            "avg": round(series.sum / series.count, 6),
+            "min": round(series.min, 6),
+            "max": round(series.max, 6),
+            "p50": self._quantile(series, 0.50),
+            "p95": self._quantile(series, 0.95),
+            "p99": self._quantile(series, 0.99),
+        }
+
+    def _quantile(self, series: _HistogramSeries, q: float) -> Optional[float]:
+        if not series.count:
+            return None
+        rank = q * series.count
+        seen = 0
+        for index, count in enumerate(series.counts):
+            if count and seen + count >= rank:
+                lower = self.buckets[index - 1] if index > 0 else 0.0
+                upper = self.buckets[index] if index < len(self.buckets) else series.max
+                # Never report beyond what was actually observed
+                lower, upper = max(lower, series.min), min(upper, series.max)
+                estimate = lower + (upper - lower) * ((rank - seen) / count)
+                return round(estimate, 6)
+            seen += count
+        return round(series.max, 6)
+
+
+class MetricsRegistry:
+    """Process-wide collection of metrics, keyed by name."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], Iterable[Sample]]] = []
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, description: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._get_or_create(Counter, name, description, labelnames)
+
+    def gauge(self, name: str, description: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._get_or_create(Gauge, name, description, labelnames)
+
+    def histogram(
+        self,
+        name: str,
+        description: str,
+        labelnames: Sequence[str] = (),
+        buckets: Iterable[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._get_or_create(Histogram, name, description, labelnames, buckets=buckets)
+
+    def get(self, name: str) -> Optional[_Metric]:
+        return self._metrics.get(name)
+
+    def collect(self) -> List[_Metric]:
+        with self._lock:
+            return list(self._metrics.values())
+
+    def register_collector(self, collector: Callable[[], Iterable[Sample]]) -> None:
+        """Add a callback whose samples are read on every scrape."""
+        with self._lock:
+            if collector not in self._collectors:
+                self._collectors.append(collector)
+
+    def collect_samples(self) -> List[Sample]:
+        with self._lock:
+            collectors = list(self._collectors)
+        samples: List[Sample] = []
+        for collector in collectors:
+            try:
+                samples.extend(collector())
+            except Exception as e:
+                # A broken collector must not take the whole scrape down
+                log.error("metrics_collector_failed", collector=getattr(collector, "__name__", str(collector)), error=str(e))
+        return samples
+
+    def _get_or_create(self, cls, name: str, description: str, labelnames: Sequence[str], **kwargs) -> _Metric:
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, description, labelnames, **kwargs)
+            elif not isinstance(metric, cls) or metric.labelnames != tuple(labelnames):
+                raise ValueError(f"metric {name} already registered with a different type or labels")
+            return metric
+
+
+# Global registry
+metrics = MetricsRegistry()
+
+
+# ==================== TIMING SPANS ====================
+
+STAGE_SECONDS = metrics.histogram(
+    "request_stage_seconds",
+    "Time spent per request stage (account_lookup, session, compression, fast_path, agent, model_call, tool, sanitize)",
+    ("stage",),
+)
+
+
+@contextmanager
+def timed(histogram: Histogram, **labels: str) -> Iterator[None]:
+    """Observe the wall time of a ``with`` block (also across awaits)."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        histogram.observe(time.perf_counter() - started, **labels)
+
+
+def stage(name: str):
+    """Timing span for one stage of a chat request."""
+    return timed(STAGE_SECONDS, stage=name)
+
+
+# ==================== PROMETHEUS EXPOSITION ====================
+
+_QUANTILES = (0.5, 0.95, 0.99)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(labels: Dict[str, str], **extra: str) -> str:
+    merged = {**labels, **extra}
+    if not merged:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in merged.items()) + "}"
+
+
+def _number(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def render_prometheus(registry: MetricsRegistry = metrics) -> str:
+    """
+    Render every metric (and collector sample) in the Prometheus text format.
+
+    Histograms are exported as native Prometheus histograms plus a
+    ``<name>_quantile`` gauge with the in-process p50/p95/p99 estimates.
+    """
+    lines: List[str] = []
+    for metric in registry.collect():
+        lines.append(f"# HELP {metric.name} {metric.description}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        if isinstance(metric, Histogram):
+            quantile_lines: List[str] = []
+            for key, series in metric.series().items():
+                labels = metric.labels_of(key)
+                bounds = [_number(b) for b in metric.buckets] + ["+Inf"]
+                for bound, count in zip(bounds, series["buckets"]):
+                    lines.append(f"{metric.name}_bucket{_labels(labels, le=bound)} {count}")
+                lines.append(f"{metric.name}_sum{_labels(labels)} {_number(series['sum'])}")
+                lines.append(f"{metric.name}_count{_labels(labels)} {series['count']}")
+                for q in _QUANTILES:
+                    value = series[f"p{int(q * 100)}"]
+                    if value is not None:
+                        quantile_lines.append(f"{metric.name}_quantile{_labels(labels, quantile=str(q))} {_number(value)}")
+            if quantile_lines:
+                lines.append(f"# HELP {metric.name}_quantile Estimated quantiles of {metric.name}")
+                lines.append(f"# TYPE {metric.name}_quantile gauge")
+                lines.extend(quantile_lines)
+        else:
+            for key, value in metric.samples().items():
+                lines.append(f"{metric.name}{_labels(metric.labels_of(key))} {_number(value)}")
+
+    # All samples of one metric must be adjacent in the exposition
+    families: Dict[str, List[Sample]] = {}
+    for sample in registry.collect_samples():
+        families.setdefault(sample.name, []).append(sample)
+    for name, samples in families.items():
+        lines.append(f"# HELP {name} {samples[0].description}")
+        lines.append(f"# TYPE {name} {samples[0].kind}")
+        for sample in samples:
+            lines.append(f"{name}{_labels(sample.labels)} {_number(sample.value)}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,68 @@
+"""
+Request Context
+Per-request scratch space carried through a contextvar.
+
+The chat endpoints open a request scope; database lookups made anywhere in
+that request (endpoint, agent tools, executor threads) share its memo, so the
+same subscriber is only fetched once per turn. Model and tool calls (and
+model tokens) of the request are counted here for the per-request metrics.
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, Optional
+
+
+class RequestContext:
+    """Rows resolved during the current request (keyed by lookup identifier) and call counts."""
+
+    def __init__(self):
+        self.users: Dict[str, Optional[Dict]] = {}
+        self.connections: Dict[str, Optional[Dict]] = {}
+        self.model_calls = 0
+        self.tool_calls = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+
+
+_current_request: ContextVar[Optional[RequestContext]] = ContextVar("request_context", default=None)
+
+
+def current_request() -> Optional[RequestContext]:
+    """Return the active request context, or None outside a request scope."""
+    return _current_request.get()
+
+
+@contextmanager
+def request_scope() -> Iterator[RequestContext]:
+    """
+    Open a request scope for the duration of a ``with`` block.
+
+    Tasks and executor calls started inside the block copy the contextvar and
+    therefore share the same RequestContext object.
+    """
+    context = RequestContext()
+    token = _current_request.set(context)
+    try:
+        yield context
+    finally:
+        _current_request.reset(token)
+
+
+class RequestContextMiddleware:
+    """
+    ASGI middleware that wraps every HTTP request in a request scope.
+
+    Implemented as plain ASGI (not BaseHTTPMiddleware) so it adds no extra
+    task per request and also covers streaming response bodies.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        with request_scope():
+            await self.app(scope, receive, send)
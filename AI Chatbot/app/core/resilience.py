@@ -0,0 +1,274 @@
+"""
+Resilience Utilities
+Deadlines, hedged requests and a circuit breaker for upstream (model) calls.
+
+Features:
+- Per-call deadline: the caller gets an answer (or TimeoutError) in bounded time
+- Hedging: a second identical attempt is started if the first is slower than
+  a delay (typically the observed p95); the first successful attempt wins
+- Immediate retry when an attempt fails before the deadline
+- CircuitBreaker: after repeated failures, calls fail fast for a cool-down
+  period instead of waiting on an unhealthy upstream; state is exported as
+  metrics
+"""
+
+from concurrent.futures import FIRST_COMPLETED, Executor, Future, wait
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+import asyncio
+import threading
+import time
+
+from .log import get_logger
+from .metrics import Histogram, metrics
+
+
+log = get_logger(__name__)
+
+
+CIRCUIT_STATE = metrics.gauge(
+    "circuit_breaker_state", "Circuit breaker state (0 = closed, 1 = half-open, 2 = open)", ("breaker",),
+)
+CIRCUIT_TRANSITIONS = metrics.counter(
+    "circuit_breaker_transitions_total", "Circuit breaker state changes", ("breaker", "state"),
+)
+CIRCUIT_REJECTIONS = metrics.counter(
+    "circuit_breaker_rejections_total", "Calls failed fast by an open circuit breaker", ("breaker",),
+)
+
+
+# ==================== CIRCUIT BREAKER ====================
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+
+    - closed:    calls go through; ``failure_threshold`` consecutive failures open it
+    - open:      calls are rejected until ``reset_timeout`` seconds have passed
+    - half-open: up to ``half_open_max_calls`` trial calls go through; a success
+                 closes the breaker, a failure opens it again. A trial that
+                 never reports back (e.g. a cancelled request) stops counting
+                 after ``reset_timeout``.
+    """
+
+    CLOSED = "closed"
+    HALF_OPEN = "half_open"
+    OPEN = "open"
+    _STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        half_open_max_calls: int = 1,
+    ):
+        """
+        Args:
+            name: Label used in metrics
+            failure_threshold: Consecutive failures that open the breaker
+            reset_timeout: Seconds to stay open before allowing a trial call
+            half_open_max_calls: Trial calls allowed at once while half-open
+        """
+        self.name = name
+        self.failure_threshold = max(1, int(failure_threshold))
+        self.reset_timeout = max(0.0, reset_timeout)
+        self.half_open_max_calls = max(1, int(half_open_max_calls))
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trials = 0
+        self._trial_at = 0.0
+        self._lock = threading.Lock()
+        CIRCUIT_STATE.set(0, breaker=name)
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._maybe_half_open()
+            return self._state
+
+    def allow(self) -> bool:
+        """Return whether a call may go ahead (counts a rejection if not)."""
+        with self._lock:
+            self._maybe_half_open()
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.HALF_OPEN:
+                now = time.monotonic()
+                if now - self._trial_at >= self.reset_timeout:
+                    self._trials = 0
+                if self._trials < self.half_open_max_calls:
+                    self._trials += 1
+                    self._trial_at = now
+                    return True
+        CIRCUIT_REJECTIONS.inc(breaker=self.name)
+        return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            if self._state != self.CLOSED:
+                self._transition(self.CLOSED)
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN or (
+                self._state == self.CLOSED and self._failures >= self.failure_threshold
+            ):
+                self._opened_at = time.monotonic()
+                self._transition(self.OPEN)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._maybe_half_open()
+            return {
+                "state": self._state,
+                "consecutive_failures": self._failures,
+                "rejections": int(CIRCUIT_REJECTIONS.value(breaker=self.name)),
+            }
+
+    def _maybe_half_open(self) -> None:
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self._transition(self.HALF_OPEN)
+
+    def _transition(self, state: str) -> None:
+        self._state = state
+        self._trials = 0
+        CIRCUIT_STATE.set(self._STATE_VALUES[state], breaker=self.name)
+        CIRCUIT_TRANSITIONS.inc(breaker=self.name, state=state)
+        log.warning("circuit_breaker_transition", breaker=self.name, state=state)
+
+
+# ==================== HEDGING ====================
+
+def hedge_delay(
+    latency: Histogram,
+    quantile: float,
+    min_samples: int,
+    default: float,
+    **labels: str,
+) -> float:
+    """
+    Delay before hedging: the ``quantile`` of observed attempt latency once
+    ``min_samples`` attempts were seen, ``default`` until then.
+    """
+    if latency.count(**labels) < min_samples:
+        return default
+    observed = latency.quantile(quantile, **labels)
+    return observed if observed is not None else default
+
+
+def call_hedged(
+    fn: Callable[[], Any],
+    executor: Executor,
+    timeout: Optional[float] = None,
+    hedge_after: Optional[float] = None,
+    max_attempts: int = 2,
+) -> Tuple[Any, int]:
+    """
+    Run ``fn`` on ``executor`` with a deadline, hedging and retry.
+
+    Returns:
+        (result, attempt) where attempt is 1 for the primary call, 2+ for a
+        hedge/retry. Raises TimeoutError at the deadline or the last error
+        when every attempt failed.
+
+    Threads of attempts that lose (or time out) cannot be interrupted; they
+    run to completion in the background and their results are discarded.
+    """
+    deadline = time.monotonic() + timeout if timeout else None
+    pending: Dict[Future, int] = {}
+    last_error: Optional[BaseException] = None
+    launched = 0
+
+    def launch() -> None:
+        nonlocal launched
+        launched += 1
+        pending[executor.submit(fn)] = launched
+
+    launch()
+    started = time.monotonic()
+    try:
+        while pending:
+            wait_for = _next_wait(deadline, started, hedge_after, launched < max_attempts)
+            done, _ = wait(list(pending), timeout=wait_for, return_when=FIRST_COMPLETED)
+            for future in done:
+                attempt = pending.pop(future)
+                error = future.exception()
+                if error is None:
+                    return future.result(), attempt
+                last_error = error
+            if deadline is not None and time.monotonic() >= deadline:
+                raise TimeoutError(f"no response within {timeout}s")
+            if launched < max_attempts and (not pending or _hedge_due(started, hedge_after)):
+                launch()
+        raise last_error  # type: ignore[misc]
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+async def acall_hedged(
+    factory: Callable[[], Awaitable[Any]],
+    timeout: Optional[float] = None,
+    hedge_after: Optional[float] = None,
+    max_attempts: int = 2,
+) -> Tuple[Any, int]:
+    """
+    Async version of call_hedged(); ``factory`` creates a fresh awaitable per attempt.
+
+    Losing attempts are cancelled as soon as one succeeds or the deadline passes.
+    """
+    deadline = time.monotonic() + timeout if timeout else None
+    pending: Dict[asyncio.Future, int] = {}
+    last_error: Optional[BaseException] = None
+    launched = 0
+
+    def launch() -> None:
+        nonlocal launched
+        launched += 1
+        pending[asyncio.ensure_future(factory())] = launched
+
+    launch()
+    started = time.monotonic()
+    try:
+        while pending:
+            wait_for = _next_wait(deadline, started, hedge_after, launched < max_attempts)
+            done, _ = await asyncio.wait(list(pending), timeout=wait_for, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                attempt = pending.pop(task)
+                error = task.exception()
+                if error is None:
+                    return task.result(), attempt
+                last_error = error
+            if deadline is not None and time.monotonic() >= deadline:
+                raise asyncio.TimeoutError(f"no response within {timeout}s")
+            if launched < max_attempts and (not pending or _hedge_due(started, hedge_after)):
+                launch()
+        raise last_error  # type: ignore[misc]
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+def _hedge_due(started: float, hedge_after: Optional[float]) -> bool:
+    return hedge_after is not None and time.monotonic() - started >= hedge_after
+
+
+def _next_wait(
+    deadline: Optional[float],
+    started: float,
+    hedge_after: Optional[float],
+    can_hedge: bool,
+) -> Optional[float]:
+    """Seconds until the next thing to act on: the hedge point or the deadline."""
+    now = time.monotonic()
+    waits = []
+    if deadline is not None:
+        waits.append(max(0.0, deadline - now))
+    if can_hedge and hedge_after is not None:
+        hedge_at = started + hedge_after
+        if hedge_at > now:
+            waits.append(hedge_at - now)
+    return min(waits) if waits else None
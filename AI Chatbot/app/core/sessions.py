@@ -0,0 +1,307 @@
+"""
+Conversation Session Store
+Server-side conversation state for clients that send a session_id instead of history.
+
+Features:
+- In-process LRU with a session count cap, a memory cap and a TTL
+- Optional spill of evicted sessions to a local SQLite file
+- Keeps the built LangChain message stack between turns
+- Session ids are generated by the server and sessions are bound to the
+  caller's phone number, so one customer cannot read another's conversation
+"""
+
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+import asyncio
+import json
+import secrets
+import sqlite3
+import threading
+import time
+
+from .config import settings
+from .log import get_logger
+
+log = get_logger(__name__)
+
+
+class ConversationSession:
+    """
+    State of one conversation.
+
+    ``summary`` is the rolling summary of turns that were folded away;
+    ``turns`` holds only the turns it does not cover. ``messages`` caches the
+    agent's base message stack (system prompt, summary, turns) and is rebuilt
+    whenever the summary changes; ``context_tokens`` holds its estimated
+    summary and history tokens. ``owner`` is the normalized phone number the
+    session belongs to, if any. Turns of one session are expected to arrive
+    sequentially (one in-flight request per conversation).
+    """
+
+    def __init__(
+        self,
+        session_id: str,
+        turns: Optional[List[Dict[str, str]]] = None,
+        summary: Optional[str] = None,
+        owner: Optional[str] = None,
+    ):
+        self.session_id = session_id
+        self.owner = owner
+        self.turns: List[Dict[str, str]] = list(turns or [])
+        self.summary = summary
+        self.messages: Optional[List[Any]] = None
+        self.context_tokens: Dict[str, int] = {}
+        self.updated_at = time.time()
+
+    def add_turn(self, role: str, content: str) -> None:
+        self.turns.append({"role": role, "content": content})
+
+    def fold(self, summary: Optional[str], covered: int) -> bool:
+        """
+        Replace the first ``covered`` turns with an updated rolling summary.
+
+        Only a real summary is folded in; without one (summarization failed)
+        the turns stay as they are. Returns whether the session changed.
+        """
+        if not summary or covered <= 0:
+            return False
+        self.summary = summary
+        self.turns = self.turns[covered:]
+        self.messages = None
+        self.context_tokens = {}
+        return True
+
+    def size_bytes(self) -> int:
+        """Approximate memory footprint (text dominates; the stack roughly doubles it)."""
+        text = sum(len(t.get("content", "")) + 16 for t in self.turns) + len(self.summary or "")
+        return 256 + text * (2 if self.messages is not None else 1)
+
+    def to_json(self) -> str:
+        return json.dumps({"turns": self.turns, "summary": self.summary, "owner": self.owner}, ensure_ascii=False)
+
+    @classmethod
+    def from_json(cls, session_id: str, data: str) -> "ConversationSession":
+        payload = json.loads(data)
+        return cls(session_id, turns=payload.get("turns"), summary=payload.get("summary"), owner=payload.get("owner"))
+
+
+class SessionStore:
+    """
+    LRU session store with TTL, session-count and memory caps.
+
+    When a SQLite path is configured, sessions evicted for capacity are
+    written there and transparently reloaded on their next request. SQLite
+    I/O never happens under the store lock (it has a lock of its own), and
+    async callers use aresume()/asave(), which run it on a worker thread.
+    """
+
+    def __init__(
+        self,
+        max_sessions: int = 10000,
+        max_bytes: int = 256 * 1024 * 1024,
+        ttl: float = 1800,
+        sqlite_path: Optional[str] = None,
+    ):
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.sqlite_path = sqlite_path or None
+        self._sessions: "OrderedDict[str, ConversationSession]" = OrderedDict()
+        self._sizes: Dict[str, int] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        # Evicted sessions until their spill is written (still served from here)
+        self._spilling: Dict[str, ConversationSession] = {}
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        self.spilled = 0
+        self.reloaded = 0
+        self.expired = 0
+
+        if self.sqlite_path:
+            self._db = sqlite3.connect(self.sqlite_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                "id TEXT PRIMARY KEY, data TEXT NOT NULL, updated_at REAL NOT NULL)"
+            )
+            self._db.commit()
+
+    # ---------------------------------------------------------
+    # Public API
+    # ---------------------------------------------------------
+    def get(self, session_id: str) -> Optional[ConversationSession]:
+        """Return a live session (from memory or spill file), or None."""
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is not None:
+                if self._is_expired(session):
+                    self._remove(session_id)
+                    self.expired += 1
+                    return None
+                self._sessions.move_to_end(session_id)
+                return session
+            session = self._spilling.get(session_id)
+            if session is not None:
+                evicted = self._insert(session)
+        if session is not None:
+            self._spill(evicted)
+            return session
+
+        session = self._load_spilled(session_id)
+        if session is None:
+            return None
+        with self._lock:
+            # Another request may have reloaded it meanwhile
+            current = self._sessions.get(session_id)
+            if current is not None:
+                return current
+            evicted = self._insert(session)
+        self._spill(evicted)
+        return session
+
+    def create(self, owner: Optional[str] = None) -> ConversationSession:
+        """Start a session under a fresh, unguessable id."""
+        session = ConversationSession(secrets.token_urlsafe(18), owner=owner)
+        with self._lock:
+            evicted = self._insert(session)
+        self._spill(evicted)
+        return session
+
+    def resume(self, session_id: Optional[str], owner: Optional[str] = None) -> ConversationSession:
+        """
+        Return the caller's session, or a new one.
+
+        A session bound to a phone number is only returned to requests for
+        that number; an anonymous session is bound to the first number used
+        with it. An unknown, expired or foreign id starts a new session under
+        a new id, which the client must use from then on.
+        """
+        session = self.get(session_id) if session_id else None
+        if session is not None and session.owner and session.owner != owner:
+            log.warning("session_owner_mismatch", session_id=session_id)
+            session = None
+        if session is None:
+            return self.create(owner)
+        if owner and not session.owner:
+            session.owner = owner
+        return session
+
+    async def aresume(self, session_id: Optional[str], owner: Optional[str] = None) -> ConversationSession:
+        """Async version of resume(); spill file I/O runs on a worker thread."""
+        if self._db is None:
+            return self.resume(session_id, owner)
+        return await asyncio.to_thread(self.resume, session_id, owner)
+
+    def save(self, session: ConversationSession) -> None:
+        """Record that ``session`` changed: refresh TTL, size accounting and caps."""
+        session.updated_at = time.time()
+        with self._lock:
+            evicted = self._insert(session)
+        self._spill(evicted)
+
+    async def asave(self, session: ConversationSession) -> None:
+        """Async version of save(); spill file I/O runs on a worker thread."""
+        if self._db is None:
+            self.save(session)
+        else:
+            await asyncio.to_thread(self.save, session)
+
+    def delete(self, session_id: str) -> None:
+        with self._lock:
+            self._remove(session_id)
+            self._spilling.pop(session_id, None)
+        if self._db is not None:
+            with self._db_lock:
+                self._db.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+                self._db.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "sessions": len(self._sessions),
+            "bytes": self._bytes,
+            "spilled": self.spilled,
+            "reloaded": self.reloaded,
+            "expired": self.expired,
+        }
+
+    # ---------------------------------------------------------
+    # Internals (caller holds the lock)
+    # ---------------------------------------------------------
+    def _is_expired(self, session: ConversationSession) -> bool:
+        return time.time() - session.updated_at > self.ttl
+
+    def _insert(self, session: ConversationSession) -> List[ConversationSession]:
+        """Add or refresh ``session``; returns the sessions evicted to make room (to spill)."""
+        sid = session.session_id
+        self._spilling.pop(sid, None)
+        size = session.size_bytes()
+        self._bytes += size - self._sizes.get(sid, 0)
+        self._sizes[sid] = size
+        self._sessions[sid] = session
+        self._sessions.move_to_end(sid)
+        return self._enforce_limits()
+
+    def _remove(self, session_id: str) -> Optional[ConversationSession]:
+        session = self._sessions.pop(session_id, None)
+        self._bytes -= self._sizes.pop(session_id, 0)
+        return session
+
+    def _enforce_limits(self) -> List[ConversationSession]:
+        evicted = []
+        while self._sessions and (
+            len(self._sessions) > self.max_sessions or self._bytes > self.max_bytes
+        ):
+            if len(self._sessions) == 1:
+                break  # Never evict the session currently being served
+            oldest_id = next(iter(self._sessions))
+            session = self._remove(oldest_id)
+            if session is not None and self._db is not None and not self._is_expired(session):
+                self._spilling[oldest_id] = session
+                evicted.append(session)
+        return evicted
+
+    # ---------------------------------------------------------
+    # Spill file (caller does not hold the lock)
+    # ---------------------------------------------------------
+    def _spill(self, sessions: List[ConversationSession]) -> None:
+        if not sessions:
+            return
+        with self._db_lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO sessions (id, data, updated_at) VALUES (?, ?, ?)",
+                [(session.session_id, session.to_json(), session.updated_at) for session in sessions],
+            )
+            self._db.commit()
+            self.spilled += len(sessions)
+        with self._lock:
+            for session in sessions:
+                if self._spilling.get(session.session_id) is session:
+                    del self._spilling[session.session_id]
+
+    def _load_spilled(self, session_id: str) -> Optional[ConversationSession]:
+        if self._db is None:
+            return None
+        with self._db_lock:
+            row = self._db.execute(
+                "SELECT data, updated_at FROM sessions WHERE id = ?", (session_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._db.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+            self._db.commit()
+            if time.time() - row[1] > self.ttl:
+                self.expired += 1
+                return None
+            self.reloaded += 1
+        session = ConversationSession.from_json(session_id, row[0])
+        session.updated_at = row[1]
+        return session
+
+
+# Global session store
+session_store = SessionStore(
+    max_sessions=settings.SESSION_MAX_SESSIONS,
+    max_bytes=settings.SESSION_MAX_MEMORY_MB * 1024 * 1024,
+    ttl=settings.SESSION_TTL,
+    sqlite_path=settings.SESSION_SQLITE_PATH,
+)
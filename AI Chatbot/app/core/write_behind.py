@@ -0,0 +1,285 @@
+"""
+Write-Behind Queue
+Accepts rows immediately and writes them to the database in grouped transactions.
+
+Features:
+- Background writer thread; callers never wait on the database write lock
+- Group commit: rows arriving within a short window share one transaction
+- Optional fsync'd journal so acknowledged rows survive a crash (replayed on start),
+  compacted down to the uncommitted rows as batches commit
+- Bounded retries; rows that keep failing (or fail permanently, e.g. a
+  constraint violation) go to a dead-letter file instead of blocking the queue
+- flush()/close() for shutdown
+"""
+
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import json
+import os
+import queue
+import threading
+import time
+
+from .log import get_logger
+
+
+log = get_logger(__name__)
+
+
+class WriteBehindQueue:
+    """
+    Background group-commit writer.
+
+    ``write_batch`` receives a list of rows and must insert them in a single
+    transaction. It has to be idempotent (rows carry their own primary key),
+    because a batch is retried after a failure and journaled rows are
+    replayed on start.
+
+    A batch is retried up to ``max_retries`` times (errors for which
+    ``is_permanent`` returns True are not retried). Its rows are then written
+    one by one so a single bad row does not take the batch down, and rows
+    that still fail are dead-lettered: logged and, with a
+    ``dead_letter_path``, appended to that file as JSON lines.
+
+    Durability: with a ``journal_path`` every row is appended and fsync'd
+    before submit() returns. Committed rows are dropped from the journal:
+    it is truncated whenever the queue drains, and rewritten with only the
+    uncommitted rows once it is at least ``journal_compact_bytes`` and
+    mostly committed, so it stays bounded under a sustained backlog.
+    Without a journal, rows still queued when the process dies are lost.
+    """
+
+    def __init__(
+        self,
+        write_batch: Callable[[List[Dict[str, Any]]], None],
+        batch_size: int = 100,
+        flush_interval: float = 0.05,
+        journal_path: Optional[str] = None,
+        name: str = "write-behind",
+        max_retries: int = 5,
+        dead_letter_path: Optional[str] = None,
+        is_permanent: Optional[Callable[[Exception], bool]] = None,
+        journal_compact_bytes: int = 1 << 20,
+    ):
+        """
+        Args:
+            write_batch: Inserts a list of rows in one transaction
+            batch_size: Maximum rows per transaction
+            flush_interval: Seconds to wait for more rows before committing
+            journal_path: Append-only journal file (None = no journal)
+            name: Name of the writer thread
+            max_retries: Retries of a failing batch before its rows are written one by one
+            dead_letter_path: File for rows that cannot be written (None = log only)
+            is_permanent: Whether an error can never succeed on retry
+            journal_compact_bytes: Journal size from which committed rows are compacted away
+        """
+        self.write_batch = write_batch
+        self.batch_size = max(1, int(batch_size))
+        self.flush_interval = max(0.0, flush_interval)
+        self.journal_path = journal_path or None
+        self.max_retries = max(0, int(max_retries))
+        self.dead_letter_path = dead_letter_path or None
+        self.is_permanent = is_permanent or (lambda error: False)
+        self.journal_compact_bytes = max(0, int(journal_compact_bytes))
+        self.name = name
+        self._queue: "queue.Queue[Optional[Tuple[int, Dict[str, Any]]]]" = queue.Queue()
+        self._journal_lock = threading.Lock()
+        self._journal = None
+        # Journal lines of rows not yet committed, by submit sequence number
+        self._uncommitted: "OrderedDict[int, str]" = OrderedDict()
+        self._journal_bytes = 0
+        self._live_bytes = 0
+        self._pending = 0
+        self._idle = threading.Condition(self._journal_lock)
+        self._closed = False
+        self.submitted = 0
+        self.committed = 0
+        self.batches = 0
+        self.failures = 0
+        self.dead_lettered = 0
+
+        if self.journal_path:
+            self._replay_journal()
+            self._journal = open(self.journal_path, "a", encoding="utf-8")
+
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    # ---------------------------------------------------------
+    # Public API
+    # ---------------------------------------------------------
+    def submit(self, row: Dict[str, Any]) -> None:
+        """Queue ``row`` for writing (durable on return when journaled)."""
+        with self._journal_lock:
+            if self._closed:
+                raise RuntimeError("write-behind queue is closed")
+            seq = self.submitted
+            if self._journal is not None:
+                line = json.dumps(row, default=str) + "\n"
+                self._journal.write(line)
+                self._journal.flush()
+                os.fsync(self._journal.fileno())
+                self._uncommitted[seq] = line
+                self._journal_bytes += len(line)
+                self._live_bytes += len(line)
+            self._pending += 1
+            self.submitted += 1
+        self._queue.put((seq, row))
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Block until every submitted row is committed. Returns False on timeout."""
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        with self._idle:
+            while self._pending:
+                remaining = deadline - time.monotonic() if deadline is not None else None
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._idle.wait(remaining)
+        return True
+
+    def close(self, timeout: Optional[float] = 10.0) -> bool:
+        """Stop accepting rows, flush what is queued and stop the writer thread."""
+        with self._journal_lock:
+            if self._closed:
+                return self._pending == 0
+            self._closed = True
+        drained = self.flush(timeout)
+        self._queue.put(None)
+        self._thread.join(timeout)
+        with self._journal_lock:
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
+        return drained
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pending": self._pending,
+            "submitted": self.submitted,
+            "committed": self.committed,
+            "batches": self.batches,
+            "failures": self.failures,
+            "dead_lettered": self.dead_lettered,
+            "avg_batch": round(self.committed / self.batches, 2) if self.batches else 0.0,
+        }
+
+    # ---------------------------------------------------------
+    # Writer thread
+    # ---------------------------------------------------------
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._queue.put(None)  # Stop after this batch
+                    break
+                batch.append(item)
+            self._commit(batch)
+
+    def _commit(self, batch: List[Tuple[int, Dict[str, Any]]]) -> None:
+        self._write([row for _, row in batch])
+        with self._idle:
+            self.committed += len(batch)
+            self.batches += 1
+            self._pending -= len(batch)
+            for seq, _ in batch:
+                self._live_bytes -= len(self._uncommitted.pop(seq, ""))
+            if self._journal is not None:
+                self._trim_journal()
+            if self._pending == 0:
+                self._idle.notify_all()
+
+    def _trim_journal(self) -> None:
+        """Drop committed rows from the journal (caller holds the journal lock)."""
+        if not self._uncommitted:
+            # Everything journaled so far is committed
+            self._journal.truncate(0)
+            self._journal_bytes = 0
+            return
+        live = self._live_bytes
+        if self._journal_bytes < self.journal_compact_bytes or self._journal_bytes - live < live:
+            return
+        # Rewrite the uncommitted rows aside and swap the file in atomically
+        compacted = self.journal_path + ".compact"
+        with open(compacted, "w", encoding="utf-8") as journal:
+            journal.writelines(self._uncommitted.values())
+            journal.flush()
+            os.fsync(journal.fileno())
+        self._journal.close()
+        os.replace(compacted, self.journal_path)
+        self._journal = open(self.journal_path, "a", encoding="utf-8")
+        log.info("journal_compacted", writer=self.name, rows=len(self._uncommitted), bytes_before=self._journal_bytes, bytes_after=live)
+        self._journal_bytes = live
+
+    def _write(self, batch: List[Dict[str, Any]]) -> None:
+        """Write ``batch``, retrying with backoff; rows that cannot be written are dead-lettered."""
+        error = self._attempt(batch, self.max_retries)
+        if error is None:
+            return
+        if len(batch) == 1:
+            self._dead_letter(batch[0], error)
+            return
+        # Find the offending rows without holding back the rest
+        for row in batch:
+            error = self._attempt([row], 0)
+            if error is not None:
+                self._dead_letter(row, error)
+
+    def _attempt(self, batch: List[Dict[str, Any]], retries: int) -> Optional[Exception]:
+        """Try ``batch`` up to ``retries`` + 1 times; returns the last error, or None once written."""
+        delay = 0.05
+        error: Optional[Exception] = None
+        for attempt in range(retries + 1):
+            try:
+                self.write_batch(batch)
+                return None
+            except Exception as e:
+                error = e
+                self.failures += 1
+                log.warning("write_batch_failed", writer=self.name, rows=len(batch), attempt=attempt + 1, error=str(e))
+                if self.is_permanent(e):
+                    break
+                if attempt < retries:
+                    time.sleep(delay)
+                    delay = min(delay * 2, 2.0)
+        return error
+
+    def _dead_letter(self, row: Dict[str, Any], error: Exception) -> None:
+        self.dead_lettered += 1
+        log.error("write_dead_lettered", writer=self.name, row=row, error=str(error), path=self.dead_letter_path)
+        if self.dead_letter_path is None:
+            return
+        try:
+            entry = {"row": row, "error": str(error), "failed_at": time.time()}
+            with open(self.dead_letter_path, "a", encoding="utf-8") as dead_letters:
+                dead_letters.write(json.dumps(entry, default=str) + "\n")
+                dead_letters.flush()
+                os.fsync(dead_letters.fileno())
+        except OSError as e:
+            log.error("dead_letter_write_failed", writer=self.name, path=self.dead_letter_path, error=str(e))
+
+    def _replay_journal(self) -> None:
+        """Write rows left in the journal by a previous process."""
+        if not os.path.exists(self.journal_path):
+            return
+        rows = []
+        with open(self.journal_path, "r", encoding="utf-8") as journal:
+            for line in journal:
+                try:
+                    rows.append(json.loads(line))
+                except ValueError:
+                    break  # Torn final write; it was never acknowledged
+        for start in range(0, len(rows), self.batch_size):
+            self._write(rows[start:start + self.batch_size])
+        if rows:
+            log.info("journal_replayed", rows=len(rows), path=self.journal_path)
+        open(self.journal_path, "w").close()
@@ -3,23 +3,86 @@ Database Layer
 Real SQLite database implementation using SQLAlchemy.
 """
 
-from typing import Dict, Optional, List
-from datetime import datetime
-import json
+from typing import Dict, Optional, List, Tuple
+from datetime import datetime, timedelta
+import asyncio
+import hashlib
 import random
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from .models import Base, User, Ticket, Connection
+import re
+import threading
+from sqlalchemy import bindparam, case, create_engine, event, func, insert, inspect, select, text, update
+from sqlalchemy.exc import DataError, IntegrityError
+from sqlalchemy.orm import joinedload, sessionmaker
+from .models import Base, User, Ticket, Connection, IdBlock
+from .core.cache import TTLCache
+from .core.config import settings
+from .core.log import get_logger
+from .core.request_context import current_request
+from .core.write_behind import WriteBehindQueue
+
+try:
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+    _HAS_ASYNC_SQLALCHEMY = True
+except Exception:
+    _HAS_ASYNC_SQLALCHEMY = False
+
+log = get_logger(__name__)
 
 # ==================== DATABASE SETUP ====================
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///./isp_chatbot.db"
+SQLALCHEMY_DATABASE_URL = settings.DATABASE_URL or "sqlite:///./isp_chatbot.db"
+_IS_SQLITE = SQLALCHEMY_DATABASE_URL.startswith("sqlite")
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
+
+def _engine_options() -> Dict:
+    """Explicit pool sizing (SQLite also needs cross-thread connections)."""
+    options: Dict = {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_pre_ping": not _IS_SQLITE,
+    }
+    if _IS_SQLITE:
+        options["connect_args"] = {"check_same_thread": False}
+    return options
+
+
+def _async_database_url(url: str) -> str:
+    """Map a sync DATABASE_URL onto its async driver."""
+    if url.startswith("sqlite:"):
+        return url.replace("sqlite:", "sqlite+aiosqlite:", 1)
+    if url.startswith("postgresql:") or url.startswith("postgres:"):
+        return "postgresql+asyncpg:" + url.split(":", 1)[1]
+    return url
+
+
+def _configure_sqlite(dbapi_connection, connection_record):
+    """WAL lets readers proceed while a ticket write is in progress."""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute(f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}")
+    cursor.execute(f"PRAGMA busy_timeout={settings.SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.close()
+
+
+engine = create_engine(SQLALCHEMY_DATABASE_URL, **_engine_options())
+if _IS_SQLITE:
+    event.listen(engine, "connect", _configure_sqlite)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine for the event-loop code paths; needs aiosqlite (or asyncpg for Postgres)
+async_engine = None
+AsyncSessionLocal = None
+if _HAS_ASYNC_SQLALCHEMY:
+    try:
+        async_engine = create_async_engine(_async_database_url(SQLALCHEMY_DATABASE_URL), **_engine_options())
+        if _IS_SQLITE:
+            event.listen(async_engine.sync_engine, "connect", _configure_sqlite)
+        AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False)
+    except Exception as e:
+        log.warning("async_db_unavailable", error=str(e))
+        async_engine = None
+
 def get_db():
     db = SessionLocal()
     try:
@@ -29,13 +92,44 @@ def get_db():
 
 # ==================== INITIALIZATION ====================
 
+def _add_ticket_dedup_columns() -> None:
+    """Add tickets.category/fingerprint to databases created before them and fill open tickets."""
+    present = {column["name"] for column in inspect(engine).get_columns("tickets")}
+    missing = [name for name in ("category", "fingerprint") if name not in present]
+    if not missing:
+        return
+    with engine.begin() as conn:
+        for name in missing:
+            conn.execute(text(f"ALTER TABLE tickets ADD COLUMN {name} VARCHAR"))
+        # Superseded by ix_tickets_dedup
+        conn.execute(text("DROP INDEX IF EXISTS ix_tickets_user_status_created"))
+        rows = conn.execute(select(Ticket.id, Ticket.issue).where(Ticket.status == "Open")).all()
+        if rows:
+            conn.execute(
+                update(Ticket).where(Ticket.id == bindparam("ticket_id")),
+                [
+                    {
+                        "ticket_id": ticket_id,
+                        "category": _classify_ticket(issue or "")[1],
+                        "fingerprint": _issue_fingerprint(issue or ""),
+                    }
+                    for ticket_id, issue in rows
+                ],
+            )
+    log.info("tickets_migrated", columns=missing, backfilled=len(rows))
+
+
 def init_db():
     """Initialize database with tables and seed data if empty."""
     Base.metadata.create_all(bind=engine)
+    _add_ticket_dedup_columns()
+    # create_all() skips indexes added to tables that already exist
+    for index in Ticket.__table__.indexes:
+        index.create(bind=engine, checkfirst=True)
     
     db = SessionLocal()
     if db.query(User).count() == 0:
-        print("🌱 Seeding database with initial data...")
+        log.info("db_seeding")
         
         # Seed Users
         users_data = [
@@ -82,7 +176,7 @@ def init_db():
                     uptime="15 days, 6 hours",
                     download_speed=98.5,
                     upload_speed=95.2,
-                    issues="[]"
+                    issues=[]
                 )
             elif user.phone == "+8801823456789":
                 conn = Connection(
@@ -94,7 +188,7 @@ def init_db():
                     uptime="0 days, 0 hours",
                     download_speed=0.0,
                     upload_speed=0.0,
-                    issues=json.dumps(["Router offline", "No signal detected", "Possible cable damage"])
+                    issues=["Router offline", "No signal detected", "Possible cable damage"]
                 )
             else:
                 conn = Connection(
@@ -106,17 +200,71 @@ def init_db():
                     uptime="0 days, 0 hours",
                     download_speed=0.0,
                     upload_speed=0.0,
-                    issues=json.dumps(["Account suspended due to unpaid balance"])
+                    issues=["Account suspended due to unpaid balance"]
                 )
             db.add(conn)
         
         db.commit()
-        print("✅ Database seeded successfully.")
+        # A lookup made before seeding may have cached these phones as unknown
+        for user in db.query(User).all():
+            invalidate_user_cache(phone=user.phone, account_id=f"USR{user.id:03d}")
+        log.info("db_seeded")
     
     db.close()
 
-# Initialize DB on module import (or call explicitly in main.py)
-init_db()
+_db_ready = False
+_db_init_lock = threading.Lock()
+
+
+def ensure_db() -> None:
+    """
+    Run init_db() once per process.
+
+    Called by the API startup phase and, lazily, by every query helper, so
+    importing this module never touches the database.
+    """
+    global _db_ready
+    if _db_ready:
+        return
+    with _db_init_lock:
+        if not _db_ready:
+            init_db()
+            _db_ready = True
+
+# ==================== LOOKUP CACHE ====================
+
+# Shared TTL caches in front of the read helpers. Negative results (unknown
+# phone/account) are cached too, with a shorter TTL.
+_account_cache = TTLCache(maxsize=settings.DB_CACHE_SIZE, ttl=settings.DB_CACHE_TTL)
+_connection_cache = TTLCache(maxsize=settings.DB_CACHE_SIZE, ttl=settings.DB_CACHE_TTL)
+_CACHE_MISS = object()
+
+
+def _cache_ttl(value: Optional[Dict]) -> float:
+    return settings.DB_CACHE_TTL if value is not None else settings.DB_NEGATIVE_CACHE_TTL
+
+
+def invalidate_user_cache(phone: Optional[str] = None, account_id: Optional[str] = None) -> None:
+    """
+    Drop cached lookups for a subscriber.
+    
+    Call this from every write path that touches a user or their connection.
+    """
+    if phone:
+        phone = normalize_phone(phone)
+        _account_cache.pop(phone)
+        _connection_cache.pop(phone)
+    if account_id:
+        _connection_cache.pop(account_id.upper())
+
+
+def cache_stats() -> Dict[str, Dict]:
+    """Hit/miss counters of the lookup caches."""
+    return {
+        "accounts": _account_cache.stats(),
+        "connections": _connection_cache.stats(),
+    }
+
 
 # ==================== HELPER FUNCTIONS ====================
 
@@ -140,127 +288,564 @@ def normalize_phone(phone: str) -> str:
 
 # ==================== USER ACCOUNT FUNCTIONS ====================
 
+def _is_phone_identifier(identifier: str) -> bool:
+    return identifier.startswith("+") or identifier.startswith("01") or identifier.startswith("880")
+
+
+def _memo_copy(value: Optional[Dict]) -> Optional[Dict]:
+    # Callers may mutate results; never hand out the memoized dict itself
+    return dict(value) if value is not None else None
+
+
+def _remembered_user(phone: str):
+    """Return the memoized/cached account for ``phone``, or _CACHE_MISS."""
+    context = current_request()
+    if context is not None and phone in context.users:
+        return context.users[phone]
+    account = _account_cache.get(phone, _CACHE_MISS)
+    if account is not _CACHE_MISS and context is not None:
+        context.users[phone] = account
+    return account
+
+
+def _remember_user(phone: str, account: Optional[Dict]) -> None:
+    _account_cache.set(phone, account, ttl=_cache_ttl(account))
+    context = current_request()
+    if context is not None:
+        context.users[phone] = account
+
+
+def _user_to_dict(user: User) -> Dict:
+    return {
+        "account_id": f"USR{user.id:03d}",
+        "name": user.name,
+        "phone": user.phone,
+        "plan": user.plan,
+        "status": user.status,
+        "balance": user.balance,
+        "address": user.address
+    }
+
+
 def get_user_account(phone: str) -> Optional[Dict]:
     """
     Retrieve user account information by phone number.
+    
+    Within a request scope the result is memoized, so the endpoint and the
+    agent's tools share a single lookup per subscriber. Across requests a
+    TTL cache serves repeat lookups (including unknown numbers).
     """
     phone = normalize_phone(phone)
+    account = _remembered_user(phone)
+    if account is _CACHE_MISS:
+        account = _query_user_account(phone)
+        _remember_user(phone, account)
+    return _memo_copy(account)
+
+
+async def aget_user_account(phone: str) -> Optional[Dict]:
+    """Async version of get_user_account(); never blocks the event loop on I/O."""
+    phone = normalize_phone(phone)
+    account = _remembered_user(phone)
+    if account is _CACHE_MISS:
+        if AsyncSessionLocal is None:
+            account = await asyncio.to_thread(_query_user_account, phone)
+        else:
+            account = await _aquery_user_account(phone)
+        _remember_user(phone, account)
+    return _memo_copy(account)
+
+
+def _query_user_account(phone: str) -> Optional[Dict]:
+    ensure_db()
     db = SessionLocal()
     try:
         user = db.query(User).filter(User.phone == phone).first()
-        if user:
-            return {
-                "account_id": f"USR{user.id:03d}",
-                "name": user.name,
-                "phone": user.phone,
-                "plan": user.plan,
-                "status": user.status,
-                "balance": user.balance,
-                "address": user.address
-            }
-        return None
+        return _user_to_dict(user) if user else None
     finally:
         db.close()
 
+
+async def _aquery_user_account(phone: str) -> Optional[Dict]:
+    ensure_db()
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(select(User).where(User.phone == phone).limit(1))
+        user = result.scalars().first()
+        return _user_to_dict(user) if user else None
+
 # ==================== CONNECTION STATUS FUNCTIONS ====================
 
+def _connection_key(identifier: str) -> str:
+    identifier = identifier.strip()
+    return normalize_phone(identifier) if _is_phone_identifier(identifier) else identifier.upper()
+
+
+def _remembered_connection(key: str):
+    """Return the memoized/cached connection status for ``key``, or _CACHE_MISS."""
+    context = current_request()
+    if context is not None and key in context.connections:
+        return context.connections[key]
+    status = _connection_cache.get(key, _CACHE_MISS)
+    if status is not _CACHE_MISS and context is not None:
+        context.connections[key] = status
+    return status
+
+
+def _remember_connection(keys: List[str], status: Optional[Dict]) -> None:
+    context = current_request()
+    for key in keys:
+        _connection_cache.set(key, status, ttl=_cache_ttl(status))
+        if context is not None:
+            context.connections[key] = status
+
+
+def _connection_to_dict(conn: Connection) -> Dict:
+    return {
+        "is_online": bool(conn.is_online),
+        "router_status": conn.router_status,
+        "signal_strength": conn.signal_strength,
+        "last_online": conn.last_online,
+        "uptime": conn.uptime,
+        "download_speed": conn.download_speed,
+        "upload_speed": conn.upload_speed,
+        "issues": list(conn.issues or [])
+    }
+
+
+def _parse_account_id(identifier: str) -> Optional[int]:
+    """USR001 -> 1 (None if the identifier is not an account ID)."""
+    if not identifier.upper().startswith("USR"):
+        return None
+    try:
+        return int(identifier[3:])
+    except ValueError:
+        return None
+
+
 def check_connection_status(identifier: str) -> Optional[Dict]:
     """
     Check internet connection status for a user.
+    
+    Within a request scope the result is memoized under both the
+    subscriber's phone and account ID.
     """
+    key = _connection_key(identifier)
+    status = _remembered_connection(key)
+    if status is _CACHE_MISS:
+        status, aliases = _query_connection_status(identifier)
+        _remember_connection([key, *aliases], status)
+    return _memo_copy(status)
+
+
+async def acheck_connection_status(identifier: str) -> Optional[Dict]:
+    """Async version of check_connection_status(); never blocks the event loop on I/O."""
+    key = _connection_key(identifier)
+    status = _remembered_connection(key)
+    if status is _CACHE_MISS:
+        if AsyncSessionLocal is None:
+            status, aliases = await asyncio.to_thread(_query_connection_status, identifier)
+        else:
+            status, aliases = await _aquery_connection_status(identifier)
+        _remember_connection([key, *aliases], status)
+    return _memo_copy(status)
+
+
+def _connection_lookup(identifier: str):
+    """
+    Build the query for a user and their connection in one round trip.
+
+    The connection is joined eagerly so reading ``user.connection`` does not
+    issue a second (lazy-load) query. Returns None for unusable identifiers.
+    """
+    query = select(User).options(joinedload(User.connection)).limit(1)
+    if _is_phone_identifier(identifier):
+        return query.where(User.phone == normalize_phone(identifier))
+    # Account ID (USR001)
+    uid = _parse_account_id(identifier)
+    if uid is not None:
+        return query.where(User.id == uid)
+    return None
+
+
+def _connection_result(user: Optional[User]) -> Tuple[Optional[Dict], List[str]]:
+    if user and user.connection:
+        return _connection_to_dict(user.connection), [user.phone, f"USR{user.id:03d}"]
+    return None, []
+
+
+def _query_connection_status(identifier: str) -> Tuple[Optional[Dict], List[str]]:
+    """Return (status, [phone, account_id]) for the identified user."""
+    query = _connection_lookup(identifier.strip())
+    if query is None:
+        return None, []
+    ensure_db()
     db = SessionLocal()
     try:
-        # Try to find user first
-        user = None
-        if identifier.startswith("+") or identifier.startswith("01") or identifier.startswith("880"):
-            phone = normalize_phone(identifier)
-            user = db.query(User).filter(User.phone == phone).first()
-        
-        if not user:
-            # Try by account ID (USR001)
-            if identifier.startswith("USR"):
-                try:
-                    uid = int(identifier.replace("USR", ""))
-                    user = db.query(User).filter(User.id == uid).first()
-                except:
-                    pass
-        
-        if user and user.connection:
-            conn = user.connection
-            return {
-                "is_online": bool(conn.is_online),
-                "router_status": conn.router_status,
-                "signal_strength": conn.signal_strength,
-                "last_online": conn.last_online,
-                "uptime": conn.uptime,
-                "download_speed": conn.download_speed,
-                "upload_speed": conn.upload_speed,
-                "issues": json.loads(conn.issues) if conn.issues else []
-            }
-        
-        return None
+        return _connection_result(db.execute(query).scalars().first())
     finally:
         db.close()
 
+
+async def _aquery_connection_status(identifier: str) -> Tuple[Optional[Dict], List[str]]:
+    """Async version of _query_connection_status()."""
+    query = _connection_lookup(identifier.strip())
+    if query is None:
+        return None, []
+    ensure_db()
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(query)
+        return _connection_result(result.scalars().first())
+
 # ==================== SUPPORT TICKET FUNCTIONS ====================
 
+def _classify_ticket(issue_description: str) -> Tuple[str, str]:
+    """Return (priority, category) for an issue description."""
+    # Determine priority based on keywords
+    priority = "Medium"
+    desc_lower = issue_description.lower()
+    if any(word in desc_lower for word in ["urgent", "emergency", "critical"]):
+        priority = "High"
+    elif any(word in desc_lower for word in ["offline", "no internet", "down"]):
+        priority = "High"
+    elif any(word in desc_lower for word in ["slow", "billing", "question"]):
+        priority = "Low"
+    
+    # Determine category
+    category = "General"
+    if "connect" in desc_lower or "internet" in desc_lower:
+        category = "Connectivity"
+    elif "bill" in desc_lower or "payment" in desc_lower:
+        category = "Billing"
+    elif "router" in desc_lower or "hardware" in desc_lower:
+        category = "Hardware"
+    return priority, category
+
+
+def _ticket_phone(issue_description: str) -> Optional[str]:
+    """Extract the subscriber's phone number from a ticket description."""
+    phone_match = re.search(r"(\+880\d{10}|01\d{9})", issue_description)
+    return normalize_phone(phone_match.group(1)) if phone_match else None
+
+
+def _ticket_result(row: Dict, category: str) -> Dict:
+    return {
+        "ticket_id": f"TKT{row['id']:06d}",
+        "description": row["issue"],
+        "priority": row["priority"],
+        "category": category,
+        "status": row["status"],
+        "created_at": row["created_at"],
+        "estimated_resolution": "24-48 hours" if row["priority"] != "High" else "4-8 hours"
+    }
+
+
+# Labels of the "Phone: ... | Issue: ... | Details: ..." input format and filler words
+_FINGERPRINT_STOPWORDS = {
+    "phone", "issue", "details", "account", "user", "customer", "my", "the", "a", "an",
+    "is", "are", "and", "or", "of", "to", "for", "in", "on", "with", "since", "please",
+}
+
+
+def _issue_fingerprint(issue_description: str) -> str:
+    """
+    Normalized fingerprint of an issue description.
+
+    Phone numbers, account IDs, digits, punctuation, case and word order are
+    ignored, so retries and rephrasings of the same report collide.
+    """
+    text = re.sub(r"(\+?880\d{10}|01\d{9}|usr\d+)", " ", issue_description.lower())
+    words = {w for w in re.findall(r"[^\W\d_]+", text) if w not in _FINGERPRINT_STOPWORDS}
+    return hashlib.sha1(" ".join(sorted(words)).encode("utf-8")).hexdigest()[:16]
+
+
+class IdBlockAllocator:
+    """
+    Hi/lo ID allocator.
+
+    Reserves blocks of ``block_size`` IDs with one short transaction on the
+    ``id_blocks`` table and hands them out from memory, so new tickets get
+    their ID without waiting for the insert. IDs of a block that is not used
+    up before a restart are skipped.
+
+    A block is reserved with a single ``UPDATE … RETURNING``, so two
+    processes can never get the same block. A SELECT … FOR UPDATE followed
+    by an UPDATE would not be safe: SQLite ignores FOR UPDATE, and pysqlite
+    only begins the transaction at the UPDATE, so both processes could read
+    the same value first. RETURNING needs SQLite 3.35+ (or PostgreSQL).
+    """
+
+    def __init__(self, name: str, model, block_size: int = 100):
+        self.name = name
+        self.model = model
+        self.block_size = max(1, int(block_size))
+        self._next = 0
+        self._limit = 0
+        self._lock = threading.Lock()
+
+    def next_id(self) -> int:
+        with self._lock:
+            if self._next >= self._limit:
+                self._next = self._reserve()
+                self._limit = self._next + self.block_size
+            self._next += 1
+            return self._next - 1
+
+    def _reserve(self) -> int:
+        ensure_db()
+        # Rows inserted without the allocator must never be reused
+        floor = select(func.coalesce(func.max(self.model.id), 0) + 1).scalar_subquery()
+        start = case((IdBlock.next_id > floor, IdBlock.next_id), else_=floor)
+        reserve = (
+            update(IdBlock)
+            .where(IdBlock.name == self.name)
+            .values(next_id=start + self.block_size)
+            .returning(IdBlock.next_id)
+        )
+        for _ in range(2):
+            with engine.begin() as conn:
+                end = conn.execute(reserve).scalar()
+            if end is not None:
+                return end - self.block_size
+            # First block of this sequence: create its row (another process may win the race)
+            try:
+                with engine.begin() as conn:
+                    conn.execute(insert(IdBlock).values(name=self.name, next_id=1))
+            except IntegrityError:
+                pass
+        raise RuntimeError(f"could not reserve an ID block for {self.name!r}")
+
+
+_ticket_ids = IdBlockAllocator("tickets", Ticket, block_size=settings.TICKET_ID_BLOCK_SIZE)
+_ticket_writer: Optional[WriteBehindQueue] = None
+_ticket_writer_stopped = False
+_ticket_writer_lock = threading.Lock()
+
+
+def _write_ticket_batch(rows: List[Dict]) -> None:
+    """Insert a batch of ticket rows in one transaction (rows already present are skipped)."""
+    ensure_db()
+    with engine.begin() as conn:
+        ids = [row["id"] for row in rows]
+        existing = set(conn.execute(select(Ticket.id).where(Ticket.id.in_(ids))).scalars())
+        fresh = [
+            # Rows journaled before the dedup columns existed lack them
+            {"category": None, "fingerprint": None, **row, "created_at": datetime.fromisoformat(row["created_at"])}
+            for row in rows
+            if row["id"] not in existing
+        ]
+        if fresh:
+            conn.execute(insert(Ticket), fresh)
+
+
+def start_ticket_writer() -> Optional[WriteBehindQueue]:
+    """Start the write-behind ticket queue (replays its journal). Idempotent."""
+    global _ticket_writer, _ticket_writer_stopped
+    if not settings.TICKET_WRITE_BEHIND:
+        return None
+    with _ticket_writer_lock:
+        _ticket_writer_stopped = False
+        if _ticket_writer is None:
+            _ticket_writer = WriteBehindQueue(
+                _write_ticket_batch,
+                batch_size=settings.TICKET_BATCH_SIZE,
+                flush_interval=settings.TICKET_FLUSH_INTERVAL_MS / 1000,
+                journal_path=settings.TICKET_JOURNAL_PATH,
+                name="ticket-writer",
+                max_retries=settings.TICKET_WRITE_RETRIES,
+                dead_letter_path=settings.TICKET_DEAD_LETTER_PATH,
+                # Constraint and data errors fail the same way on every retry
+                is_permanent=lambda error: isinstance(error, (IntegrityError, DataError)),
+            )
+        return _ticket_writer
+
+
+def shutdown_ticket_writer(timeout: float = 10.0) -> bool:
+    """Flush queued tickets and stop the writer. Returns False if rows were left unwritten."""
+    global _ticket_writer, _ticket_writer_stopped
+    with _ticket_writer_lock:
+        writer, _ticket_writer = _ticket_writer, None
+        _ticket_writer_stopped = True
+    if writer is None:
+        return True
+    drained = writer.close(timeout)
+    if not drained:
+        log.warning("ticket_writer_not_drained", pending=writer.stats()["pending"])
+    return drained
+
+
+def ticket_writer_stats() -> Optional[Dict]:
+    writer = _ticket_writer
+    return writer.stats() if writer is not None else None
+
+
+# ==================== TICKET DEDUPLICATION ====================
+
+# (user_id, category, fingerprint) -> result of the open ticket. Also covers
+# tickets still queued on the write-behind writer; the database check
+# covers tickets created before a restart.
+_ticket_dedup_index = TTLCache(
+    maxsize=settings.TICKET_DEDUP_CACHE_SIZE,
+    ttl=settings.TICKET_DEDUP_WINDOW,
+)
+# Striped locks: only requests for the same dedup key wait on each other
+_ticket_dedup_locks = [threading.Lock() for _ in range(64)]
+_suppressed_lock = threading.Lock()
+_suppressed_tickets = 0
+
+
+def _ticket_dedup_lock(key: Tuple) -> threading.Lock:
+    return _ticket_dedup_locks[hash(key) % len(_ticket_dedup_locks)]
+
+
+def _find_open_ticket(user_id: int, category: str, fingerprint: str) -> Optional[Dict]:
+    """Look for a matching open ticket within the dedup window (ix_tickets_dedup)."""
+    since = datetime.utcnow() - timedelta(seconds=settings.TICKET_DEDUP_WINDOW)
+    ensure_db()
+    db = SessionLocal()
+    try:
+        ticket = db.execute(
+            select(Ticket)
+            .where(
+                Ticket.user_id == user_id,
+                Ticket.category == category,
+                Ticket.fingerprint == fingerprint,
+                Ticket.status == "Open",
+                Ticket.created_at >= since,
+            )
+            .order_by(Ticket.created_at.desc())
+            .limit(1)
+        ).scalar()
+        if ticket is None:
+            return None
+        return _ticket_result({
+            "id": ticket.id,
+            "issue": ticket.issue,
+            "priority": ticket.priority,
+            "status": ticket.status,
+            "created_at": ticket.created_at.isoformat(),
+        }, category)
+    finally:
+        db.close()
+
+
+def _open_ticket(issue_description: str, priority: str, category: str, account: Optional[Dict]) -> Dict:
+    """
+    Return the existing open ticket for the same report, or create a new one.
+
+    Tickets are only deduplicated when the subscriber is known.
+    """
+    global _suppressed_tickets
+    user_id = _parse_account_id(account["account_id"]) if account else None
+    fingerprint = _issue_fingerprint(issue_description)
+    if user_id is None or settings.TICKET_DEDUP_WINDOW <= 0:
+        row = _new_ticket_row(issue_description, priority, category, fingerprint, user_id)
+        _store_ticket(row)
+        return _ticket_result(row, category)
+
+    key = (user_id, category, fingerprint)
+    existing = _ticket_dedup_index.get(key)
+    if existing is None:
+        existing = _find_open_ticket(*key)
+        if existing is not None:
+            # Cached for what is left of the ticket's window, not a fresh one
+            age = (datetime.utcnow() - datetime.fromisoformat(existing["created_at"])).total_seconds()
+            _ticket_dedup_index.set(key, existing, ttl=max(0.0, settings.TICKET_DEDUP_WINDOW - age))
+
+    # The ID is reserved before taking the lock; a lost race only skips an ID
+    row = _new_ticket_row(issue_description, priority, category, fingerprint, user_id) if existing is None else None
+    with _ticket_dedup_lock(key):
+        # A concurrent request may have opened it while we were checking
+        existing = existing or _ticket_dedup_index.get(key, count=False)
+        if existing is None:
+            # Claim the key; the ticket is written after the lock is released
+            result = _ticket_result(row, category)
+            _ticket_dedup_index.set(key, result)
+    if existing is not None:
+        # The window runs from the ticket's creation; repeats do not extend it
+        with _suppressed_lock:
+            _suppressed_tickets += 1
+        return {**existing, "duplicate": True}
+
+    try:
+        _store_ticket(row)
+    except Exception:
+        _ticket_dedup_index.pop(key)
+        raise
+    return result
+
+
+def ticket_dedup_stats() -> Dict:
+    return {"suppressed": _suppressed_tickets, **_ticket_dedup_index.stats()}
+
+
+def _new_ticket_row(
+    issue_description: str, priority: str, category: str, fingerprint: str, user_id: Optional[int]
+) -> Dict:
+    return {
+        "id": _ticket_ids.next_id(),
+        "user_id": user_id,
+        "issue": issue_description,
+        "priority": priority,
+        "category": category,
+        "fingerprint": fingerprint,
+        "status": "Open",
+        "created_at": datetime.utcnow().isoformat(),
+    }
+
+
+def _store_ticket(row: Dict) -> None:
+    """Queue the ticket on the write-behind writer, or insert it now when disabled."""
+    # Started on first use, but never restarted behind shutdown_ticket_writer()
+    writer = _ticket_writer or (None if _ticket_writer_stopped else start_ticket_writer())
+    if writer is not None:
+        try:
+            writer.submit(row)
+            return
+        except RuntimeError:
+            pass  # Writer shut down; fall back to a direct insert
+    _write_ticket_batch([row])
+
+
 def create_support_ticket(issue_description: str) -> Optional[Dict]:
     """
     Create a support ticket in the system.
+    
+    The ticket ID is assigned immediately; the insert itself is queued on
+    the write-behind writer (see TICKET_WRITE_BEHIND). A repeat of an open
+    ticket within TICKET_DEDUP_WINDOW returns that ticket instead.
     """
-    db = SessionLocal()
     try:
-        # Determine priority based on keywords
-        priority = "Medium"
-        desc_lower = issue_description.lower()
-        if any(word in desc_lower for word in ["urgent", "emergency", "critical"]):
-            priority = "High"
-        elif any(word in desc_lower for word in ["offline", "no internet", "down"]):
-            priority = "High"
-        elif any(word in desc_lower for word in ["slow", "billing", "question"]):
-            priority = "Low"
-        
-        # Determine category
-        category = "General"
-        if "connect" in desc_lower or "internet" in desc_lower:
-            category = "Connectivity"
-        elif "bill" in desc_lower or "payment" in desc_lower:
-            category = "Billing"
-        elif "router" in desc_lower or "hardware" in desc_lower:
-            category = "Hardware"
+        priority, category = _classify_ticket(issue_description)
         
         # Try to extract phone number to link user
-        user_id = None
-        import re
-        phone_match = re.search(r"(\+880\d{10}|01\d{9})", issue_description)
-        if phone_match:
-            phone = normalize_phone(phone_match.group(1))
-            user = db.query(User).filter(User.phone == phone).first()
-            if user:
-                user_id = user.id
-
-        ticket = Ticket(
-            user_id=user_id,
-            issue=issue_description,
-            priority=priority,
-            status="Open",
-            created_at=datetime.utcnow()
-        )
-        db.add(ticket)
-        db.commit()
-        db.refresh(ticket)
+        phone = _ticket_phone(issue_description)
+        account = get_user_account(phone) if phone else None
+
+        ticket = _open_ticket(issue_description, priority, category, account)
         
-        return {
-            "ticket_id": f"TKT{ticket.id:06d}",
-            "description": ticket.issue,
-            "priority": ticket.priority,
-            "category": category,
-            "status": ticket.status,
-            "created_at": ticket.created_at.isoformat(),
-            "estimated_resolution": "24-48 hours" if priority != "High" else "4-8 hours"
-        }
+        if account is not None and not ticket.get("duplicate"):
+            invalidate_user_cache(phone=account["phone"], account_id=account["account_id"])
+        
+        return ticket
     except Exception as e:
-        print(f"Error creating ticket: {e}")
+        log.error("ticket_create_error", error=str(e))
+        return None
+
+
+async def acreate_support_ticket(issue_description: str) -> Optional[Dict]:
+    """Async version of create_support_ticket(); never blocks the event loop on I/O."""
+    try:
+        priority, category = _classify_ticket(issue_description)
+        phone = _ticket_phone(issue_description)
+        account = await aget_user_account(phone) if phone else None
+
+        # Dedup check, ID block reservation and the journal fsync may touch the disk
+        ticket = await asyncio.to_thread(_open_ticket, issue_description, priority, category, account)
+
+        if account is not None and not ticket.get("duplicate"):
+            invalidate_user_cache(phone=account["phone"], account_id=account["account_id"])
+
+        return ticket
+    except Exception as e:
+        log.error("ticket_create_error", error=str(e))
         return None
-    finally:
-        db.close()
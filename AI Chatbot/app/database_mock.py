@@ -8,6 +8,11 @@ from typing import Dict, Optional, List
 from datetime import datetime
 import random
 
+from .core.log import get_logger
+
+
+log = get_logger(__name__)
+
 
 # ==================== MOCK DATA ====================
 
@@ -208,7 +213,7 @@ def create_support_ticket(issue_description: str) -> Optional[Dict]:
     # In production, save to database:
     # INSERT INTO tickets (ticket_id, description, priority, ...) VALUES (...)
     
-    print(f"✓ Created ticket: {ticket_id} | Priority: {priority} | Category: {category}")
+    log.info("ticket_created", ticket_id=ticket_id, priority=priority, category=category)
     
     return ticket
 
@@ -0,0 +1,335 @@
+"""
+Subscriber Bulk Import
+Streams subscriber exports (CSV or JSONL) into the database in large batched transactions.
+
+Each record is one subscriber; every column except phone is optional and
+only the columns present are written:
+    phone, name, plan, status, balance, address,
+    is_online, router_status, signal_strength, last_online, uptime,
+    download_speed, upload_speed, issues
+
+Usage (from the "AI Chatbot" directory):
+    python -m app.importer subscribers.csv
+    python -m app.importer subscribers.jsonl --chunk-size 20000 --resume
+
+Existing subscribers (same phone) are updated, so re-running a chunk after
+an interruption is safe. With --resume the import continues after the last
+committed chunk recorded in the checkpoint file.
+
+Malformed rows (unparsable lines, bad numbers, nested values) are skipped,
+logged with their line number and listed in the summary; the rest of the
+file is still imported.
+"""
+
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional
+import argparse
+import csv
+import itertools
+import json
+import os
+import sys
+import time
+
+from sqlalchemy import bindparam, insert, select, update
+
+from .core.log import get_logger
+from .database import engine, ensure_db, invalidate_user_cache, normalize_phone
+from .models import Connection, User
+
+
+log = get_logger(__name__)
+
+USER_FIELDS = ("name", "plan", "status", "balance", "address")
+CONNECTION_FIELDS = (
+    "is_online", "router_status", "signal_strength", "last_online",
+    "uptime", "download_speed", "upload_speed", "issues",
+)
+
+# Line numbers of rejected rows kept for the summary
+MAX_REPORTED_REJECTS = 100
+
+
+class Row(NamedTuple):
+    """One record of the source file; ``record`` is None when the line could not be parsed."""
+    line: int
+    record: Optional[Dict[str, Any]]
+    error: Optional[str] = None
+
+
+# ==================== READING ====================
+
+def read_records(path: str, fmt: Optional[str] = None) -> Iterator[Row]:
+    """Yield records one at a time with their line number; the file is never loaded as a whole."""
+    fmt = fmt or ("jsonl" if path.endswith((".jsonl", ".ndjson")) else "csv")
+    with open(path, "r", encoding="utf-8", newline="") as source:
+        if fmt == "csv":
+            reader = csv.DictReader(source)
+            for record in reader:
+                # line_num is the last physical line of the record (quoted fields may span lines)
+                yield Row(reader.line_num, record)
+        else:
+            for number, line in enumerate(source, start=1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError as e:
+                    yield Row(number, None, f"invalid JSON: {e}")
+                    continue
+                if isinstance(record, dict):
+                    yield Row(number, record)
+                else:
+                    yield Row(number, None, f"expected an object, got {type(record).__name__}")
+
+
+def chunked(records: Iterator[Row], size: int) -> Iterator[List[Row]]:
+    while True:
+        chunk = list(itertools.islice(records, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _blank(value: Any) -> bool:
+    return value is None or (isinstance(value, str) and not value.strip())
+
+
+def _to_float(value: Any) -> Optional[float]:
+    return None if _blank(value) else float(value)
+
+
+def _to_text(field: str, value: Any) -> Any:
+    if isinstance(value, (dict, list)):
+        raise ValueError(f"{field}: expected a value, got {type(value).__name__}")
+    return value
+
+
+def _to_online(value: Any) -> int:
+    if isinstance(value, str):
+        return int(value.strip().lower() in ("1", "true", "yes", "online"))
+    return int(bool(value))
+
+
+def _to_issues(value: Any) -> List[str]:
+    """Issues may be a list, a JSON array string or a ';'/'|' separated string."""
+    if _blank(value):
+        return []
+    if isinstance(value, list):
+        return [str(v) for v in value]
+    if not isinstance(value, str):
+        raise ValueError(f"issues: expected a list or string, got {type(value).__name__}")
+    value = value.strip()
+    if value.startswith("["):
+        issues = json.loads(value)
+        if not isinstance(issues, list):
+            raise ValueError("issues: expected a JSON array")
+        return [str(v) for v in issues]
+    return [part.strip() for part in value.replace("|", ";").split(";") if part.strip()]
+
+
+def _to_user(record: Dict[str, Any], phone: str) -> Dict[str, Any]:
+    user = {"phone": phone}
+    for field in USER_FIELDS:
+        if not _blank(record.get(field)):
+            user[field] = _to_text(field, record[field])
+    if "balance" in user:
+        user["balance"] = float(user["balance"])
+    return user
+
+
+def _to_connection(record: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Connection columns present in ``record`` (None if it has none)."""
+    connection = {
+        f: record[f] if f == "issues" else _to_text(f, record[f])
+        for f in CONNECTION_FIELDS
+        if not _blank(record.get(f))
+    }
+    if not connection:
+        return None
+    if "is_online" in connection:
+        connection["is_online"] = _to_online(connection["is_online"])
+    for field in ("download_speed", "upload_speed"):
+        if field in connection:
+            connection[field] = _to_float(connection[field])
+    if "issues" in connection:
+        connection["issues"] = _to_issues(connection["issues"])
+    return connection
+
+
+# ==================== WRITING ====================
+
+def _upsert(conn, model, key: str, rows: List[Dict[str, Any]]) -> None:
+    """Insert new rows and update existing ones (matched on ``key``) with executemany."""
+    if not rows:
+        return
+    column = getattr(model, key)
+    existing = set(conn.execute(select(column).where(column.in_([r[key] for r in rows]))).scalars())
+
+    # executemany needs one column set per statement
+    inserts: Dict[tuple, List[Dict[str, Any]]] = {}
+    updates: Dict[tuple, List[Dict[str, Any]]] = {}
+    for row in rows:
+        target = updates if row[key] in existing else inserts
+        target.setdefault(tuple(sorted(row)), []).append(row)
+
+    for group in inserts.values():
+        conn.execute(insert(model), group)
+    for fields, group in updates.items():
+        values = {f: bindparam(f"v_{f}") for f in fields if f != key}
+        if not values:
+            continue
+        statement = update(model).where(column == bindparam("k")).values(**values)
+        statement = statement.execution_options(synchronize_session=False)
+        conn.execute(statement, [
+            {"k": row[key], **{f"v_{f}": row[f] for f in fields if f != key}} for row in group
+        ])
+
+
+def _reject(rejected: List[int], line: int, error: str) -> None:
+    log.warning("import_row_rejected", line=line, error=error)
+    rejected.append(line)
+
+
+def import_chunk(rows: List[Row]) -> Dict[str, Any]:
+    """
+    Write one chunk of records in a single transaction.
+
+    Malformed rows are left out and returned as ``rejected`` (line numbers).
+    """
+    users: Dict[str, Dict[str, Any]] = {}
+    connections: Dict[str, Dict[str, Any]] = {}
+    skipped = 0
+    rejected: List[int] = []
+    for row in rows:
+        if row.record is None:
+            _reject(rejected, row.line, row.error or "unreadable row")
+            continue
+        phone = normalize_phone(str(row.record.get("phone") or ""))
+        if not phone:
+            skipped += 1
+            continue
+        try:
+            user = _to_user(row.record, phone)
+            connection = _to_connection(row.record)
+        except (TypeError, ValueError) as e:
+            _reject(rejected, row.line, str(e))
+            continue
+        # Later records for the same phone win
+        users[phone] = user
+        if connection is not None:
+            connections[phone] = connection
+
+    ids: Dict[str, int] = {}
+    with engine.begin() as conn:
+        _upsert(conn, User, "phone", list(users.values()))
+        if users:
+            ids = dict(conn.execute(
+                select(User.phone, User.id).where(User.phone.in_(list(users)))
+            ).all())
+        if connections:
+            _upsert(conn, Connection, "user_id", [
+                {"user_id": ids[phone], **connection}
+                for phone, connection in connections.items()
+                if phone in ids
+            ])
+
+    # Cached lookups, including "unknown phone" entries, must not hide the new rows
+    for phone, user_id in ids.items():
+        invalidate_user_cache(phone=phone, account_id=f"USR{user_id:03d}")
+
+    return {"users": len(users), "connections": len(connections), "skipped": skipped, "rejected": rejected}
+
+
+# ==================== CHECKPOINT ====================
+
+def _load_checkpoint(path: str, source: str) -> int:
+    """Number of records already committed for ``source`` (0 if none)."""
+    if not os.path.exists(path):
+        return 0
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if data.get("source") != os.path.abspath(source):
+        return 0
+    return int(data.get("records", 0))
+
+
+def _save_checkpoint(path: str, source: str, records: int) -> None:
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"source": os.path.abspath(source), "records": records}, f)
+    os.replace(tmp, path)
+
+
+# ==================== COMMAND ====================
+
+def run_import(
+    path: str,
+    fmt: Optional[str] = None,
+    chunk_size: int = 10000,
+    resume: bool = False,
+    checkpoint: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Import ``path`` chunk by chunk, committing and checkpointing after each chunk.
+
+    Returns:
+        Totals including rows/sec, the number of rejected rows and the
+        line numbers of the first MAX_REPORTED_REJECTS of them
+    """
+    ensure_db()
+    checkpoint = checkpoint or f"{path}.checkpoint"
+    done = _load_checkpoint(checkpoint, path) if resume else 0
+    records = read_records(path, fmt)
+    if done:
+        print(f"⏩ Resuming after {done:,} records")
+        for _ in itertools.islice(records, done):
+            pass
+
+    totals = {"records": 0, "users": 0, "connections": 0, "skipped": 0, "rejected": 0}
+    rejected_lines: List[int] = []
+    started = time.perf_counter()
+    for chunk in chunked(records, chunk_size):
+        result = import_chunk(chunk)
+        rejected = result.pop("rejected")
+        totals["rejected"] += len(rejected)
+        rejected_lines.extend(rejected[:MAX_REPORTED_REJECTS - len(rejected_lines)])
+        totals["records"] += len(chunk)
+        for key, value in result.items():
+            totals[key] += value
+        _save_checkpoint(checkpoint, path, done + totals["records"])
+
+        elapsed = time.perf_counter() - started
+        print(f"📥 {done + totals['records']:,} records  "
+              f"({totals['records'] / elapsed:,.0f} rows/sec)", flush=True)
+
+    elapsed = time.perf_counter() - started
+    totals["seconds"] = round(elapsed, 2)
+    totals["rows_per_sec"] = round(totals["records"] / elapsed) if elapsed else 0
+    totals["rejected_lines"] = rejected_lines
+    return totals
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.importer", description="Bulk import subscribers.")
+    parser.add_argument("path", help="CSV or JSONL subscriber export")
+    parser.add_argument("--format", choices=("csv", "jsonl"), help="Defaults to the file extension")
+    parser.add_argument("--chunk-size", type=int, default=10000, help="Records per transaction")
+    parser.add_argument("--resume", action="store_true", help="Continue after the last committed chunk")
+    parser.add_argument("--checkpoint", help="Checkpoint file (default: <path>.checkpoint)")
+    args = parser.parse_args(argv)
+
+    totals = run_import(args.path, args.format, max(1, args.chunk_size), args.resume, args.checkpoint)
+    print(f"✅ Imported {totals['records']:,} records "
+          f"({totals['users']:,} users, {totals['connections']:,} connections, "
+          f"{totals['skipped']:,} skipped, {totals['rejected']:,} rejected) in {totals['seconds']}s "
+          f"— {totals['rows_per_sec']:,} rows/sec")
+    if totals["rejected"]:
+        lines = ", ".join(str(line) for line in totals["rejected_lines"])
+        more = totals["rejected"] - len(totals["rejected_lines"])
+        print(f"⚠️  Rejected rows (line numbers): {lines}" + (f" and {more:,} more" if more else ""))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
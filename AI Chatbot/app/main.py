@@ -6,17 +6,48 @@ Main entry point for the AI Support Agent API.
 from fastapi import FastAPI, HTTPException, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from typing import TYPE_CHECKING, Iterator, List, Optional, Tuple
 import uvicorn
+import asyncio
+import json
 import os
 import re
-
-from app.agent.agent import SupportAgent
-from app.core.compression import ContextCompressor
+import threading
+import time
+
+from app.agent.context_builder import context_builder
+from app.agent.fast_path import fast_path
+from app.agent.gemini_adapter import breaker_stats, upstream_concurrency
+from app.agent.router import route_stats
+from app.core.context_token import issue_context_token, read_context_token
+from app.core.log import configure_logging, get_logger, logging_stats, shutdown_logging
+from app.core.metrics import Sample, metrics, render_prometheus, stage
+from app.core.request_context import RequestContextMiddleware, current_request
+from app.core.sessions import ConversationSession, session_store
 from app.core.config import settings, validate_settings
-from app.database import get_user_account, normalize_phone
+from app.database import (
+    acheck_connection_status,
+    aget_user_account,
+    cache_stats,
+    check_connection_status,
+    ensure_db,
+    get_user_account,
+    normalize_phone,
+    shutdown_ticket_writer,
+    start_ticket_writer,
+    ticket_dedup_stats,
+    ticket_writer_stats,
+)
+
+if TYPE_CHECKING:
+    # LangChain and the Gemini SDK are only imported in the startup phase
+    from app.agent.agent import SupportAgent
+    from app.core.compression import CompressedContext, ContextCompressor
+
+
+log = get_logger(__name__)
 
 
 # ==================== UTILITY FUNCTIONS ====================
@@ -79,6 +110,70 @@ def sanitize_agent_response(text: str) -> str:
     return text.strip()
 
 
+class StreamSanitizer:
+    """
+    Incrementally apply sanitize_agent_response to streamed text.
+
+    Text is buffered until a sentence or line boundary that is not inside an
+    open [...] or {...} block; each completed segment is then sanitized and
+    emitted with its original separator.
+    """
+
+    _MARKER_LINE = re.compile(r'^\s*(Thought|Observation|Action|Action Input|Final Answer|Tool)\b', re.IGNORECASE)
+    MAX_BUFFER = 2000
+
+    def __init__(self):
+        self._buffer = ""
+        self._emitted = False
+
+    def feed(self, delta: str) -> str:
+        """Add a streamed delta and return any text that is safe to emit."""
+        self._buffer += delta
+        cut = self._find_cut()
+        if cut <= 0:
+            return ""
+        segment, self._buffer = self._buffer[:cut], self._buffer[cut:]
+        return self._clean(segment)
+
+    def flush(self) -> str:
+        """Emit whatever remains in the buffer at end of stream."""
+        segment, self._buffer = self._buffer, ""
+        return self._clean(segment)
+
+    def _find_cut(self) -> int:
+        cut = 0
+        depth = 0
+        line_start = 0
+        buf = self._buffer
+        for i, ch in enumerate(buf):
+            if ch in "[{":
+                depth += 1
+            elif ch in "]}":
+                depth = max(0, depth - 1)
+            elif ch == "\n":
+                if depth == 0:
+                    cut = i
+                line_start = i + 1
+            elif ch in ".!?" and depth == 0 and i + 1 < len(buf) and buf[i + 1].isspace():
+                # Marker lines are removed whole, so only split them at newlines
+                if not self._MARKER_LINE.match(buf[line_start:i + 1]):
+                    cut = i + 1
+        if cut == 0 and len(buf) > self.MAX_BUFFER:
+            cut = len(buf)
+        return cut
+
+    def _clean(self, segment: str) -> str:
+        cleaned = sanitize_agent_response(segment + "\n")
+        if not cleaned:
+            return ""
+        separator = ""
+        if self._emitted:
+            leading = segment[:len(segment) - len(segment.lstrip())]
+            separator = "\n\n" if leading.count("\n") >= 2 else ("\n" if "\n" in leading else " ")
+        self._emitted = True
+        return separator + cleaned
+
+
 # ==================== PYDANTIC MODELS ====================
 
 class ChatRequest(BaseModel):
@@ -86,6 +181,18 @@ class ChatRequest(BaseModel):
     message: str = Field(..., min_length=1, description="User's message")
     history: List[dict[str, str]] = Field(default=[], description="Previous conversation messages")
     phone_number: Optional[str] = Field(None, description="User's phone number to lookup account_id")
+    context_token: Optional[str] = Field(
+        None,
+        description="Summary token from a previous response; send only the history turns since it",
+    )
+    session_id: Optional[str] = Field(
+        None,
+        max_length=128,
+        description=(
+            "Session id from a previous response (any other value, e.g. \"new\", starts a session) to keep "
+            "conversation state on the server; history is then only used to seed a new session"
+        ),
+    )
 
     class Config:
         json_schema_extra = {
@@ -104,6 +211,15 @@ class ChatResponse(BaseModel):
     """Response model for chat endpoint."""
     reply: str = Field(..., description="Agent's response")
     compressed_context: Optional[str] = Field(None, description="Compressed conversation context")
+    context_token: Optional[str] = Field(
+        None,
+        description="Opaque summary token to send back with the next request (null = resend full history)",
+    )
+    context_turns: int = Field(
+        0,
+        description="How many leading turns of the submitted history the token now covers and may be dropped",
+    )
+    session_id: Optional[str] = Field(None, description="Server-side session the reply was recorded in")
     
     class Config:
         json_schema_extra = {
@@ -119,6 +235,10 @@ class HealthResponse(BaseModel):
     status: str
     version: str
     model: str
+    fast_path: Optional[dict] = Field(None, description="Fast-path hit rate (LLM calls avoided)")
+    agent: Optional[dict] = Field(None, description="Model iterations per request, with and without prefetched customer data")
+    routes: Optional[dict] = Field(None, description="Per-route (light/full/summary) model latency and token usage")
+    circuit_breakers: Optional[dict] = Field(None, description="Circuit breaker state per upstream model")
 
 
 # ==================== FASTAPI APP INITIALIZATION ====================
@@ -127,8 +247,7 @@ class HealthResponse(BaseModel):
 try:
     validate_settings()
 except ValueError as e:
-    print(f"⚠️  Configuration Error: {e}")
-    print("Please check your .env file or environment variables.")
+    log.error("configuration_error", error=str(e), hint="Please check your .env file or environment variables.")
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -148,14 +267,309 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Request-scoped memo for account/connection lookups (shared by the endpoint and tools)
+app.add_middleware(RequestContextMiddleware)
+
 # Mount static files
 static_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "static")
 if os.path.exists(static_path):
     app.mount("/static", StaticFiles(directory=static_path), name="static")
 
-# Initialize AI Agent and Context Compressor
-agent = SupportAgent()
-compressor = ContextCompressor()
+# AI Agent and Context Compressor are built in the startup phase (or on first use)
+_agent: Optional["SupportAgent"] = None
+_compressor: Optional["ContextCompressor"] = None
+_components_lock = threading.Lock()
+
+
+def get_agent() -> "SupportAgent":
+    global _agent
+    if _agent is None:
+        with _components_lock:
+            if _agent is None:
+                from app.agent.agent import SupportAgent
+                _agent = SupportAgent()
+    return _agent
+
+
+def get_compressor() -> "ContextCompressor":
+    global _compressor
+    if _compressor is None:
+        with _components_lock:
+            if _compressor is None:
+                from app.core.compression import ContextCompressor
+                _compressor = ContextCompressor()
+    return _compressor
+
+
+# ==================== METRICS ====================
+
+CHAT_REQUEST_SECONDS = metrics.histogram(
+    "chat_request_seconds", "End-to-end chat request latency in seconds", ("endpoint", "answered_by"),
+)
+_CALL_BUCKETS = (0, 1, 2, 3, 4, 5, 6, 8, 10, 15)
+CHAT_MODEL_CALLS = metrics.histogram(
+    "chat_model_calls_per_request", "Model calls made while answering one chat request", ("endpoint",),
+    buckets=_CALL_BUCKETS,
+)
+CHAT_TOOL_CALLS = metrics.histogram(
+    "chat_tool_calls_per_request", "Tool calls made while answering one chat request", ("endpoint",),
+    buckets=_CALL_BUCKETS,
+)
+CHAT_TOKENS = metrics.histogram(
+    "chat_tokens_per_request", "Model tokens (all calls) spent answering one chat request", ("endpoint", "direction"),
+    buckets=(0, 100, 250, 500, 1000, 2000, 4000, 8000, 16000, 32000),
+)
+
+
+def _observe_request(endpoint: str, started: float, answered_by: str) -> None:
+    """Record the latency, model/tool call counts and tokens of one chat request."""
+    CHAT_REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint=endpoint, answered_by=answered_by)
+    context = current_request()
+    if context is not None:
+        CHAT_MODEL_CALLS.observe(context.model_calls, endpoint=endpoint)
+        CHAT_TOOL_CALLS.observe(context.tool_calls, endpoint=endpoint)
+        CHAT_TOKENS.observe(context.input_tokens, endpoint=endpoint, direction="input")
+        CHAT_TOKENS.observe(context.output_tokens, endpoint=endpoint, direction="output")
+
+
+def _component_samples() -> Iterator[Sample]:
+    """Cache, session, queue and fast-path stats; only read when /metrics is scraped."""
+    caches = {f"db_{name}": stats for name, stats in cache_stats().items()}
+    dedup = ticket_dedup_stats()
+    caches["ticket_dedup"] = dedup
+    for cache, stats in caches.items():
+        labels = {"cache": cache}
+        yield Sample("cache_entries", "gauge", "Entries held per cache", labels, stats["size"])
+        yield Sample("cache_hits_total", "counter", "Cache hits", labels, stats["hits"])
+        yield Sample("cache_misses_total", "counter", "Cache misses", labels, stats["misses"])
+        yield Sample("cache_evictions_total", "counter", "Cache evictions", labels, stats["evictions"])
+    yield Sample("tickets_deduplicated_total", "counter", "Duplicate tickets answered with the open ticket", {}, dedup["suppressed"])
+
+    writer = ticket_writer_stats()
+    if writer is not None:
+        yield Sample("ticket_writer_pending", "gauge", "Tickets queued for the write-behind writer", {}, writer["pending"])
+        for key in ("submitted", "committed", "batches", "failures", "dead_lettered"):
+            yield Sample(f"ticket_writer_{key}_total", "counter", f"Ticket writer {key}", {}, writer[key])
+
+    sessions = session_store.stats()
+    yield Sample("sessions_active", "gauge", "Server-side sessions in memory", {}, sessions["sessions"])
+    yield Sample("sessions_bytes", "gauge", "Approximate size of in-memory sessions", {}, sessions["bytes"])
+    for key in ("spilled", "reloaded", "expired"):
+        yield Sample(f"sessions_{key}_total", "counter", f"Sessions {key}", {}, sessions[key])
+
+    fast = fast_path.stats()
+    yield Sample("fast_path_requests_total", "counter", "Messages offered to the fast path", {}, fast["requests"])
+    for intent, hits in fast["by_intent"].items():
+        yield Sample("fast_path_hits_total", "counter", "Messages answered without the LLM", {"intent": intent}, hits)
+
+    logs = logging_stats()
+    yield Sample("log_queue_records", "gauge", "Log records waiting for the writer thread", {}, logs["queued"])
+    yield Sample("log_records_dropped_total", "counter", "Log records dropped because the queue was full", {}, logs["dropped"])
+
+    concurrency = upstream_concurrency()
+    yield Sample("llm_in_flight", "gauge", "Model calls in flight (all routes)", {}, concurrency["in_flight"])
+    yield Sample("llm_queued", "gauge", "Model calls waiting for a concurrency slot", {}, concurrency["queued"])
+
+
+metrics.register_collector(_component_samples)
+
+
+# ==================== REQUEST HELPERS ====================
+
+def _prefetch_customer(phone_number: Optional[str]) -> Tuple[Optional[str], Optional[dict]]:
+    """
+    Resolve the caller's account_id and, with PREFETCH_ENABLED, prefetch their
+    account and connection status for the agent's first model call.
+
+    Returns:
+        (account_id, prefetched) — prefetched is {"account", "connection"} or None
+    """
+    if not phone_number:
+        return None, None
+    try:
+        with stage("account_lookup"):
+            normalized_phone = normalize_phone(phone_number)
+            account = get_user_account(normalized_phone)
+            account_id = _account_id_of(normalized_phone, account)
+            if not account_id or not settings.PREFETCH_ENABLED:
+                return account_id, None
+            return account_id, {"account": account, "connection": check_connection_status(normalized_phone)}
+    except Exception as e:
+        log.warning("account_lookup_failed", error=str(e))
+    return None, None
+
+
+async def _aprefetch_customer(phone_number: Optional[str]) -> Tuple[Optional[str], Optional[dict]]:
+    """Async version of _prefetch_customer(); the two lookups run concurrently."""
+    if not phone_number:
+        return None, None
+    try:
+        normalized_phone = normalize_phone(phone_number)
+        if not settings.PREFETCH_ENABLED:
+            with stage("account_lookup"):
+                return _account_id_of(normalized_phone, await aget_user_account(normalized_phone)), None
+        with stage("account_lookup"):
+            account, connection = await asyncio.gather(
+                aget_user_account(normalized_phone),
+                acheck_connection_status(normalized_phone),
+                return_exceptions=True,
+            )
+        if isinstance(account, Exception):
+            raise account
+        account_id = _account_id_of(normalized_phone, account)
+        if not account_id:
+            return None, None
+        if isinstance(connection, Exception):
+            # The agent can still call ConnectionStatusTool itself
+            connection = None
+        return account_id, {"account": account, "connection": connection}
+    except Exception as e:
+        log.warning("account_lookup_failed", error=str(e))
+    return None, None
+
+
+def _account_id_of(normalized_phone: str, user_account: Optional[dict]) -> Optional[str]:
+    if not user_account:
+        return None
+    account_id = user_account.get("account_id")
+    log.debug("account_lookup", phone=normalized_phone, account_id=account_id)
+    return account_id
+
+
+def _needs_compression(history: List[dict], previous_summary: Optional[str]) -> bool:
+    return bool(previous_summary) or len(history) >= settings.COMPRESSION_THRESHOLD
+
+
+def _compress_history(history: List[dict], message: str, context_token: Optional[str] = None) -> tuple:
+    """Return (history_for_agent, CompressedContext or None) for a request."""
+    history_for_agent = list(history) if history else []
+    previous_summary = read_context_token(context_token)
+    compressed = None
+    if _needs_compression(history_for_agent, previous_summary):
+        compressed = get_compressor().compress_context(history_for_agent, message, previous_summary)
+        history_for_agent = context_builder.recent(history_for_agent)
+    return history_for_agent, compressed
+
+
+def _start_compression(history: List[dict], message: str, context_token: Optional[str] = None) -> tuple:
+    """
+    Return (history_for_agent, compression_task) for an async request.
+
+    Compression runs as a background task so it never blocks the event loop;
+    the agent awaits it when (and if) the summary is needed.
+    """
+    history_for_agent = list(history) if history else []
+    previous_summary = read_context_token(context_token)
+    compression_task = None
+    if _needs_compression(history_for_agent, previous_summary):
+        compression_task = asyncio.create_task(
+            get_compressor().acompress_context(history_for_agent, message, previous_summary)
+        )
+        # Only the newest turns (by token budget) go verbatim next to the summary
+        history_for_agent = context_builder.recent(history_for_agent)
+    return history_for_agent, compression_task
+
+
+def _context_fields(compressed: Optional["CompressedContext"]) -> dict:
+    """
+    Response fields describing the compressed context and its summary token.
+
+    A token (and a non-zero ``context_turns``) is only issued for a real
+    summary: when summarization failed the client must keep sending the full
+    history, or the turns it drops would be lost.
+    """
+    if compressed is None:
+        return {"compressed_context": None, "context_token": None, "context_turns": 0}
+    if not compressed.summary:
+        return {"compressed_context": compressed.context, "context_token": None, "context_turns": 0}
+    return {
+        "compressed_context": compressed.context,
+        "context_token": issue_context_token(compressed.summary),
+        "context_turns": compressed.covered,
+    }
+
+
+def _passthrough_context(request: "ChatRequest") -> dict:
+    """Context fields for a reply that did not touch the history (fast path)."""
+    token = request.context_token if read_context_token(request.context_token) else None
+    return {"compressed_context": None, "context_token": token, "context_turns": 0}
+
+
+def _seed_session(session: ConversationSession, history: List[dict]) -> None:
+    """Seed a brand-new session from client-supplied history (e.g. when migrating)."""
+    if history and not session.turns and not session.summary:
+        for entry in history:
+            session.add_turn(entry.get("role", "user"), entry.get("content", ""))
+
+
+def _fold_session(session: ConversationSession, compressed: "CompressedContext") -> None:
+    # summary is None when summarization failed; the session then keeps its turns
+    session.fold(compressed.summary, compressed.covered)
+
+
+def _session_owner(request: "ChatRequest") -> Optional[str]:
+    """Phone number a session is bound to (None for anonymous requests)."""
+    return normalize_phone(request.phone_number) if request.phone_number else None
+
+
+def _prepare_session(request: "ChatRequest") -> ConversationSession:
+    """Load (or create) the request's session and fold aged-out turns into its summary."""
+    with stage("session"):
+        session = session_store.resume(request.session_id, _session_owner(request))
+        _seed_session(session, request.history)
+        if len(session.turns) >= settings.COMPRESSION_THRESHOLD:
+            _fold_session(session, get_compressor().compress_context(session.turns, request.message, session.summary))
+    return session
+
+
+async def _aprepare_session(request: "ChatRequest") -> Optional[ConversationSession]:
+    """Async version of _prepare_session(); returns None for requests without a session_id."""
+    if not request.session_id:
+        return None
+    with stage("session"):
+        session = await session_store.aresume(request.session_id, _session_owner(request))
+        _seed_session(session, request.history)
+        if len(session.turns) >= settings.COMPRESSION_THRESHOLD:
+            _fold_session(session, await get_compressor().acompress_context(session.turns, request.message, session.summary))
+    return session
+
+
+def _finish_session(session: Optional[ConversationSession], message: str, reply: str) -> dict:
+    """Record the exchange on the session; returns the session's response fields."""
+    if session is None:
+        return {}
+    get_agent().record_session_turn(session, message, reply)
+    session_store.save(session)
+    return {"session_id": session.session_id, "compressed_context": session.summary}
+
+
+async def _afinish_session(session: Optional[ConversationSession], message: str, reply: str) -> dict:
+    """Async version of _finish_session(); a spill to SQLite never blocks the event loop."""
+    if session is None:
+        return {}
+    get_agent().record_session_turn(session, message, reply)
+    await session_store.asave(session)
+    return {"session_id": session.session_id, "compressed_context": session.summary}
+
+
+def _health() -> "HealthResponse":
+    breakers = breaker_stats()
+    # Still serving (fast path, fallbacks), but the model upstream is failing
+    degraded = any(b["state"] != "closed" for b in breakers.values())
+    return HealthResponse(
+        status="degraded" if degraded else "healthy",
+        version=settings.API_VERSION,
+        model=settings.MODEL_NAME,
+        fast_path=fast_path.stats(),
+        agent=_agent.run_stats() if _agent is not None else None,
+        routes=route_stats(),
+        circuit_breakers=breakers,
+    )
+
+
+def _sse_event(event: str, data: dict) -> str:
+    """Format a single Server-Sent Events frame."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
 
 
 # ==================== API ENDPOINTS ====================
@@ -168,11 +582,7 @@ async def root():
     static_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "static", "index.html")
     if os.path.exists(static_path):
         return FileResponse(static_path)
-    return HealthResponse(
-        status="healthy",
-        version=settings.API_VERSION,
-        model=settings.MODEL_NAME
-    )
+    return _health()
 
 
 @app.get("/health", response_model=HealthResponse)
@@ -180,11 +590,16 @@ async def health_check():
     """
     Health check endpoint for monitoring.
     """
-    return HealthResponse(
-        status="healthy",
-        version=settings.API_VERSION,
-        model=settings.MODEL_NAME
-    )
+    return _health()
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics_endpoint():
+    """
+    Prometheus text exposition of stage timings, model/tool call counters,
+    fallbacks, caches and queues.
+    """
+    return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4; charset=utf-8")
 
 
 @app.post("/chat", response_model=ChatResponse)
@@ -204,65 +619,72 @@ async def chat(request: ChatRequest):
     Returns:
         ChatResponse with agent's reply
     """
+    started, answered_by = time.perf_counter(), "error"
     try:
-        # Step 0: Lookup account_id from phone number
-        account_id = None
-        if request.phone_number:
-            try:
-                normalized_phone = normalize_phone(request.phone_number)
-                user_account = get_user_account(normalized_phone)
-                if user_account:
-                    account_id = user_account.get("account_id")
-                    if settings.VERBOSE_MODE:
-                        print(f"[Account Lookup] Phone: {normalized_phone} → Account: {account_id}")
-            except Exception as e:
-                if settings.VERBOSE_MODE:
-                    print(f"[Account Lookup Failed] {e}")
-        
-        # Step 1: Smart compression of conversation history
-        history_for_agent = list(request.history) if request.history else []
-        compressed_summary = None
-        if history_for_agent and len(history_for_agent) >= settings.COMPRESSION_THRESHOLD:
-            compressed_summary = compressor.smart_compress(history_for_agent, request.message)
-            history_for_agent = history_for_agent[-4:]
+        # Step 0-1: Look up the caller's account and connection while the server-side session loads
+        (account_id, prefetched), session = await asyncio.gather(
+            _aprefetch_customer(request.phone_number),
+            _aprepare_session(request),
+        )
+
+        # Step 1.5: Simple lookups for a known account are answered without the LLM
+        if account_id:
+            fast_reply = await fast_path.aanswer(request.message, request.phone_number)
+            if fast_reply is not None:
+                answered_by = "fast_path"
+                return ChatResponse(
+                    reply=fast_reply,
+                    **{**_passthrough_context(request), **(await _afinish_session(session, request.message, fast_reply))},
+                )
+
+        history_for_agent, compression_task = [], None
+        if session is None:
+            history_for_agent, compression_task = _start_compression(
+                request.history, request.message, request.context_token
+            )
         
         # Step 2: Run agent with processed input and account_id
-        agent_response = await agent.arun(
-            request.message,
-            history=history_for_agent,
-            account_id=account_id,
-            summary=compressed_summary,
-        )
+        with stage("agent"):
+            agent_response = await get_agent().arun(
+                request.message,
+                history=history_for_agent,
+                account_id=account_id,
+                summary=compression_task,
+                session=session,
+                prefetched=prefetched,
+            )
+        compressed = await compression_task if compression_task else None
         
         # Step 2.5: Sanitize the response
-        clean_response = sanitize_agent_response(agent_response)
-
-        # Styled console output with timestamp, colored labels, and truncated/one-line message/response
-        ts = __import__("datetime").datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        phone_display = request.phone_number or "anonymous"
-        acc_display = account_id or "N/A"
-        _clean = lambda s: " ".join(str(s).split())  # collapse whitespace/newlines
-        _truncate = lambda s, n=300: s if len(s) <= n else s[: n - 1] + "…"
-        msg = _truncate(_clean(request.message))
-        resp = _truncate(_clean(clean_response))
-        CYAN = "\033[1;36m"; YELLOW = "\033[1;33m"; GREEN = "\033[1;32m"; MAGENTA = "\033[1;35m"; BLUE = "\033[1;34m"; RESET = "\033[0m"
-        print(f"{CYAN}[{ts}]{RESET} {YELLOW}Phone:{phone_display}{RESET} {BLUE}Account:{acc_display}{RESET} {GREEN}Msg:{RESET} {msg} {MAGENTA}→{RESET} {resp}")
+        with stage("sanitize"):
+            clean_response = sanitize_agent_response(agent_response)
+
+        # Timestamp, JSON encoding and the write happen on the log writer thread
+        log.info(
+            "chat_reply",
+            phone=request.phone_number or "anonymous",
+            account_id=account_id,
+            message=request.message[:300],
+            reply=clean_response[:300],
+        )
         
         # Step 3: Return response
+        answered_by = "agent"
         return ChatResponse(
             reply=clean_response,
-            compressed_context=compressed_summary,
+            **{**_context_fields(compressed), **(await _afinish_session(session, request.message, clean_response))},
         )
         
     except Exception as e:
-        # Log error (in production, use proper logging)
-        print(f"Error in chat endpoint: {e}")
+        log.error("chat_error", endpoint="chat", error=str(e))
         
         # Return user-friendly error
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="I apologize, but I'm having trouble processing your request. Please try again."
         )
+    finally:
+        _observe_request("chat", started, answered_by)
 
 
 @app.post("/chat/sync", response_model=ChatResponse)
@@ -271,78 +693,185 @@ def chat_sync(request: ChatRequest):
     Synchronous version of chat endpoint.
     Use this for compatibility with systems that don't support async.
     """
+    started, answered_by = time.perf_counter(), "error"
     try:
-        # Lookup account_id from phone number
-        account_id = None
-        if request.phone_number:
-            try:
-                normalized_phone = normalize_phone(request.phone_number)
-                user_account = get_user_account(normalized_phone)
-                if user_account:
-                    account_id = user_account.get("account_id")
-            except Exception as e:
-                if settings.VERBOSE_MODE:
-                    print(f"[Account Lookup Failed] {e}")
+        # Lookup account_id (and prefetch account/connection) from phone number
+        account_id, prefetched = _prefetch_customer(request.phone_number)
         
-        history_for_agent = list(request.history) if request.history else []
-        compressed_summary = None
-        if history_for_agent and len(history_for_agent) >= settings.COMPRESSION_THRESHOLD:
-            compressed_summary = compressor.smart_compress(history_for_agent, request.message)
-            history_for_agent = history_for_agent[-4:]
+        session = _prepare_session(request) if request.session_id else None
+
+        fast_reply = fast_path.answer(request.message, request.phone_number) if account_id else None
+        if fast_reply is not None:
+            answered_by = "fast_path"
+            return ChatResponse(
+                reply=fast_reply,
+                **{**_passthrough_context(request), **_finish_session(session, request.message, fast_reply)},
+            )
+
+        history_for_agent, compressed = [], None
+        if session is None:
+            history_for_agent, compressed = _compress_history(
+                request.history, request.message, request.context_token
+            )
         
         # Run agent (synchronous)
-        agent_response = agent.run(
-            request.message,
-            history=history_for_agent,
-            account_id=account_id,
-            summary=compressed_summary,
-        )
+        with stage("agent"):
+            agent_response = get_agent().run(
+                request.message,
+                history=history_for_agent,
+                account_id=account_id,
+                summary=compressed.context if compressed else None,
+                session=session,
+                prefetched=prefetched,
+            )
         
         # Sanitize response
-        clean_response = sanitize_agent_response(agent_response)
+        with stage("sanitize"):
+            clean_response = sanitize_agent_response(agent_response)
         
+        answered_by = "agent"
         return ChatResponse(
             reply=clean_response,
-            compressed_context=compressed_summary,
+            **{**_context_fields(compressed), **_finish_session(session, request.message, clean_response)},
         )
         
     except Exception as e:
-        print(f"Error in sync chat endpoint: {e}")
+        log.error("chat_error", endpoint="chat_sync", error=str(e))
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="I apologize, but I'm having trouble processing your request. Please try again."
         )
+    finally:
+        _observe_request("chat_sync", started, answered_by)
+
+
+@app.post("/chat/stream")
+async def chat_stream(request: ChatRequest):
+    """
+    Streaming chat endpoint (Server-Sent Events).
+    
+    Events:
+    - status: progress updates while the agent works ("Checking your connection…")
+    - token: sanitized chunks of the final answer as they are generated
+    - done: the complete sanitized reply and compressed context
+    - error: a user-friendly error message
+    """
+    async def event_stream():
+        started, answered_by = time.perf_counter(), "error"
+        # First byte goes out before any lookup or model work
+        yield _sse_event("status", {"message": "Thinking…"})
+        try:
+            (account_id, prefetched), session = await asyncio.gather(
+                _aprefetch_customer(request.phone_number),
+                _aprepare_session(request),
+            )
+
+            fast_reply = await fast_path.aanswer(request.message, request.phone_number) if account_id else None
+            if fast_reply is not None:
+                answered_by = "fast_path"
+                yield _sse_event("token", {"text": fast_reply})
+                yield _sse_event("done", {
+                    "reply": fast_reply,
+                    **_passthrough_context(request),
+                    **(await _afinish_session(session, request.message, fast_reply)),
+                })
+                return
+
+            history_for_agent, compression_task = [], None
+            if session is None:
+                history_for_agent, compression_task = _start_compression(
+                    request.history, request.message, request.context_token
+                )
+
+            sanitizer = StreamSanitizer()
+            raw_reply = ""
+            with stage("agent"):
+                async for event in get_agent().astream(
+                    request.message,
+                    history=history_for_agent,
+                    account_id=account_id,
+                    summary=compression_task,
+                    session=session,
+                    prefetched=prefetched,
+                ):
+                    if event["event"] == "token":
+                        raw_reply += event["data"]["text"]
+                        text = sanitizer.feed(event["data"]["text"])
+                        if text:
+                            yield _sse_event("token", {"text": text})
+                    elif event["event"] == "error":
+                        # The reply broke off mid-stream: no done event, nothing recorded in the session
+                        text = sanitizer.flush()
+                        if text:
+                            yield _sse_event("token", {"text": text})
+                        yield _sse_event("error", event["data"])
+                        return
+                    else:
+                        yield _sse_event(event["event"], event["data"])
+
+            text = sanitizer.flush()
+            if text:
+                yield _sse_event("token", {"text": text})
+
+            compressed = await compression_task if compression_task else None
+            with stage("sanitize"):
+                reply = sanitize_agent_response(raw_reply)
+            answered_by = "agent"
+            yield _sse_event("done", {
+                "reply": reply,
+                **_context_fields(compressed),
+                **(await _afinish_session(session, request.message, reply)),
+            })
+
+        except Exception as e:
+            log.error("chat_error", endpoint="chat_stream", error=str(e))
+            yield _sse_event("error", {
+                "detail": "I apologize, but I'm having trouble processing your request. Please try again."
+            })
+        finally:
+            _observe_request("chat_stream", started, answered_by)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 # ==================== STARTUP & SHUTDOWN EVENTS ====================
 
+def _init_storage() -> None:
+    ensure_db()
+    start_ticket_writer()
+
+
+def _build_components() -> None:
+    # With STARTUP_WARMUP=false the first request pays for this instead
+    if settings.STARTUP_WARMUP:
+        get_agent()
+        get_compressor()
+
+
 @app.on_event("startup")
 async def startup_event():
     """
     Run on application startup.
     """
-    # Attempt to configure Google Generative AI if GEMINI_API_KEY or ADC present
-    try:
-        if getattr(settings, "GEMINI_API_KEY", "") or os.getenv("GOOGLE_APPLICATION_CREDENTIALS"):
-            try:
-                import google.generativeai as genai  # type: ignore
-                if getattr(settings, "GEMINI_API_KEY", ""):
-                    try:
-                        genai.configure(api_key=settings.GEMINI_API_KEY)
-                    except Exception:
-                        # ADC may be used instead of API key
-                        pass
-            except Exception:
-                # Not critical if the package isn't installed in this environment
-                pass
-
-    except Exception:
-        pass
+    configure_logging()
+    # Storage (tables, seed data, ticket journal replay) and the agent/compressor
+    # (LangChain + Gemini SDK imports, genai.configure) are independent, so
+    # they are prepared concurrently off the event loop.
+    await asyncio.gather(
+        asyncio.to_thread(_init_storage),
+        asyncio.to_thread(_build_components),
+    )
 
-    print("🚀 AI Support Agent API starting...")
-    print(f"📊 Model: {settings.MODEL_NAME}")
-    print(f"🔧 Environment: {'Development' if settings.VERBOSE_MODE else 'Production'}")
-    print(f"✅ API ready at http://{settings.HOST}:{settings.PORT}")
+    log.info(
+        "api_ready",
+        model=settings.MODEL_NAME,
+        environment="development" if settings.VERBOSE_MODE else "production",
+        url=f"http://{settings.HOST}:{settings.PORT}",
+    )
 
 
 @app.on_event("shutdown")
@@ -350,7 +879,10 @@ async def shutdown_event():
     """
     Run on application shutdown.
     """
-    print("👋 AI Support Agent API shutting down...")
+    log.info("api_shutdown")
+    # Commit queued tickets before the process exits, then write out queued log records
+    await asyncio.to_thread(shutdown_ticket_writer)
+    shutdown_logging()
 
 
 # ==================== MAIN ENTRY POINT ====================
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, create_engine
+from sqlalchemy import JSON, Column, Integer, String, Float, DateTime, ForeignKey, Index, create_engine
 from sqlalchemy.orm import declarative_base, relationship
 from datetime import datetime
 
@@ -30,7 +30,7 @@ class Connection(Base):
     uptime = Column(String)
     download_speed = Column(Float)
     upload_speed = Column(Float)
-    issues = Column(String) # JSON string or comma separated
+    issues = Column(JSON, default=list) # List of issue strings, decoded by the driver
 
     user = relationship("User", back_populates="connection")
 
@@ -42,6 +42,20 @@ class Ticket(Base):
     issue = Column(String)
     status = Column(String, default="open")  # open, in_progress, resolved, closed
     priority = Column(String, default="medium")
+    category = Column(String)
+    fingerprint = Column(String)  # Normalized issue text (duplicate suppression)
     created_at = Column(DateTime, default=datetime.utcnow)
 
     user = relationship("User", back_populates="tickets")
+
+    __table_args__ = (
+        # Open tickets of a subscriber for the same issue in a time window (duplicate suppression)
+        Index("ix_tickets_dedup", "user_id", "category", "fingerprint", "status", "created_at"),
+    )
+
+class IdBlock(Base):
+    """Hi/lo allocator state: the next unreserved ID of each named sequence."""
+    __tablename__ = "id_blocks"
+
+    name = Column(String, primary_key=True)
+    next_id = Column(Integer, nullable=False)
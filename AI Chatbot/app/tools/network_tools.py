@@ -3,8 +3,9 @@ Network Management Tools
 Tools for checking connection status and network diagnostics.
 """
 
-from langchain_core.tools import tool
-from ..database import check_connection_status
+from typing import Dict, Optional
+from langchain_core.tools import StructuredTool
+from ..database import acheck_connection_status, check_connection_status
 
 
 def fetch_connection_status(phone_or_account_id: str) -> str:
@@ -18,13 +19,28 @@ def fetch_connection_status(phone_or_account_id: str) -> str:
         Connection status details including uptime, speed, and issues
     """
     try:
-        status = check_connection_status(phone_or_account_id)
-        
-        if status:
-            connection_state = status.get('is_online', False)
-            status_text = "ONLINE ✓" if connection_state else "OFFLINE ✗"
-            
-            response = f"""
+        return _format_connection_status(check_connection_status(phone_or_account_id), phone_or_account_id)
+    except Exception as e:
+        return f"Error checking connection status: {str(e)}"
+
+
+async def afetch_connection_status(phone_or_account_id: str) -> str:
+    """Async version of fetch_connection_status()."""
+    try:
+        status = await acheck_connection_status(phone_or_account_id)
+        return _format_connection_status(status, phone_or_account_id)
+    except Exception as e:
+        return f"Error checking connection status: {str(e)}"
+
+
+def _format_connection_status(status: Optional[Dict], phone_or_account_id: str) -> str:
+    if not status:
+        return f"Could not retrieve connection status for: {phone_or_account_id}"
+
+    connection_state = status.get('is_online', False)
+    status_text = "ONLINE ✓" if connection_state else "OFFLINE ✗"
+    
+    response = f"""
 Connection Status: {status_text}
 
 Details:
@@ -35,25 +51,19 @@ Details:
 - Download Speed: {status.get('download_speed', 'N/A')} Mbps
 - Upload Speed: {status.get('upload_speed', 'N/A')} Mbps
 """
-            
-            # Add issues if any
-            issues = status.get('issues', [])
-            if issues:
-                response += f"\n⚠️ Detected Issues:\n"
-                for issue in issues:
-                    response += f"  - {issue}\n"
-            
-            return response
-        else:
-            return f"Could not retrieve connection status for: {phone_or_account_id}"
-            
-    except Exception as e:
-        return f"Error checking connection status: {str(e)}"
+    
+    # Add issues if any
+    issues = status.get('issues', [])
+    if issues:
+        response += f"\n⚠️ Detected Issues:\n"
+        for issue in issues:
+            response += f"  - {issue}\n"
+    
+    return response
 
 
-# Create the LangChain Tool using decorator
-@tool
-def ConnectionStatusTool(phone_or_account_id: str) -> str:
+# Create the LangChain Tool (sync + native async implementation)
+def _connection_status_tool(phone_or_account_id: str) -> str:
     """
     Use this tool to check the internet connection status for a user.
     Input should be either a phone number or account ID.
@@ -69,3 +79,10 @@ def ConnectionStatusTool(phone_or_account_id: str) -> str:
         phone_or_account_id: User's phone number or account ID
     """
     return fetch_connection_status(phone_or_account_id)
+
+
+ConnectionStatusTool = StructuredTool.from_function(
+    func=_connection_status_tool,
+    coroutine=afetch_connection_status,
+    name="ConnectionStatusTool",
+)
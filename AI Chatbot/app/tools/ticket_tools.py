@@ -3,8 +3,9 @@ Support Ticket Tools
 Tools for creating and managing support tickets.
 """
 
-from langchain_core.tools import tool
-from ..database import create_support_ticket
+from typing import Dict, Optional
+from langchain_core.tools import StructuredTool
+from ..database import acreate_support_ticket, create_support_ticket
 
 
 def open_support_ticket(issue_description: str) -> str:
@@ -21,11 +22,35 @@ def open_support_ticket(issue_description: str) -> str:
     try:
         # Parse the description to extract key information
         # Format expected: "Phone: +880XXXX | Issue: Description here"
-        
-        ticket = create_support_ticket(issue_description)
-        
-        if ticket and ticket.get('ticket_id'):
-            return f"""
+        return _format_ticket(create_support_ticket(issue_description))
+    except Exception as e:
+        return f"Error creating support ticket: {str(e)}"
+
+
+async def aopen_support_ticket(issue_description: str) -> str:
+    """Async version of open_support_ticket()."""
+    try:
+        return _format_ticket(await acreate_support_ticket(issue_description))
+    except Exception as e:
+        return f"Error creating support ticket: {str(e)}"
+
+
+def _format_ticket(ticket: Optional[Dict]) -> str:
+    if ticket and ticket.get('duplicate'):
+        return f"""
+ℹ️ An Open Ticket Already Exists For This Issue
+
+Ticket Details:
+- Ticket ID: {ticket.get('ticket_id')}
+- Priority: {ticket.get('priority', 'Medium')}
+- Status: {ticket.get('status', 'Open')}
+- Category: {ticket.get('category', 'General')}
+- Opened At: {ticket.get('created_at', 'N/A')}
+
+No new ticket was created. Our support team is already working on it.
+"""
+    if ticket and ticket.get('ticket_id'):
+        return f"""
 ✓ Support Ticket Created Successfully
 
 Ticket Details:
@@ -38,16 +63,11 @@ Ticket Details:
 Our support team will contact you shortly.
 You can track your ticket status using the Ticket ID.
 """
-        else:
-            return "Failed to create support ticket. Please try again or contact support directly."
-            
-    except Exception as e:
-        return f"Error creating support ticket: {str(e)}"
+    return "Failed to create support ticket. Please try again or contact support directly."
 
 
-# Create the LangChain Tool using decorator
-@tool
-def OpenTicketTool(issue_description: str) -> str:
+# Create the LangChain Tool (sync + native async implementation)
+def _open_ticket_tool(issue_description: str) -> str:
     """
     Use this tool to create a support ticket for issues that cannot be resolved immediately.
     Input should be a detailed description including:
@@ -68,3 +88,10 @@ def OpenTicketTool(issue_description: str) -> str:
         issue_description: Detailed description of the user's issue
     """
     return open_support_ticket(issue_description)
+
+
+OpenTicketTool = StructuredTool.from_function(
+    func=_open_ticket_tool,
+    coroutine=aopen_support_ticket,
+    name="OpenTicketTool",
+)
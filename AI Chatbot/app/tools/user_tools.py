@@ -3,8 +3,9 @@ User Management Tools
 Tools for fetching and managing user account information.
 """
 
-from langchain_core.tools import tool
-from ..database import get_user_account
+from typing import Dict, Optional
+from langchain_core.tools import StructuredTool
+from ..database import aget_user_account, get_user_account
 
 
 def fetch_user_account(phone: str) -> str:
@@ -18,10 +19,22 @@ def fetch_user_account(phone: str) -> str:
         JSON string containing user account details or error message
     """
     try:
-        user_data = get_user_account(phone)
-        
-        if user_data:
-            return f"""
+        return _format_user_account(get_user_account(phone), phone)
+    except Exception as e:
+        return f"Error fetching user account: {str(e)}"
+
+
+async def afetch_user_account(phone: str) -> str:
+    """Async version of fetch_user_account()."""
+    try:
+        return _format_user_account(await aget_user_account(phone), phone)
+    except Exception as e:
+        return f"Error fetching user account: {str(e)}"
+
+
+def _format_user_account(user_data: Optional[Dict], phone: str) -> str:
+    if user_data:
+        return f"""
 User Account Found:
 - Name: {user_data.get('name', 'N/A')}
 - Phone: {user_data.get('phone', 'N/A')}
@@ -31,16 +44,11 @@ User Account Found:
 - Balance: {user_data.get('balance', 0)} BDT
 - Connection Type: {user_data.get('connection_type', 'N/A')}
 """
-        else:
-            return f"No user account found for phone number: {phone}"
-            
-    except Exception as e:
-        return f"Error fetching user account: {str(e)}"
+    return f"No user account found for phone number: {phone}"
 
 
-# Create the LangChain Tool using decorator
-@tool
-def GetUserAccountTool(phone: str) -> str:
+# Create the LangChain Tool (sync + native async implementation)
+def _get_user_account_tool(phone: str) -> str:
     """
     Use this tool to fetch user account information using their phone number.
     Input should be a phone number in format: +880XXXXXXXXXX or 01XXXXXXXXX.
@@ -51,3 +59,10 @@ def GetUserAccountTool(phone: str) -> str:
         phone: User's phone number (format: +880XXXXXXXXXX)
     """
     return fetch_user_account(phone)
+
+
+GetUserAccountTool = StructuredTool.from_function(
+    func=_get_user_account_tool,
+    coroutine=afetch_user_account,
+    name="GetUserAccountTool",
+)
@@ -0,0 +1,138 @@
+"""
+Agent Replay Benchmark
+End-to-end latency of SupportAgent.arun, replayed offline from a model cassette.
+
+Runs a fixed set of conversations through SupportAgent.arun against a
+throwaway seeded database. Record them once against the live model, then
+replay the cassette as often as needed: the replay answers from disk, so the
+run measures the agent loop, tool calls and database (plus the recorded model
+latency with --latency-scale 1) without calling the upstream.
+
+Conversations are built in, or read from --conversations (JSON lines with
+"message" and optional "history" and "account_id").
+
+Usage (from the "AI Chatbot" directory):
+    python -m benchmarks.bench_agent --record cassettes/agent.jsonl.gz
+    python -m benchmarks.bench_agent --replay cassettes/agent.jsonl.gz [--rounds 20] [--concurrency 8]
+    python -m benchmarks.bench_agent --replay cassettes/agent.jsonl.gz --latency-scale 1
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+
+def _parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[1])
+    mode = parser.add_mutually_exclusive_group(required=True)
+    mode.add_argument("--record", metavar="CASSETTE", help="Run against the model and record to this cassette")
+    mode.add_argument("--replay", metavar="CASSETTE", help="Replay this cassette")
+    parser.add_argument("--conversations", help="JSON lines of {message, history, account_id}")
+    parser.add_argument("--rounds", type=int, default=10, help="Passes over the conversations when replaying")
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--latency-scale", type=float, default=0.0, help="Replay delay as a multiple of the recorded latency")
+    parser.add_argument("--fake", action="store_true", help="Record from the fake backend (tries the workflow offline)")
+    return parser.parse_args()
+
+
+args = _parse_args()
+
+# Configure the app before it is imported: cassette mode and a throwaway database
+_workdir = tempfile.mkdtemp(prefix="bench_agent_")
+os.environ["LLM_CASSETTE_MODE"] = "record" if args.record else "replay"
+os.environ["LLM_CASSETTE_PATH"] = args.record or args.replay
+os.environ["LLM_CASSETTE_LATENCY_SCALE"] = str(args.latency_scale)
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_workdir, 'bench.db')}"
+os.environ["TICKET_JOURNAL_PATH"] = os.path.join(_workdir, "tickets.journal")
+os.environ["TICKET_DEAD_LETTER_PATH"] = os.path.join(_workdir, "tickets.deadletter.jsonl")
+# Duplicate-ticket answers would differ from the recording on later rounds
+os.environ["TICKET_DEDUP_WINDOW"] = "0"
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+if args.fake:
+    os.environ["LLM_BACKEND"] = "fake"
+    os.environ.setdefault("LLM_FAKE_LATENCY", "fixed:50")
+    os.environ.setdefault("LLM_FAKE_LIGHT_LATENCY", "fixed:20")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.agent.agent import SupportAgent  # noqa: E402
+from app.agent.cassette import get_cassette  # noqa: E402
+from app.database import ensure_db, shutdown_ticket_writer, start_ticket_writer  # noqa: E402
+
+
+CONVERSATIONS = [
+    {"message": "hello"},
+    {"message": "my internet is very slow since this morning, my number is 01712345678"},
+    {"message": "the router keeps disconnecting every few minutes", "account_id": "USR001"},
+    {"message": "internet down for two days, please open a ticket. phone 01823456789"},
+    {
+        "message": "still not working, what should I do?",
+        "history": [
+            {"role": "user", "content": "my wifi is not working, phone 01534567890"},
+            {"role": "assistant", "content": "I checked your connection: your router is offline. Please restart it."},
+        ],
+    },
+    {"message": "what is my current balance? 01712345678"},
+]
+
+
+def load_conversations(path):
+    if not path:
+        return CONVERSATIONS
+    with open(path, encoding="utf-8") as handle:
+        return [json.loads(line) for line in handle if line.strip()]
+
+
+def _percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(q * len(ordered) + 0.5)) - 1))]
+
+
+async def run(agent, conversations, rounds, concurrency):
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    latencies = []
+
+    async def run_one(conversation):
+        async with semaphore:
+            started = time.perf_counter()
+            await agent.arun(
+                conversation["message"],
+                history=conversation.get("history"),
+                account_id=conversation.get("account_id"),
+            )
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    for _ in range(rounds):
+        # Conversations of a round run concurrently; rounds keep the recorded order
+        await asyncio.gather(*(run_one(conversation) for conversation in conversations))
+    return latencies, time.perf_counter() - started
+
+
+def main() -> None:
+    ensure_db()
+    start_ticket_writer()
+    try:
+        conversations = load_conversations(args.conversations)
+        agent = SupportAgent()
+        rounds = 1 if args.record else args.rounds
+        latencies, elapsed = asyncio.run(run(agent, conversations, rounds, args.concurrency))
+    finally:
+        shutdown_ticket_writer()
+
+    cassette = get_cassette()
+    cassette.close()
+    stats = cassette.stats()
+    print(f"📼 {stats['mode']} {stats['path']}: hits={stats['hits']} misses={stats['misses']} recorded={stats['recorded']}")
+    print(f"runs={len(latencies)}  runs/s={len(latencies) / elapsed:,.1f}  "
+          f"p50={_percentile(latencies, 0.50) * 1000:.1f} ms  p95={_percentile(latencies, 0.95) * 1000:.1f} ms  "
+          f"max={max(latencies) * 1000:.1f} ms")
+    if stats["misses"]:
+        print("⚠️  Some requests were not in the cassette (prompt, tools or conversations changed); re-record it")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+Connection Lookup Benchmark
+Queries-per-lookup and latency of check_connection_status on a large subscriber table.
+
+Compares the previous lookup (user query + lazy-loaded connection + json.loads
+of the issues string) with the current eager-loaded single query.
+
+Usage (from the "AI Chatbot" directory):
+    python -m benchmarks.bench_connection_lookup [--subscribers 100000] [--lookups 2000]
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+
+def _parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--subscribers", type=int, default=100_000)
+    parser.add_argument("--lookups", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=7)
+    return parser.parse_args()
+
+
+args = _parse_args()
+
+# Point the app at a throwaway database before app.database is imported
+_workdir = tempfile.mkdtemp(prefix="bench_lookup_")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_workdir, 'bench.db')}"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event, insert, select  # noqa: E402
+
+from app import database  # noqa: E402
+from app.models import Connection, User  # noqa: E402
+
+
+def seed(count: int) -> None:
+    """Insert ``count`` subscribers, each with a connection row."""
+    database.ensure_db()
+    print(f"🌱 Seeding {count:,} subscribers...")
+    started = time.perf_counter()
+    db = database.SessionLocal()
+    try:
+        first_id = (db.execute(select(User.id).order_by(User.id.desc()).limit(1)).scalar() or 0) + 1
+        batch = 10_000
+        for offset in range(0, count, batch):
+            ids = range(first_id + offset, first_id + min(offset + batch, count))
+            db.execute(insert(User), [
+                {
+                    "id": uid,
+                    "phone": f"+88019{uid:08d}",
+                    "name": f"Subscriber {uid}",
+                    "plan": "50 Mbps Standard",
+                    "status": "Active",
+                    "balance": 0.0,
+                    "address": "Dhaka, Bangladesh",
+                }
+                for uid in ids
+            ])
+            db.execute(insert(Connection), [
+                {
+                    "user_id": uid,
+                    "is_online": uid % 5 != 0,
+                    "router_status": "Connected" if uid % 5 else "Disconnected",
+                    "signal_strength": "Good (70%)",
+                    "last_online": "Currently Online",
+                    "uptime": "3 days, 2 hours",
+                    "download_speed": 48.0,
+                    "upload_speed": 45.0,
+                    "issues": [] if uid % 5 else ["Router offline"],
+                }
+                for uid in ids
+            ])
+        db.commit()
+    finally:
+        db.close()
+    print(f"   done in {time.perf_counter() - started:.1f}s")
+
+
+def legacy_lookup(identifier: str):
+    """The lookup as it was before eager loading (kept here for comparison)."""
+    db = database.SessionLocal()
+    try:
+        user = None
+        if database._is_phone_identifier(identifier):
+            phone = database.normalize_phone(identifier)
+            user = db.query(User).filter(User.phone == phone).first()
+        if not user and identifier.upper().startswith("USR"):
+            user = db.query(User).filter(User.id == int(identifier[3:])).first()
+        if user and user.connection:
+            conn = user.connection
+            issues = conn.issues
+            # Issues used to be stored as a JSON string and decoded on every lookup
+            if isinstance(issues, str):
+                issues = json.loads(issues)
+            return {"is_online": bool(conn.is_online), "issues": issues or []}
+        return None
+    finally:
+        db.close()
+
+
+def eager_lookup(identifier: str):
+    return database._query_connection_status(identifier)[0]
+
+
+def run(name: str, lookup, identifiers) -> None:
+    queries = 0
+
+    def count(*_):
+        nonlocal queries
+        queries += 1
+
+    event.listen(database.engine, "before_cursor_execute", count)
+    started = time.perf_counter()
+    try:
+        for identifier in identifiers:
+            assert lookup(identifier) is not None, identifier
+    finally:
+        elapsed = time.perf_counter() - started
+        event.remove(database.engine, "before_cursor_execute", count)
+
+    n = len(identifiers)
+    print(f"{name:<8} queries/lookup={queries / n:.2f}  "
+          f"avg={elapsed / n * 1000:.3f} ms  lookups/s={n / elapsed:,.0f}")
+
+
+def main() -> None:
+    seed(args.subscribers)
+
+    rng = random.Random(args.seed)
+    max_id = args.subscribers + 3
+    identifiers = []
+    for _ in range(args.lookups):
+        uid = rng.randint(4, max_id)
+        identifiers.append(f"+88019{uid:08d}" if rng.random() < 0.5 else f"USR{uid:03d}")
+
+    print(f"\n🔎 {args.lookups:,} lookups (half by phone, half by account ID), caches bypassed")
+    run("legacy", legacy_lookup, identifiers)
+    run("eager", eager_lookup, identifiers)
+
+
+if __name__ == "__main__":
+    main()
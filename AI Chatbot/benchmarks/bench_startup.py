@@ -0,0 +1,69 @@
+"""
+Startup Benchmark
+Cold import time and time-to-ready of the API, measured in fresh interpreters.
+
+Each sample starts a new Python process (as a worker boot or an autoscaled
+replica would) and reports:
+- import:  ``import app.main``
+- startup: the FastAPI startup phase (DB init, ticket writer, agent warm-up)
+- ready:   import + startup
+
+Usage (from the "AI Chatbot" directory):
+    python -m benchmarks.bench_startup [--runs 5]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+
+_PROBE = r"""
+import asyncio, json, time
+started = time.perf_counter()
+import app.main as main
+imported = time.perf_counter()
+
+async def boot():
+    async with main.app.router.lifespan_context(main.app):
+        return time.perf_counter()
+
+ready = asyncio.run(boot())
+print(json.dumps({"import": imported - started, "startup": ready - imported, "ready": ready - started}))
+"""
+
+
+def _sample(warmup: bool, database_url: str) -> dict:
+    env = dict(os.environ)
+    env.setdefault("GEMINI_API_KEY", "benchmark")
+    env["DATABASE_URL"] = database_url
+    env["STARTUP_WARMUP"] = "true" if warmup else "false"
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run(
+        [sys.executable, "-W", "ignore", "-c", _PROBE],
+        cwd=root, env=env, capture_output=True, text=True, check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="API import/startup benchmark")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_startup_")
+    database_url = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    _sample(True, database_url)  # Create and seed the database once
+
+    for warmup in (True, False):
+        samples = [_sample(warmup, database_url) for _ in range(args.runs)]
+        print(f"STARTUP_WARMUP={str(warmup).lower()}  (median of {args.runs})")
+        for key in ("import", "startup", "ready"):
+            print(f"  {key:<8} {statistics.median(s[key] for s in samples) * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,318 @@
+"""
+Load Test
+Throughput and latency percentiles of the chat endpoints under concurrent load.
+
+Drives /chat, /chat/sync and /chat/stream with a mix of greetings, fast-path
+lookups, problem reports and ticket requests at a fixed concurrency. By
+default it starts its own server on the fake model backend (LLM_BACKEND=fake,
+seeded latency), so runs need no network and are reproducible; pass --url
+to load a running server instead.
+
+Reports per endpoint: requests, errors, throughput and p50/p95/p99/max
+latency (plus time to first token for streaming). --save writes the report
+as JSON; --baseline compares with a saved report and exits with status 1 when
+p95 latency, throughput or the error rate regress beyond --max-regression.
+
+Usage (from the "AI Chatbot" directory):
+    python -m benchmarks.load_test [--concurrency 32] [--requests 1000]
+    python -m benchmarks.load_test --duration 30 --latency lognormal:800:0.6 --save baseline.json
+    python -m benchmarks.load_test --baseline baseline.json --max-regression 0.2
+    python -m benchmarks.load_test --url http://localhost:8000 --endpoints chat
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+
+ENDPOINTS = {
+    "chat": "/chat",
+    "chat_sync": "/chat/sync",
+    "chat_stream": "/chat/stream",
+}
+
+# Seeded subscribers (see app.database.init_db)
+PHONES = ("01712345678", "01823456789", "01534567890")
+
+# (message, weight): roughly the traffic mix of the support widget
+MESSAGES = (
+    ("hello", 10),
+    ("what is my current balance", 15),
+    ("what plan am I on", 5),
+    ("check my connection status", 10),
+    ("my internet is very slow since this morning", 25),
+    ("the router keeps disconnecting every few minutes", 15),
+    ("internet down, please open a ticket", 10),
+    ("can I get help with my wifi signal at home", 10),
+)
+
+_HISTORY = [
+    {"role": "user", "content": "hi"},
+    {"role": "assistant", "content": "Hello! How can I help with your internet today?"},
+]
+
+
+def _parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[1])
+    parser.add_argument("--url", help="Load a running server instead of starting one with the fake backend")
+    parser.add_argument("--endpoints", default=",".join(ENDPOINTS), help="Comma-separated: " + ", ".join(ENDPOINTS))
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=1000, help="Total requests (ignored with --duration)")
+    parser.add_argument("--duration", type=float, help="Run for this many seconds instead of a fixed count")
+    parser.add_argument("--warmup", type=int, default=20, help="Unrecorded requests before measuring")
+    parser.add_argument("--anonymous", type=float, default=0.2, help="Fraction of requests without a phone number")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--latency", default="lognormal:600:0.5", help="Fake backend latency (LLM_FAKE_LATENCY)")
+    parser.add_argument("--light-latency", default="lognormal:250:0.4", help="Fake light-route latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fake backend upstream error rate")
+    parser.add_argument("--save", help="Write the report to this JSON file")
+    parser.add_argument("--baseline", help="Compare with a report saved by --save")
+    parser.add_argument("--max-regression", type=float, default=0.2, help="Allowed relative regression (0.2 = 20%%)")
+    return parser.parse_args()
+
+
+# ==================== SERVER ====================
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(args) -> Tuple[subprocess.Popen, str]:
+    """Start uvicorn with the fake backend on a throwaway database."""
+    port = _free_port()
+    workdir = tempfile.mkdtemp(prefix="load_test_")
+    env = dict(os.environ)
+    env.update({
+        "LLM_BACKEND": "fake",
+        "LLM_FAKE_LATENCY": args.latency,
+        "LLM_FAKE_LIGHT_LATENCY": args.light_latency,
+        "LLM_FAKE_ERROR_RATE": str(args.error_rate),
+        "LLM_FAKE_SEED": str(args.seed),
+        "DATABASE_URL": f"sqlite:///{os.path.join(workdir, 'load.db')}",
+        "TICKET_JOURNAL_PATH": os.path.join(workdir, "tickets.journal"),
+        "TICKET_DEAD_LETTER_PATH": os.path.join(workdir, "tickets.deadletter.jsonl"),
+        "LOG_LEVEL": "WARNING",
+    })
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    process = subprocess.Popen(
+        [sys.executable, "-W", "ignore", "-m", "uvicorn", "app.main:app",
+         "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=root, env=env, stdout=subprocess.DEVNULL,
+    )
+    return process, f"http://127.0.0.1:{port}"
+
+
+async def wait_ready(client: httpx.AsyncClient, timeout: float = 60.0) -> None:
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            if (await client.get("/health")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        if time.monotonic() > deadline:
+            raise RuntimeError("server did not become ready")
+        await asyncio.sleep(0.2)
+
+
+# ==================== LOAD ====================
+
+class Recorder:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {}
+        self.first_token: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+
+    def record(self, endpoint: str, latency: float, ok: bool, first_token: Optional[float] = None) -> None:
+        if not ok:
+            self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+            return
+        self.latencies.setdefault(endpoint, []).append(latency)
+        if first_token is not None:
+            self.first_token.setdefault(endpoint, []).append(first_token)
+
+
+def _payload(rng: random.Random, anonymous: float) -> dict:
+    message = rng.choices([m for m, _ in MESSAGES], weights=[w for _, w in MESSAGES])[0]
+    payload = {"message": message, "history": list(_HISTORY) if rng.random() < 0.3 else []}
+    if rng.random() >= anonymous:
+        payload["phone_number"] = rng.choice(PHONES)
+    return payload
+
+
+async def _request(client: httpx.AsyncClient, endpoint: str, payload: dict, recorder: Optional[Recorder]) -> None:
+    started = time.perf_counter()
+    first_token, ok = None, False
+    try:
+        if endpoint == "chat_stream":
+            async with client.stream("POST", ENDPOINTS[endpoint], json=payload) as response:
+                ok = response.status_code == 200
+                async for line in response.aiter_lines():
+                    if line.startswith("event: token") and first_token is None:
+                        first_token = time.perf_counter() - started
+                    elif line.startswith("event: error"):
+                        ok = False
+        else:
+            response = await client.post(ENDPOINTS[endpoint], json=payload)
+            ok = response.status_code == 200
+    except httpx.HTTPError:
+        ok = False
+    if recorder is not None:
+        recorder.record(endpoint, time.perf_counter() - started, ok, first_token)
+
+
+async def run_load(client: httpx.AsyncClient, args, endpoints: List[str], recorder: Optional[Recorder], total: Optional[int]) -> float:
+    """Run ``total`` requests (or until --duration) at --concurrency; returns the elapsed seconds."""
+    rng = random.Random(args.seed)
+    issued = 0
+    deadline = time.monotonic() + args.duration if args.duration and total is None else None
+
+    def next_request():
+        nonlocal issued
+        if deadline is not None:
+            if time.monotonic() >= deadline:
+                return None
+        elif issued >= total:
+            return None
+        endpoint = endpoints[issued % len(endpoints)]
+        issued += 1
+        return endpoint, _payload(rng, args.anonymous)
+
+    async def worker():
+        while True:
+            job = next_request()
+            if job is None:
+                return
+            await _request(client, job[0], job[1], recorder)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    return time.perf_counter() - started
+
+
+# ==================== REPORT ====================
+
+def _percentile(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    # Nearest rank; round() would round half to even and skip ranks
+    index = min(len(ordered) - 1, max(0, math.ceil(q * len(ordered)) - 1))
+    return round(ordered[index], 4)
+
+
+def build_report(recorder: Recorder, endpoints: List[str], elapsed: float, args) -> dict:
+    report = {
+        "concurrency": args.concurrency,
+        "elapsed_seconds": round(elapsed, 3),
+        "backend": "external" if args.url else f"fake ({args.latency}, light {args.light_latency})",
+        "endpoints": {},
+    }
+    for endpoint in endpoints:
+        latencies = recorder.latencies.get(endpoint, [])
+        errors = recorder.errors.get(endpoint, 0)
+        total = len(latencies) + errors
+        stats = {
+            "requests": total,
+            "errors": errors,
+            "error_rate": round(errors / total, 4) if total else 0.0,
+            "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+            "p50": _percentile(latencies, 0.50),
+            "p95": _percentile(latencies, 0.95),
+            "p99": _percentile(latencies, 0.99),
+            "max": round(max(latencies), 4) if latencies else None,
+        }
+        if endpoint in recorder.first_token:
+            first = recorder.first_token[endpoint]
+            stats["first_token_p50"] = _percentile(first, 0.50)
+            stats["first_token_p95"] = _percentile(first, 0.95)
+        report["endpoints"][endpoint] = stats
+    return report
+
+
+def print_report(report: dict) -> None:
+    print(f"\n📈 concurrency={report['concurrency']}  elapsed={report['elapsed_seconds']}s  backend={report['backend']}")
+    print(f"{'endpoint':<12} {'reqs':>6} {'errors':>6} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8} {'ttft p50':>9}")
+    fmt = lambda value: f"{value:.3f}" if value is not None else "-"
+    for endpoint, stats in report["endpoints"].items():
+        print(f"{endpoint:<12} {stats['requests']:>6} {stats['errors']:>6} {stats['throughput_rps']:>8.1f} "
+              f"{fmt(stats['p50']):>8} {fmt(stats['p95']):>8} {fmt(stats['p99']):>8} {fmt(stats['max']):>8} "
+              f"{fmt(stats.get('first_token_p50')):>9}")
+
+
+def compare(report: dict, baseline: dict, max_regression: float) -> List[str]:
+    """Return a description of every metric that regressed beyond ``max_regression``."""
+    regressions = []
+    for endpoint, stats in report["endpoints"].items():
+        base = baseline.get("endpoints", {}).get(endpoint)
+        if not base:
+            continue
+        if base.get("p95") and stats.get("p95") and stats["p95"] > base["p95"] * (1 + max_regression):
+            regressions.append(f"{endpoint}: p95 {base['p95']:.3f}s → {stats['p95']:.3f}s")
+        if base.get("throughput_rps") and stats["throughput_rps"] < base["throughput_rps"] * (1 - max_regression):
+            regressions.append(f"{endpoint}: throughput {base['throughput_rps']} → {stats['throughput_rps']} req/s")
+        if stats["error_rate"] > base.get("error_rate", 0.0) + max_regression * 0.1:
+            regressions.append(f"{endpoint}: error rate {base.get('error_rate', 0.0)} → {stats['error_rate']}")
+    return regressions
+
+
+# ==================== MAIN ====================
+
+async def main_async(args) -> int:
+    endpoints = [name.strip() for name in args.endpoints.split(",") if name.strip()]
+    unknown = [name for name in endpoints if name not in ENDPOINTS]
+    if unknown:
+        raise SystemExit(f"unknown endpoint(s): {', '.join(unknown)}")
+
+    process, url = (None, args.url.rstrip("/")) if args.url else start_server(args)
+    try:
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=url, limits=limits, timeout=120.0) as client:
+            await wait_ready(client)
+            if args.warmup:
+                await run_load(client, args, endpoints, None, args.warmup)
+            print(f"🚦 {args.concurrency} concurrent clients → {', '.join(endpoints)} on {url}")
+            recorder = Recorder()
+            elapsed = await run_load(client, args, endpoints, recorder, None if args.duration else args.requests)
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=30)
+
+    report = build_report(recorder, endpoints, elapsed, args)
+    print_report(report)
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as handle:
+            json.dump(report, handle, indent=2)
+        print(f"💾 Report saved to {args.save}")
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as handle:
+            regressions = compare(report, json.load(handle), args.max_regression)
+        if regressions:
+            print("❌ Regressions against the baseline:")
+            for line in regressions:
+                print(f"   {line}")
+            return 1
+        print("✅ No regressions against the baseline")
+    return 0
+
+
+def main() -> None:
+    sys.exit(asyncio.run(main_async(_parse_args())))
+
+
+if __name__ == "__main__":
+    main()
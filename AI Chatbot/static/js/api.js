@@ -11,13 +11,14 @@ class APIService {
     /**
      * Send a chat message to the API
      */
-    async sendMessage(message, history = [], phoneNumber = null) {
+    async sendMessage(message, history = [], phoneNumber = null, contextToken = null) {
         const endpoint = `${this.baseURL}${this.config.API.ENDPOINTS.CHAT}`;
         
         const payload = {
             message: message,
             history: history.slice(-this.config.CHAT.MAX_HISTORY_LENGTH),
-            phone_number: phoneNumber
+            phone_number: phoneNumber,
+            context_token: contextToken
         };
 
         return await this._fetchWithRetry(endpoint, {
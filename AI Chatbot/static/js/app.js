@@ -183,12 +183,15 @@ class ChatbotApp {
             // Get phone number for account lookup (backend will find account_id)
             const phoneNumber = localStorage.getItem(this.config.STORAGE_KEYS.USER_PHONE) || null;
             
-            // Send to API
+            // Send to API (only turns not covered by the summary token)
+            const context = this.chatManager.getRequestContext();
             const response = await this.api.sendMessage(
                 message,
-                this.chatManager.getCurrentHistory(),
-                phoneNumber
+                context.history,
+                phoneNumber,
+                context.contextToken
             );
+            this.chatManager.updateContext(response, context.offset);
 
             // Hide typing indicator
             this.ui.hideTyping();
@@ -5,6 +5,8 @@ class ChatManager {
         this.currentChatId = null;
         this.chatHistory = [];
         this.allChats = [];
+        this.contextToken = null;   // Summary token from the server
+        this.summaryIndex = 0;      // History entries already covered by the token
         this.loadFromStorage();
     }
 
@@ -20,6 +22,8 @@ class ChatManager {
         // Generate new chat ID
         this.currentChatId = Date.now().toString();
         this.chatHistory = [];
+        this.contextToken = null;
+        this.summaryIndex = 0;
 
         // Save to storage
         this.saveToStorage();
@@ -41,6 +45,8 @@ class ChatManager {
 
         this.currentChatId = chatId;
         this.chatHistory = chat.history || [];
+        this.contextToken = chat.contextToken || null;
+        this.summaryIndex = chat.summaryIndex || 0;
 
         return chat;
     }
@@ -62,6 +68,8 @@ class ChatManager {
             preview: this._generatePreview(),
             timestamp: Date.now(),
             history: this.chatHistory,
+            contextToken: this.contextToken,
+            summaryIndex: this.summaryIndex,
             messageCount: Math.floor(this.chatHistory.length / 2)
         };
 
@@ -88,6 +96,8 @@ class ChatManager {
         if (this.currentChatId === chatId) {
             this.currentChatId = null;
             this.chatHistory = [];
+            this.contextToken = null;
+            this.summaryIndex = 0;
         }
 
         this.saveToStorage();
@@ -129,6 +139,35 @@ class ChatManager {
         return this.chatHistory;
     }
 
+    /**
+     * Get the request context: only the turns not yet covered by the
+     * server's summary token, plus the token itself
+     */
+    getRequestContext() {
+        const pending = this.chatHistory.slice(this.summaryIndex);
+        const history = pending.slice(-this.config.CHAT.MAX_HISTORY_LENGTH);
+
+        return {
+            history: history,
+            offset: this.chatHistory.length - history.length,
+            contextToken: this.contextToken
+        };
+    }
+
+    /**
+     * Store the summary token returned by the server
+     */
+    updateContext(response, offset) {
+        if (response && response.context_token) {
+            this.contextToken = response.context_token;
+            this.summaryIndex = offset + (response.context_turns || 0);
+        } else {
+            // No (or rejected) token: fall back to sending full history
+            this.contextToken = null;
+            this.summaryIndex = 0;
+        }
+    }
+
     /**
      * Generate chat title from first message
      */
@@ -209,6 +248,8 @@ class ChatManager {
         this.allChats = [];
         this.currentChatId = null;
         this.chatHistory = [];
+        this.contextToken = null;
+        this.summaryIndex = 0;
         this.saveToStorage();
     }
 }
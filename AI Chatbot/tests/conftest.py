@@ -0,0 +1,20 @@
+"""
+Test configuration: the app runs on the fake model backend against a
+throwaway SQLite database, so the suite needs no API key or network.
+"""
+
+import os
+import sys
+import tempfile
+
+# Configure the app before it is imported
+_workdir = tempfile.mkdtemp(prefix="chatbot_tests_")
+os.environ["LLM_BACKEND"] = "fake"
+os.environ["LLM_FAKE_LATENCY"] = "fixed:1"
+os.environ["LLM_FAKE_LIGHT_LATENCY"] = "fixed:1"
+os.environ["LLM_FAKE_ERROR_RATE"] = "0"
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_workdir, 'test.db')}"
+os.environ["TICKET_JOURNAL_PATH"] = os.path.join(_workdir, "tickets.journal")
+os.environ["TICKET_DEAD_LETTER_PATH"] = os.path.join(_workdir, "tickets.deadletter.jsonl")
+os.environ.setdefault("LOG_LEVEL", "CRITICAL")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
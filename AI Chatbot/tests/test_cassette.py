@@ -0,0 +1,21 @@
+"""Replaying model exchanges from a cassette."""
+
+from langchain_core.messages import HumanMessage
+
+from app.agent import cassette
+from app.agent.gemini_adapter import create_chat_adapter
+from app.core.config import settings
+
+
+def test_cassette_misses_do_not_open_the_circuit_breaker(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "LLM_CASSETTE_MODE", "replay")
+    monkeypatch.setattr(settings, "LLM_CASSETTE_PATH", str(tmp_path / "empty.jsonl"))
+    monkeypatch.setattr(cassette, "_cassette", None)
+    adapter = create_chat_adapter(model="cassette-miss-model", route="full")
+
+    for _ in range(settings.LLM_BREAKER_FAILURES + 2):
+        response = adapter.invoke([HumanMessage(content="my internet is down")])
+        assert response.fallback == "llm_error"
+
+    assert cassette.get_cassette().misses >= settings.LLM_BREAKER_FAILURES + 2
+    assert adapter._breaker.stats()["state"] == "closed"
@@ -0,0 +1,65 @@
+"""Context compression when the summarizer works and when it fails."""
+
+import asyncio
+
+from app.core.compression import ContextCompressor
+from app.main import _context_fields
+
+
+def _history(turns: int):
+    return [
+        {
+            "role": "user" if i % 2 == 0 else "assistant",
+            "content": f"turn {i}: my router keeps dropping the connection every few minutes",
+        }
+        for i in range(turns)
+    ]
+
+
+def _failing_compressor() -> ContextCompressor:
+    # A model name of its own, so the opened circuit breaker does not leak into other tests
+    compressor = ContextCompressor(model_name="failing-summarizer")
+    compressor.model.error_rate = 1.0
+    return compressor
+
+
+def test_summary_covers_aged_out_turns():
+    compressed = ContextCompressor().compress_context(_history(8), "still broken")
+
+    assert compressed.summary
+    assert compressed.covered == 6
+    fields = _context_fields(compressed)
+    assert fields["context_token"]
+    assert fields["context_turns"] == 6
+
+
+def test_failed_summary_is_not_used():
+    compressor = _failing_compressor()
+    history = _history(8)
+
+    compressed = asyncio.run(compressor.acompress_context(history, "still broken"))
+
+    assert compressed.summary is None
+    assert compressed.covered == 0
+    # Every turn stays verbatim and nothing is cached for the next request
+    assert all(turn["content"] in compressed.context for turn in history)
+    assert len(compressor._summary_cache) == 0
+    assert compressor.compress_context(history, "still broken").summary is None
+
+
+def test_failed_summary_issues_no_context_token():
+    compressed = _failing_compressor().compress_context(_history(8), "still broken")
+
+    fields = _context_fields(compressed)
+    assert fields["context_token"] is None
+    assert fields["context_turns"] == 0
+
+
+def test_failed_fold_keeps_previous_summary():
+    compressor = _failing_compressor()
+
+    compressed = compressor.compress_context(_history(8), "still broken", previous_summary="User reported slow internet.")
+
+    assert compressed.summary == "User reported slow internet."
+    assert compressed.covered == 0
+    assert _context_fields(compressed)["context_turns"] == 0
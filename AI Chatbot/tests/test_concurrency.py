@@ -0,0 +1,30 @@
+"""The upstream concurrency limit is shared by every adapter."""
+
+import asyncio
+
+from langchain_core.messages import HumanMessage
+
+from app.agent import gemini_adapter
+from app.agent.fake_adapter import FakeChatAdapter
+from app.core.config import settings
+
+
+def test_routes_share_one_concurrency_limit(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_MAX_CONCURRENCY", 2)
+    adapters = [FakeChatAdapter(route=route, latency="fixed:20") for route in ("light", "full", "summary")]
+    peak = 0
+
+    async def watch():
+        nonlocal peak
+        while True:
+            peak = max(peak, gemini_adapter.upstream_concurrency()["in_flight"])
+            await asyncio.sleep(0.001)
+
+    async def main():
+        watcher = asyncio.create_task(watch())
+        await asyncio.gather(*(adapter.ainvoke([HumanMessage(content="hello")]) for adapter in adapters * 2))
+        watcher.cancel()
+
+    asyncio.run(main())
+    assert peak == 2
+    assert gemini_adapter.upstream_concurrency() == {"limit": 2, "in_flight": 0, "queued": 0}
@@ -0,0 +1,50 @@
+"""check_connection_status loads the user and connection in one query."""
+
+import asyncio
+
+import pytest
+from sqlalchemy import event
+
+from app import database
+from app.database import acheck_connection_status, check_connection_status
+
+
+@pytest.fixture
+def selects():
+    database.ensure_db()
+    engines = [database.engine] + ([database.async_engine.sync_engine] if database.async_engine is not None else [])
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append(statement)
+
+    for engine in engines:
+        event.listen(engine, "before_cursor_execute", count)
+    database._connection_cache.clear()
+    yield statements
+    for engine in engines:
+        event.remove(engine, "before_cursor_execute", count)
+
+
+@pytest.mark.parametrize("identifier", ["01712345678", "USR001"])
+def test_one_query_per_lookup(selects, identifier):
+    status = check_connection_status(identifier)
+
+    assert status is not None and "router_status" in status
+    assert len(selects) == 1
+    assert "JOIN" in selects[0].upper()
+
+
+@pytest.mark.parametrize("identifier", ["01712345678", "USR001"])
+def test_one_query_per_async_lookup(selects, identifier):
+    status = asyncio.run(acheck_connection_status(identifier))
+
+    assert status == check_connection_status(identifier)  # Second call is served from the cache
+    assert len(selects) == 1
+
+
+def test_unknown_or_unusable_identifiers(selects):
+    assert check_connection_status("01999999999") is None
+    assert check_connection_status("not-an-id") is None
+    assert len(selects) == 1  # Unusable identifiers are not queried
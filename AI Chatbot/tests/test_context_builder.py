@@ -0,0 +1,87 @@
+"""Token-budgeted history windows."""
+
+from app.agent.context_builder import MESSAGE_OVERHEAD_TOKENS, ContextBuilder, estimate_tokens, truncate_text
+from app.core.config import settings
+
+
+def _turns(*contents):
+    return [{"role": "user" if i % 2 == 0 else "assistant", "content": c} for i, c in enumerate(contents)]
+
+
+def _cost(text):
+    return estimate_tokens(text) + MESSAGE_OVERHEAD_TOKENS
+
+
+def test_estimate_tokens():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("my wifi is down") == 4
+    assert estimate_tokens("connectivity") == 3  # 12 characters, about one token per 4
+    assert estimate_tokens("a,b;c") == 5  # Punctuation counts on its own
+    assert estimate_tokens("ইন্টারনেট") > estimate_tokens("internet")
+
+
+def test_fit_stops_exactly_at_the_budget():
+    history = _turns("first turn here", "second turn here", "third turn here", "fourth turn here")
+    two_newest = _cost("third turn here") + _cost("fourth turn here")
+    builder = ContextBuilder(budget=two_newest + 100, min_turns=0)
+
+    window = builder.fit(history, reserved_tokens=100)
+    assert [t["content"] for t in window.turns] == ["third turn here", "fourth turn here"]
+    assert (window.tokens, window.dropped, window.truncated) == (two_newest, 2, 0)
+
+    window = builder.fit(history, reserved_tokens=101)
+    assert [t["content"] for t in window.turns] == ["fourth turn here"]
+
+
+def test_window_is_contiguous():
+    history = _turns("short", "x " * 300, "short again", "newest")
+    builder = ContextBuilder(budget=40, max_message_tokens=1000, min_turns=0)
+
+    window = builder.fit(history)
+    # The big turn ends the window even though "short" alone would still fit
+    assert [t["content"] for t in window.turns] == ["short again", "newest"]
+    assert window.dropped == 2
+
+
+def test_min_turns_are_kept_over_budget():
+    history = _turns("one", "two", "three")
+    builder = ContextBuilder(budget=10, min_turns=2)
+
+    window = builder.fit(history, reserved_tokens=50)
+    assert [t["content"] for t in window.turns] == ["two", "three"]
+    assert window.tokens > 10 - 50
+
+
+def test_oversized_turn_is_truncated_not_dropped():
+    log = "router log line " * 200 + "ERROR: PPPoE authentication failed"
+    builder = ContextBuilder(budget=1000, max_message_tokens=100, min_turns=0)
+
+    window = builder.fit(_turns(log))
+    (turn,) = window.turns
+    assert window.truncated == 1
+    assert estimate_tokens(turn["content"]) <= 100
+    assert turn["content"].startswith("router log line")
+    assert turn["content"].endswith("PPPoE authentication failed")
+
+
+def test_truncate_text_boundaries():
+    text = "word " * 50
+    assert truncate_text(text, 0) is text  # 0 = no limit
+    assert truncate_text(text, estimate_tokens(text)) is text
+    assert truncate_text("short", 3) == "short"
+
+    cut = truncate_text(text, 20)
+    assert cut != text and estimate_tokens(cut) <= 20
+    assert "characters omitted" in cut
+
+
+def test_recent_returns_the_original_turns(monkeypatch):
+    monkeypatch.setattr(settings, "CONTEXT_RECENT_TOKENS", 600)
+    long_turn = "x " * 2000
+    history = _turns("y " * 2000, long_turn, "newest")
+    # Each long turn is cut to 400 tokens here; only one of them fits CONTEXT_RECENT_TOKENS
+    builder = ContextBuilder(max_message_tokens=400, min_turns=0)
+
+    recent = builder.recent(history)
+    assert recent == history[1:]
+    assert recent[0]["content"] is long_turn
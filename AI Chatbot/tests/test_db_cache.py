@@ -0,0 +1,35 @@
+"""Lookup caches in front of the subscriber tables."""
+
+from app.database import check_connection_status, get_user_account
+from app.importer import run_import
+
+
+def _import(tmp_path, name, text):
+    source = tmp_path / name
+    source.write_text(text, encoding="utf-8")
+    return run_import(str(source), chunk_size=10)
+
+
+def test_imported_subscriber_replaces_a_cached_unknown_phone(tmp_path):
+    assert get_user_account("01922000001") is None  # Cached as unknown
+    assert check_connection_status("01922000001") is None
+
+    _import(tmp_path, "new.csv", "phone,name,plan,is_online\n01922000001,Tania,Basic,1\n")
+
+    account = get_user_account("01922000001")
+    assert account is not None and account["name"] == "Tania"
+    assert check_connection_status("01922000001")["is_online"]
+
+
+def test_import_invalidates_cached_account_and_connection(tmp_path):
+    _import(tmp_path, "first.csv", "phone,plan,balance,router_status\n01922000002,Basic,100,Online\n")
+    account = get_user_account("01922000002")
+    assert account["balance"] == 100.0
+    assert check_connection_status(account["account_id"])["router_status"] == "Online"
+
+    _import(tmp_path, "second.csv", "phone,plan,balance,router_status\n01922000002,Premium,-50,Offline\n")
+
+    account = get_user_account("01922000002")
+    assert (account["plan"], account["balance"]) == ("Premium", -50.0)
+    assert check_connection_status(account["account_id"])["router_status"] == "Offline"
+    assert check_connection_status("01922000002")["router_status"] == "Offline"
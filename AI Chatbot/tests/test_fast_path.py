@@ -0,0 +1,97 @@
+"""Intent matching and templated replies of the LLM-free fast path."""
+
+import pytest
+
+from app.agent import fast_path as fast_path_module
+from app.agent.fast_path import FastPath, detect_intent, detect_language
+
+
+@pytest.mark.parametrize("message, intent", [
+    ("what is my balance?", "balance"),
+    ("How much do I owe", "balance"),
+    ("show my bill", "balance"),
+    ("balance", "balance"),
+    ("is my account active?", "account_status"),
+    ("account status please", "account_status"),
+    ("which plan am I on", "plan"),
+    ("what package do I have", "plan"),
+    ("check my connection", "connection"),
+    ("router status", "connection"),
+    ("is my internet online", "connection"),
+    ("আমার বিল কত?", "balance"),
+    ("আমার ব্যালেন্স জানতে চাই", "balance"),
+    ("আমার অ্যাকাউন্ট সক্রিয় আছে?", "account_status"),
+    ("আমার প্যাকেজ কোনটা?", "plan"),
+    ("আমার ইন্টারনেট সংযোগ চেক করুন", "connection"),
+])
+def test_lookup_intents(message, intent):
+    assert detect_intent(message) == intent
+
+
+@pytest.mark.parametrize("message", [
+    "my balance is wrong, open a ticket",
+    "why is my bill so high",
+    "my internet is slow, check my connection",
+    "check my connection and my balance",
+    "I want to change my plan",
+    "my router status shows an error",
+    "how do I pay my bill",
+    "what is my balance and which plan am I on",
+    "আমার বিল কেন এত বেশি?",
+    "ইন্টারনেট সংযোগ কাজ করছে না",
+    "আমার প্যাকেজ পরিবর্তন করতে চাই",
+    "hello",
+    " ".join(["please"] * 10) + " show my balance",
+])
+def test_agent_only_and_unmatched_messages_fall_through(message):
+    assert detect_intent(message) is None
+
+
+def test_language_follows_the_script():
+    assert detect_language("what is my balance") == "en"
+    assert detect_language("আমার বিল কত") == "bn"
+
+
+_ACCOUNT = {"account_id": "ACC1001", "name": "Rahim", "plan": "Basic 10 Mbps", "status": "Suspended", "balance": -1500.0}
+
+
+@pytest.fixture
+def lookups(monkeypatch):
+    connection = {"is_online": False, "router_status": "Offline", "last_online": "2026-10-16 21:00", "issues": ["Fiber cut"]}
+    monkeypatch.setattr(fast_path_module, "get_user_account", lambda phone: dict(_ACCOUNT) if phone else None)
+    monkeypatch.setattr(fast_path_module, "check_connection_status", lambda account_id: connection)
+
+
+def test_templates(lookups):
+    path = FastPath()
+    phone = "01712345678"
+
+    assert path.answer("what is my balance?", phone) == (
+        "Hi Rahim! Your current balance is -1,500.00 BDT. "
+        "You have an outstanding due of 1,500.00 BDT. Please pay it to keep your service active."
+    )
+    assert path.answer("is my account active?", phone) == (
+        "Hi Rahim! Your account (ACC1001) is Suspended on the Basic 10 Mbps plan. "
+        "Paying the outstanding 1,500.00 BDT will reactivate it."
+    )
+    assert path.answer("which plan am I on", phone) == "Hi Rahim! You're on the Basic 10 Mbps plan."
+    connection = path.answer("check my connection", phone)
+    assert connection.startswith("Your connection is currently offline.")
+    assert "Detected issues: Fiber cut." in connection and "open a support ticket" in connection
+    assert path.answer("আমার প্যাকেজ কোনটা?", phone) == "হ্যালো Rahim! আপনার বর্তমান প্যাকেজ হলো Basic 10 Mbps।"
+    assert path.answer("আমার বিল কত?", phone) == (
+        "হ্যালো Rahim! আপনার বর্তমান ব্যালেন্স -1,500.00 টাকা। "
+        "আপনার 1,500.00 টাকা বকেয়া আছে। সেবা সচল রাখতে অনুগ্রহ করে পরিশোধ করুন।"
+    )
+
+    stats = path.stats()
+    assert stats["hits"] == stats["requests"] == 6
+    assert stats["by_intent"] == {"balance": 2, "account_status": 1, "plan": 2, "connection": 1}
+
+
+def test_misses_are_counted_and_need_a_phone(lookups):
+    path = FastPath()
+
+    assert path.answer("my balance is wrong, open a ticket", "01712345678") is None
+    assert path.answer("what is my balance?", None) is None
+    assert path.stats()["requests"] == 1 and path.stats()["hits"] == 0
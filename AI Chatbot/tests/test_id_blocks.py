@@ -0,0 +1,19 @@
+"""Hi/lo ticket ID reservation."""
+
+from concurrent.futures import ThreadPoolExecutor
+
+from app.database import IdBlockAllocator
+from app.models import Ticket
+
+
+def test_concurrent_allocators_never_share_ids():
+    # Separate allocators stand in for separate worker processes
+    allocators = [IdBlockAllocator("test-tickets", Ticket, block_size=5) for _ in range(4)]
+
+    def take(allocator):
+        return [allocator.next_id() for _ in range(40)]
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        ids = [i for chunk in pool.map(take, allocators) for i in chunk]
+
+    assert len(ids) == len(set(ids)) == 160
@@ -0,0 +1,68 @@
+"""Subscriber bulk import."""
+
+from sqlalchemy import select
+
+from app.database import engine
+from app.importer import run_import
+from app.models import User
+
+
+def _balances(phones):
+    with engine.connect() as conn:
+        return dict(conn.execute(select(User.phone, User.balance).where(User.phone.in_(phones))).all())
+
+
+def test_malformed_csv_rows_are_rejected_and_the_rest_imported(tmp_path):
+    source = tmp_path / "subscribers.csv"
+    source.write_text(
+        "phone,name,balance,download_speed\n"
+        "01911000001,Rahim,10.5,50\n"
+        "01911000002,Karim,not-a-number,50\n"
+        "01911000003,Salma,3,fast\n"
+        "01911000004,Nasrin,7,25\n",
+        encoding="utf-8",
+    )
+
+    totals = run_import(str(source), chunk_size=2)
+
+    assert totals["records"] == 4
+    assert totals["rejected"] == 2
+    assert totals["rejected_lines"] == [3, 4]
+    assert _balances(["+8801911000001", "+8801911000004"]) == {"+8801911000001": 10.5, "+8801911000004": 7.0}
+
+
+def test_unparsable_jsonl_lines_are_rejected(tmp_path):
+    source = tmp_path / "subscribers.jsonl"
+    source.write_text(
+        '{"phone": "01911000011", "name": "Ayesha"}\n'
+        '{"phone": "01911000012", "name": \n'
+        '\n'
+        '["not", "an", "object"]\n'
+        '{"phone": "01911000013", "name": {"first": "Tanvir"}}\n'
+        '{"phone": "01911000014", "balance": 2}\n',
+        encoding="utf-8",
+    )
+
+    totals = run_import(str(source))
+
+    assert totals["users"] == 2
+    assert totals["rejected_lines"] == [2, 4, 5]
+    assert set(_balances(["+8801911000011", "+8801911000014"])) == {"+8801911000011", "+8801911000014"}
+
+
+def test_issues_of_the_wrong_type_are_rejected(tmp_path):
+    source = tmp_path / "issues.jsonl"
+    source.write_text(
+        '{"phone": "01911000021", "issues": 5}\n'
+        '{"phone": "01911000022", "issues": true}\n'
+        '{"phone": "01911000023", "issues": {"a": 1}}\n'
+        '{"phone": "01911000024", "issues": "[unclosed"}\n'
+        '{"phone": "01911000025", "issues": ["slow speed", "packet loss"]}\n'
+        '{"phone": "01911000026", "issues": "slow speed; packet loss"}\n',
+        encoding="utf-8",
+    )
+
+    totals = run_import(str(source))
+
+    assert totals["rejected_lines"] == [1, 2, 3, 4]
+    assert totals["connections"] == 2
@@ -0,0 +1,76 @@
+"""Fake model backend and load-test reporting."""
+
+import random
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from app.agent.fake_adapter import LatencyModel, default_script
+from benchmarks import load_test
+
+
+def _latency(spec, seed=7):
+    return LatencyModel(spec, random.Random(seed), threading.Lock())
+
+
+# ==================== FAKE BACKEND ====================
+
+def test_latency_specs():
+    assert _latency("fixed:250").sample() == 0.25
+    assert 0.1 <= _latency("uniform:100:200").sample() <= 0.2
+    assert _latency("normal:-500:1").sample() == 0.0  # Clipped at 0
+    draws = [_latency("lognormal:600:0.5", seed=3).sample() for _ in range(2)]
+    assert draws[0] == draws[1]  # Same seed, same run
+
+
+@pytest.mark.parametrize("spec", ["gamma:1:2", "fixed", "fixed:1:2", "uniform:1", "normal:a:b"])
+def test_invalid_latency_specs(spec):
+    with pytest.raises(ValueError):
+        _latency(spec)
+
+
+def test_default_script():
+    assert default_script("hello", "light").tool_calls == ()
+    assert default_script("anything", "summary").text.startswith("Customer reported")
+
+    lookup = default_script("my internet is slow, phone 01712345678", "full")
+    assert [name for name, _ in lookup.tool_calls] == ["GetUserAccountTool", "ConnectionStatusTool"]
+    assert not lookup.text
+
+    ticket = default_script("internet down, please open a ticket", "full")
+    assert [name for name, _ in ticket.tool_calls] == ["OpenTicketTool"]
+    assert "ticket" in default_script("Tool result: Ticket TKT-1 created", "full").text
+    assert "router" in default_script("Tool result: online", "full").text
+
+    assert "phone number" in default_script("my internet is slow", "full").text
+
+
+# ==================== REPORTING ====================
+
+def _report(latencies, errors=0, first_token=None):
+    recorder = load_test.Recorder()
+    for latency in latencies:
+        recorder.record("chat", latency, True, first_token)
+    for _ in range(errors):
+        recorder.record("chat", 0.0, False)
+    args = SimpleNamespace(concurrency=4, url=None, latency="fixed:1", light_latency="fixed:1")
+    return load_test.build_report(recorder, ["chat"], 2.0, args)
+
+
+def test_report_percentiles_and_error_rate():
+    stats = _report([i / 100 for i in range(1, 101)], errors=25, first_token=0.05)["endpoints"]["chat"]
+
+    assert (stats["requests"], stats["errors"], stats["error_rate"]) == (125, 25, 0.2)
+    assert stats["throughput_rps"] == 50.0
+    assert (stats["p50"], stats["p95"], stats["p99"], stats["max"]) == (0.5, 0.95, 0.99, 1.0)
+    assert stats["first_token_p50"] == 0.05
+
+
+def test_compare_flags_regressions_only():
+    baseline = _report([0.1] * 100)
+
+    assert load_test.compare(_report([0.11] * 100), baseline, 0.2) == []
+    regressions = load_test.compare(_report([0.2] * 100, errors=10), baseline, 0.2)
+    assert any("p95" in line for line in regressions)
+    assert any("error rate" in line for line in regressions)
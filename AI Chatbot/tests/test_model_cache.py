@@ -0,0 +1,32 @@
+"""Sharing cached GenerativeModel objects across conversations."""
+
+from types import SimpleNamespace
+
+from app.agent import gemini_adapter
+from app.agent.agent import SupportAgent
+from app.agent.gemini_adapter import GeminiChatAdapter
+
+
+def test_conversation_summaries_share_one_cached_model(monkeypatch):
+    built = []
+
+    def generative_model(name, system_instruction=None, tools=None):
+        built.append(system_instruction)
+        return SimpleNamespace(name=name)
+
+    # Built first: creating adapters imports the real SDK
+    agent = SupportAgent()
+    adapter = GeminiChatAdapter(model="model-cache-test")
+    monkeypatch.setattr(gemini_adapter, "genai", SimpleNamespace(GenerativeModel=generative_model))
+    monkeypatch.setattr(gemini_adapter, "_active_cassette", lambda: None)
+    history = [{"role": "user", "content": "my wifi drops"}, {"role": "assistant", "content": "Let me check."}]
+
+    first = agent._build_messages(history, "still slow", None, "User reported slow wifi in Dhaka.")
+    second = agent._build_messages(history, "any update?", None, "User's router was replaced last week.")
+    model_a, history_a, _, _ = adapter._prepare_request(first)
+    model_b, history_b, _, _ = adapter._prepare_request(second)
+
+    assert model_a is model_b
+    assert len(built) == 1 and "summary" not in built[0].lower()
+    assert "slow wifi in Dhaka" in history_a[0]["parts"][0]
+    assert [entry["role"] for entry in history_b] == ["user", "model", "user", "model"]
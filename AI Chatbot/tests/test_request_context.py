@@ -0,0 +1,61 @@
+"""Request-scoped memo of account and connection lookups."""
+
+import pytest
+from sqlalchemy import event
+
+from app import database
+from app.core.request_context import request_scope
+from app.database import check_connection_status, get_user_account
+
+PHONE = "01712345678"  # Seeded subscriber with a connection
+
+
+@pytest.fixture
+def selects():
+    database.ensure_db()
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append(statement)
+
+    event.listen(database.engine, "before_cursor_execute", count)
+    yield statements
+    event.remove(database.engine, "before_cursor_execute", count)
+
+
+def _forget_cached_lookups():
+    database._account_cache.clear()
+    database._connection_cache.clear()
+
+
+def test_lookups_are_memoized_within_a_request(selects):
+    _forget_cached_lookups()
+    with request_scope() as context:
+        account = get_user_account(PHONE)
+        _forget_cached_lookups()  # Only the request memo is left
+        assert get_user_account("+880 1712-345678") == account
+        assert check_connection_status(PHONE) == check_connection_status(account["account_id"])
+
+    assert len(selects) == 2  # One account query, one connection query
+    assert set(context.users) == {"+8801712345678"}
+    assert set(context.connections) == {"+8801712345678", account["account_id"]}
+
+
+def test_memo_ends_with_the_request(selects):
+    _forget_cached_lookups()
+    with request_scope():
+        get_user_account(PHONE)
+    _forget_cached_lookups()
+    with request_scope():
+        get_user_account(PHONE)
+
+    assert len(selects) == 2
+
+
+def test_callers_cannot_change_the_memoized_row(selects):
+    _forget_cached_lookups()
+    with request_scope():
+        account = get_user_account(PHONE)
+        account["balance"] = 1e9
+        assert get_user_account(PHONE)["balance"] != 1e9
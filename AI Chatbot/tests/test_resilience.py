@@ -0,0 +1,186 @@
+"""Deadlines, hedging and the circuit breaker."""
+
+import asyncio
+import itertools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import pytest
+
+from app.core import resilience
+from app.core.resilience import CircuitBreaker, acall_hedged, call_hedged
+
+
+@pytest.fixture
+def executor():
+    pool = ThreadPoolExecutor(max_workers=4)
+    yield pool
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = SimpleNamespace(value=1000.0)
+    monkeypatch.setattr(resilience, "time", SimpleNamespace(monotonic=lambda: now.value))
+    return now
+
+
+def _attempts(*behaviours):
+    """fn for call_hedged whose n-th call runs ``behaviours[n]``."""
+    counter = itertools.count()
+    calls = []
+
+    def fn():
+        index = next(counter)
+        calls.append(index)
+        return behaviours[index]()
+
+    fn.calls = calls
+    return fn
+
+
+# ==================== call_hedged ====================
+
+def test_fast_primary_is_not_hedged(executor):
+    fn = _attempts(lambda: "primary", lambda: "hedge")
+
+    assert call_hedged(fn, executor, timeout=1, hedge_after=0.5) == ("primary", 1)
+    assert fn.calls == [0]
+
+
+def test_hedge_starts_after_delay_and_first_success_wins(executor):
+    release = threading.Event()
+
+    def slow():
+        release.wait(2)
+        return "primary"
+
+    fn = _attempts(slow, lambda: "hedge")
+    try:
+        assert call_hedged(fn, executor, timeout=2, hedge_after=0.02) == ("hedge", 2)
+    finally:
+        release.set()
+    assert fn.calls == [0, 1]
+
+
+def test_early_failure_is_retried_without_waiting_for_the_hedge(executor):
+    def fail():
+        raise ConnectionError("reset")
+
+    fn = _attempts(fail, lambda: "retry")
+
+    assert call_hedged(fn, executor, timeout=2, hedge_after=None) == ("retry", 2)
+
+
+def test_last_error_is_raised_when_every_attempt_fails(executor):
+    def fail():
+        raise ConnectionError("reset")
+
+    with pytest.raises(ConnectionError):
+        call_hedged(_attempts(fail, fail), executor, timeout=2, max_attempts=2)
+
+
+def test_deadline_raises_timeout(executor):
+    release = threading.Event()
+    try:
+        with pytest.raises(TimeoutError):
+            call_hedged(lambda: release.wait(2), executor, timeout=0.05, hedge_after=0.01)
+    finally:
+        release.set()
+
+
+# ==================== acall_hedged ====================
+
+def test_async_hedge_wins_and_the_primary_is_cancelled():
+    cancelled = []
+
+    async def run():
+        counter = itertools.count()
+
+        async def attempt():
+            if next(counter) == 0:
+                try:
+                    await asyncio.sleep(2)
+                except asyncio.CancelledError:
+                    cancelled.append(True)
+                    raise
+                return "primary"
+            return "hedge"
+
+        result = await acall_hedged(attempt, timeout=2, hedge_after=0.02)
+        await asyncio.sleep(0)
+        return result
+
+    assert asyncio.run(run()) == ("hedge", 2)
+    assert cancelled == [True]
+
+
+def test_async_early_failure_is_retried():
+    counter = itertools.count()
+
+    async def attempt():
+        if next(counter) == 0:
+            raise ConnectionError("reset")
+        return "retry"
+
+    assert asyncio.run(acall_hedged(attempt, timeout=2)) == ("retry", 2)
+
+
+def test_async_deadline_raises_timeout():
+    async def attempt():
+        await asyncio.sleep(2)
+
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(acall_hedged(attempt, timeout=0.05, hedge_after=0.01))
+
+
+# ==================== CircuitBreaker ====================
+
+def test_breaker_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker("test-open", failure_threshold=3, reset_timeout=30)
+
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()  # Resets the streak
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED and breaker.allow()
+
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+    assert breaker.stats()["rejections"] >= 1
+
+
+def test_half_open_trial_closes_or_reopens(clock):
+    breaker = CircuitBreaker("test-half-open", failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+
+    clock.value += 29
+    assert breaker.state == CircuitBreaker.OPEN
+    clock.value += 1
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow()
+    assert not breaker.allow()  # One trial at a time
+
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+
+    clock.value += 30
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED and breaker.allow()
+
+
+def test_trial_that_never_reports_back_expires(clock):
+    breaker = CircuitBreaker("test-trial-expiry", failure_threshold=1, reset_timeout=10)
+    breaker.record_failure()
+    clock.value += 10
+
+    assert breaker.allow()  # Trial is cancelled and never records an outcome
+    clock.value += 9
+    assert not breaker.allow()
+    clock.value += 1
+    assert breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
@@ -0,0 +1,55 @@
+"""Light/full model routing."""
+
+import pytest
+
+from app.agent import router as router_module
+from app.agent.router import ModelRouter, choose_route
+from app.core.config import settings
+
+
+@pytest.fixture(autouse=True)
+def thresholds(monkeypatch):
+    monkeypatch.setattr(settings, "ROUTER_LIGHT_MAX_WORDS", 8)
+    monkeypatch.setattr(settings, "ROUTER_FULL_HISTORY_TURNS", 6)
+
+
+@pytest.mark.parametrize("message, route", [
+    ("hello", "light"),
+    ("  Assalamu Alaikum ", "light"),
+    ("what is my current plan?", "light"),
+    ("my internet is slow", "full"),
+    ("wifi keeps disconnecting", "full"),
+    ("net kaj kore na", "full"),
+    ("আমার ইন্টারনেট কাজ করছে না", "full"),
+    ("can you tell me what happened to the bill I paid last month", "full"),
+])
+def test_choose_route(message, route):
+    assert choose_route(message) == route
+
+
+def test_long_conversations_go_to_the_full_model():
+    assert choose_route("ok thanks", history_turns=5) == "light"
+    assert choose_route("ok thanks", history_turns=6) == "full"
+    assert choose_route("ok thanks", has_summary=True) == "full"
+    assert choose_route("hi", history_turns=20, has_summary=True) == "light"
+
+
+def test_multi_tool_turn_is_escalated():
+    router = ModelRouter(tools=[])
+    one = [{"name": "GetUserAccountTool", "args": {}, "id": "1"}]
+    two = one + [{"name": "ConnectionStatusTool", "args": {}, "id": "2"}]
+    before = router_module.ROUTE_ESCALATIONS.value()
+
+    assert router.escalate("light", one) == "light"
+    assert router.escalate("light", two) == "full"
+    assert router.escalate("full", two) == "full"
+    assert router_module.ROUTE_ESCALATIONS.value() == before + 1
+    assert router.model("light").route == "light" and router.model("full").route == "full"
+
+
+def test_disabled_router_always_uses_the_full_model(monkeypatch):
+    monkeypatch.setattr(settings, "ROUTER_ENABLED", False)
+    router = ModelRouter(tools=[])
+
+    assert router.route("hello") == "full"
+    assert router.model("light") is router.model("full")
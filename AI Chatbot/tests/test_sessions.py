@@ -0,0 +1,66 @@
+"""Server-side conversation sessions."""
+
+import asyncio
+
+from app.core.compression import ContextCompressor
+from app.core.sessions import SessionStore
+from app.main import _fold_session
+
+
+def test_session_ids_are_issued_by_the_server():
+    store = SessionStore()
+
+    session = store.resume("my-chosen-id")
+
+    assert session.session_id != "my-chosen-id"
+    assert store.resume(session.session_id) is session
+
+
+def test_session_is_not_returned_to_another_phone_number():
+    store = SessionStore()
+    session = store.resume("new", owner="+8801712345678")
+    session.add_turn("user", "my account balance?")
+
+    other = store.resume(session.session_id, owner="+8801823456789")
+    anonymous = store.resume(session.session_id)
+
+    assert other is not session and not other.turns
+    assert anonymous is not session
+    assert store.resume(session.session_id, owner="+8801712345678") is session
+
+
+def test_anonymous_session_is_bound_to_first_phone_number():
+    store = SessionStore()
+    session = store.resume("new")
+
+    assert store.resume(session.session_id, owner="+8801712345678") is session
+    assert store.resume(session.session_id) is not session
+
+
+def test_failed_summary_keeps_session_turns():
+    compressor = ContextCompressor(model_name="failing-summarizer")
+    compressor.model.error_rate = 1.0
+    session = SessionStore().resume("new")
+    for i in range(8):
+        session.add_turn("user" if i % 2 == 0 else "assistant", f"turn {i}: the router keeps dropping the connection")
+    turns = list(session.turns)
+
+    _fold_session(session, compressor.compress_context(session.turns, "still broken", session.summary))
+
+    assert session.summary is None
+    assert session.turns == turns
+
+
+def test_evicted_sessions_spill_to_sqlite_and_reload(tmp_path):
+    store = SessionStore(max_sessions=2, sqlite_path=str(tmp_path / "sessions.db"))
+    first = store.resume("new", owner="+8801712345678")
+    first.add_turn("user", "my router is offline")
+    store.save(first)
+    for _ in range(2):
+        store.create()
+
+    assert store.stats()["spilled"] == 1
+    reloaded = asyncio.run(store.aresume(first.session_id, owner="+8801712345678"))
+    assert reloaded.session_id == first.session_id
+    assert reloaded.turns == [{"role": "user", "content": "my router is offline"}]
+    assert store.stats()["reloaded"] == 1
@@ -0,0 +1,63 @@
+"""Importing the API is cheap; storage and the agent are prepared at startup."""
+
+import json
+import os
+import subprocess
+import sys
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_PROBE = """
+import json, os, sys
+import app.main
+from app import database
+
+report = {
+    "sdk": "google.generativeai" in sys.modules,
+    "langchain": any(name.startswith("langchain") for name in sys.modules),
+    "db_file": os.path.exists(os.environ["PROBE_DB"]),
+    "db_ready": database._db_ready,
+    "agent": app.main._agent is not None,
+}
+if sys.argv[1] == "startup":
+    from fastapi.testclient import TestClient
+    with TestClient(app.main.app):
+        report.update(
+            db_file=os.path.exists(os.environ["PROBE_DB"]),
+            db_ready=database._db_ready,
+            agent=app.main._agent is not None,
+        )
+print(json.dumps(report))
+"""
+
+
+def _probe(tmp_path, phase, **env):
+    db = tmp_path / "startup.db"
+    environ = {
+        **os.environ,
+        "DATABASE_URL": f"sqlite:///{db}",
+        "TICKET_JOURNAL_PATH": str(tmp_path / "tickets.journal"),
+        "PROBE_DB": str(db),
+        **env,
+    }
+    result = subprocess.run(
+        [sys.executable, "-c", _PROBE, phase],
+        cwd=APP_DIR, env=environ, capture_output=True, text=True, timeout=120, check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def test_import_touches_neither_the_database_nor_the_sdk(tmp_path):
+    assert _probe(tmp_path, "import") == {
+        "sdk": False, "langchain": False, "db_file": False, "db_ready": False, "agent": False,
+    }
+
+
+def test_startup_prepares_storage_and_the_agent(tmp_path):
+    report = _probe(tmp_path, "startup")
+    assert report["db_file"] and report["db_ready"] and report["agent"]
+
+
+def test_warmup_off_defers_the_agent(tmp_path):
+    report = _probe(tmp_path, "startup", STARTUP_WARMUP="false")
+    assert report["db_ready"] and not report["agent"]
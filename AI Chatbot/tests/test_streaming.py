@@ -0,0 +1,69 @@
+"""Server-sent event streaming of agent replies."""
+
+import json
+
+from fastapi.testclient import TestClient
+
+from app.agent import fake_adapter
+from app.main import app
+
+
+def _events(response):
+    events = []
+    for block in response.text.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines() if ": " in line)
+        events.append((fields.get("event"), json.loads(fields.get("data", "{}"))))
+    return events
+
+
+def test_stream_failing_mid_reply_ends_with_error(monkeypatch):
+    chunks = fake_adapter._Stream._chunks
+
+    async def broken_chunks(self):
+        count = 0
+        async for chunk in chunks(self):
+            yield chunk
+            count += 1
+            if count == 2:
+                raise ConnectionResetError("upstream closed the stream")
+
+    monkeypatch.setattr(fake_adapter._Stream, "_chunks", broken_chunks)
+    with TestClient(app) as client:
+        response = client.post("/chat/stream", json={"message": "hello, is my internet service ok?"})
+
+    events = _events(response)
+    names = [name for name, _ in events]
+    tokens = "".join(data["text"] for name, data in events if name == "token")
+    assert names[-1] == "error"
+    assert "done" not in names
+    assert tokens and "hiccup" not in tokens
+
+
+def test_text_before_a_tool_call_matches_non_streaming_reply(monkeypatch):
+    plan_reply = fake_adapter.FakeChatAdapter._plan_reply
+
+    def with_preamble(self, history, message):
+        reply, usage, delay = plan_reply(self, history, message)
+        if reply.tool_calls:
+            reply = fake_adapter.FakeReply("Let me check that for you.", reply.tool_calls)
+        return reply, usage, delay
+
+    async def text_then_calls(self):
+        # A real model may write its preamble before the function call
+        yield fake_adapter._Response([fake_adapter._TextPart(self._reply.text)])
+        for name, args in self._reply.tool_calls:
+            yield fake_adapter._Response([fake_adapter._CallPart(name, dict(args))], self._usage)
+
+    monkeypatch.setattr(fake_adapter.FakeChatAdapter, "_plan_reply", with_preamble)
+    monkeypatch.setattr(fake_adapter._Stream, "_chunks", text_then_calls)
+    message = {"message": "my internet is very slow, my phone is 01712345678"}
+    with TestClient(app) as client:
+        streamed = _events(client.post("/chat/stream", json=message))
+        replied = client.post("/chat", json=message).json()["reply"]
+
+    tokens = "".join(data["text"] for name, data in streamed if name == "token")
+    done = streamed[-1][1]
+    assert any("tool" in data for name, data in streamed if name == "status")
+    assert tokens.startswith("Let me check that for you.\n\n")
+    assert done["reply"] == replied
+    assert replied.startswith("Let me check that for you.\n\n") and "router" in replied
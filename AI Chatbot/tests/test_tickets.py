@@ -0,0 +1,38 @@
+"""Support ticket creation and duplicate suppression."""
+
+from concurrent.futures import ThreadPoolExecutor
+
+from app import database
+from app.database import create_support_ticket, shutdown_ticket_writer
+
+
+def test_concurrent_duplicate_reports_open_one_ticket():
+    report = "Phone: 01823456789 | Issue: router lights blinking red, no internet"
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        tickets = list(pool.map(lambda _: create_support_ticket(report), range(8)))
+
+    assert len({ticket["ticket_id"] for ticket in tickets}) == 1
+    assert sum(not ticket.get("duplicate") for ticket in tickets) == 1
+
+
+def test_different_reports_open_separate_tickets():
+    first = create_support_ticket("Phone: 01534567890 | Issue: billing amount is wrong this month")
+    second = create_support_ticket("Phone: 01534567890 | Issue: router hardware makes a clicking noise")
+
+    assert first["ticket_id"] != second["ticket_id"]
+    assert not second.get("duplicate")
+
+
+def teardown_module():
+    shutdown_ticket_writer()
+
+
+def test_duplicates_do_not_extend_the_dedup_window():
+    report = "Phone: 01712345678 | Issue: wifi keeps disconnecting at night"
+    first = create_support_ticket(report)
+    key = next(key for key, value in database._ticket_dedup_index._data.items() if value[0] == first)
+    expires_at = database._ticket_dedup_index._data[key][1]
+
+    assert create_support_ticket(report)["duplicate"]
+    assert database._ticket_dedup_index._data[key][1] == expires_at
@@ -0,0 +1,66 @@
+"""Concurrent execution of one model turn's tool calls."""
+
+import asyncio
+
+from app.agent.agent import SupportAgent
+from app.core.config import settings
+
+
+class _SlowTool:
+    def __init__(self, name, seconds, running):
+        self.name = name
+        self.seconds = seconds
+        self.running = running
+
+    async def ainvoke(self, payload):
+        self.running["now"] += 1
+        self.running["peak"] = max(self.running["peak"], self.running["now"])
+        try:
+            await asyncio.sleep(self.seconds)
+        finally:
+            self.running["now"] -= 1
+        return f"{self.name}:{payload.get('phone')}"
+
+
+def _agent(*tools):
+    agent = SupportAgent()
+    agent.tools_map = {tool.name: tool for tool in tools}
+    return agent
+
+
+def _calls(*names):
+    return [{"name": name, "args": {"phone": str(i)}, "id": f"call-{i}"} for i, name in enumerate(names)]
+
+
+def test_tool_calls_run_concurrently_and_keep_their_order(monkeypatch):
+    monkeypatch.setattr(settings, "TOOL_MAX_CONCURRENCY", 4)
+    running = {"now": 0, "peak": 0}
+    agent = _agent(_SlowTool("Slow", 0.2, running), _SlowTool("Fast", 0.01, running))
+
+    messages = asyncio.run(agent._aexecute_tool_calls(_calls("Slow", "Fast", "Missing")))
+
+    assert running["peak"] == 2
+    assert [m.content for m in messages] == ["Slow:0", "Fast:1", "Tool Missing not found"]
+    assert [m.tool_call_id for m in messages] == ["call-0", "call-1", "call-2"]
+
+
+def test_fan_out_is_bounded(monkeypatch):
+    monkeypatch.setattr(settings, "TOOL_MAX_CONCURRENCY", 2)
+    running = {"now": 0, "peak": 0}
+    agent = _agent(_SlowTool("Slow", 0.02, running))
+
+    messages = asyncio.run(agent._aexecute_tool_calls(_calls(*["Slow"] * 5)))
+
+    assert running["peak"] == 2
+    assert [m.content for m in messages] == [f"Slow:{i}" for i in range(5)]
+
+
+def test_slow_tool_times_out_without_holding_back_the_others(monkeypatch):
+    monkeypatch.setattr(settings, "TOOL_TIMEOUT_SECONDS", 0.05)
+    running = {"now": 0, "peak": 0}
+    agent = _agent(_SlowTool("Hung", 5, running), _SlowTool("Fast", 0.01, running))
+
+    messages = asyncio.run(agent._aexecute_tool_calls(_calls("Hung", "Fast")))
+
+    assert "timed out" in messages[0].content
+    assert messages[1].content == "Fast:1"
@@ -0,0 +1,99 @@
+"""Write-behind queue failure handling."""
+
+import json
+import threading
+import time
+
+from app.core.write_behind import WriteBehindQueue
+
+
+class _Table:
+    """In-memory stand-in for a table with a CHECK constraint on ``ok``."""
+
+    def __init__(self, transient_failures: int = 0):
+        self.rows = []
+        self.transient_failures = transient_failures
+
+    def write_batch(self, rows):
+        if self.transient_failures:
+            self.transient_failures -= 1
+            raise ConnectionError("database is locked")
+        if any(not row["ok"] for row in rows):
+            raise ValueError("constraint failed")
+        self.rows.extend(rows)
+
+
+def _queue(table, tmp_path, **kwargs):
+    return WriteBehindQueue(
+        table.write_batch,
+        flush_interval=0.01,
+        dead_letter_path=str(tmp_path / "dead.jsonl"),
+        is_permanent=lambda error: isinstance(error, ValueError),
+        **kwargs,
+    )
+
+
+def test_transient_failures_are_retried(tmp_path):
+    table = _Table(transient_failures=2)
+    writer = _queue(table, tmp_path)
+
+    writer.submit({"id": 1, "ok": True})
+
+    assert writer.close(timeout=5)
+    assert [row["id"] for row in table.rows] == [1]
+    assert writer.stats()["dead_lettered"] == 0
+
+
+def test_bad_row_is_dead_lettered_and_the_batch_is_written(tmp_path):
+    table = _Table()
+    writer = _queue(table, tmp_path, batch_size=10)
+
+    for row_id, ok in ((1, True), (2, False), (3, True)):
+        writer.submit({"id": row_id, "ok": ok})
+
+    assert writer.close(timeout=5)
+    assert sorted(row["id"] for row in table.rows) == [1, 3]
+    dead = [json.loads(line) for line in (tmp_path / "dead.jsonl").read_text().splitlines()]
+    assert [entry["row"]["id"] for entry in dead] == [2]
+    assert writer.stats()["dead_lettered"] == 1
+
+
+def test_retries_are_bounded(tmp_path):
+    table = _Table(transient_failures=100)
+    writer = _queue(table, tmp_path, max_retries=2)
+
+    writer.submit({"id": 1, "ok": True})
+
+    assert writer.close(timeout=10)
+    assert table.rows == []
+    assert writer.stats()["dead_lettered"] == 1
+
+
+def test_journal_is_compacted_while_a_backlog_persists(tmp_path):
+    start, release = threading.Event(), threading.Event()
+    table = _Table()
+
+    def write_batch(rows):
+        if rows[0]["id"] == 1:
+            start.wait(5)
+        if rows[0]["id"] >= 7:
+            release.wait(5)
+        table.write_batch(rows)
+
+    journal = tmp_path / "rows.journal"
+    writer = WriteBehindQueue(write_batch, batch_size=1, flush_interval=0, journal_path=str(journal), journal_compact_bytes=0)
+    for row_id in range(1, 11):
+        writer.submit({"id": row_id, "ok": True})
+    start.set()
+
+    deadline = time.monotonic() + 5
+    while writer.stats()["committed"] < 6 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert writer.stats()["pending"] == 4
+    assert [json.loads(line)["id"] for line in journal.read_text().splitlines()] == [7, 8, 9, 10]
+
+    writer.submit({"id": 11, "ok": True})
+    release.set()
+    assert writer.close(timeout=5)
+    assert [row["id"] for row in table.rows] == list(range(1, 12))
+    assert journal.read_text() == ""